@@ -0,0 +1,79 @@
+"""Benchmark: JSON decoder backends (json_decoder.py) on representative bundle shapes.
+
+For every installed backend it times full decoding plus src extraction and
+section-only decoding (JSON_DECODE_SECTIONS) plus extraction, with the
+streaming parser as a reference. Pick JSON_DECODER per deployment from these numbers.
+
+Usage: python benchmarks/bench_decoders.py [--entries N] [--repeat N] [--output FILE]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from json_decoder import available_decoders, make_decoder
+from json_stream import iter_src_values
+from src_extract import iter_values
+from synthetic import SECTIONS, SyntheticSpec, asset_names, bundle_document
+
+def make_shapes(entries):
+    """Bundles shaped like production ones: flat, deeply nested, and padded with non-src sections."""
+    names = asset_names(SyntheticSpec(blobs=20000))
+    wide = bundle_document(SyntheticSpec(bundle_entries=entries, depth=1), names, 0)
+    deep = bundle_document(SyntheticSpec(bundle_entries=entries, depth=12), names, 1)
+    padded = bundle_document(SyntheticSpec(bundle_entries=entries // 4, depth=3), names, 2)
+    padded["translations"] = {
+        f"key_{i}": {"text": f"Translated string number {i} " * 4, "locale": "en-IN", "plural": [f"{i}", f"{i}s"]}
+        for i in range(entries * 2)
+    }
+    padded["glossary"] = [{"term": f"term {i}", "definition": "lorem ipsum " * 10} for i in range(entries)]
+    return {
+        name: json.dumps(document, indent=2).encode("utf-8")
+        for name, document in (("wide", wide), ("deep", deep), ("padded", padded))
+    }
+
+def best(function, repeat):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=40000, help="src values per bundle")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="optional JSON file for the results")
+    args = parser.parse_args()
+
+    shapes = make_shapes(args.entries)
+    decoders = {name: make_decoder(name) for name in available_decoders()}
+    sections = list(SECTIONS)
+    results = {}
+    print(f"Backends installed: {', '.join(decoders)}")
+    for shape, data in shapes.items():
+        size_mb = len(data) / (1024 * 1024)
+        expected = sorted(iter_values(json.loads(data)))
+        print(f"\n{shape} ({size_mb:.1f} MiB)")
+        timings = {}
+        chunks = [data[i:i + 65536] for i in range(0, len(data), 65536)]
+        timings["stream"] = best(lambda: list(iter_src_values(chunks)), args.repeat)
+        for name, decoder in decoders.items():
+            assert sorted(iter_values(decoder.loads(data))) == expected
+            assert sorted(iter_values(decoder.loads_sections(data, sections))) == expected
+            timings[f"{name}"] = best(lambda: list(iter_values(decoder.loads(data))), args.repeat)
+            timings[f"{name}+sections"] = best(
+                lambda: list(iter_values(decoder.loads_sections(data, sections))), args.repeat
+            )
+        for name, seconds in timings.items():
+            print(f"  {name:<20} {seconds * 1000:9.2f} ms  {size_mb / seconds:8.1f} MiB/s")
+        results[shape] = {"bytes": len(data), "seconds": timings}
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Micro-benchmark: recursive extract_src_values vs. the iterative src_extract.iter_values.
+
+Usage: python benchmarks/bench_extract.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src_extract import iter_values
+
+def recursive_extract_src_values(json_data):
+    """The original recursive implementation, kept here as the baseline."""
+    src_values = []
+    if isinstance(json_data, list):
+        for item in json_data:
+            src_values.extend(recursive_extract_src_values(item))
+    elif isinstance(json_data, dict):
+        for key, value in json_data.items():
+            if key == 'src' and isinstance(value, str):
+                src_values.append(value.strip())
+            else:
+                src_values.extend(recursive_extract_src_values(value))
+    return src_values
+
+def make_deep_document(depth, srcs_per_level=3):
+    """Chapter/module style nesting: every level carries a few src values and one child."""
+    root = node = {}
+    for level in range(depth):
+        node["media"] = [{"src": f"/content/assets/images/l{level}/{i}.png"} for i in range(srcs_per_level)]
+        child = {"id": f"chapter-{level}"}
+        node["chapters"] = [child]
+        node = child
+    return root
+
+def make_wide_document(entries, srcs_per_entry=4):
+    return {
+        "modules": [
+            {
+                "id": f"module-{i}",
+                "icon": f"/icon/modules/{i}.png",
+                "chapters": [{"src": f"/content/assets/images/m{i}/{j}.png", "type": "image"} for j in range(srcs_per_entry)],
+            }
+            for i in range(entries)
+        ]
+    }
+
+def run_case(name, document, repeat):
+    assert recursive_extract_src_values(document) == list(iter_values(document))
+    recursive = min(timeit.repeat(lambda: recursive_extract_src_values(document), number=1, repeat=repeat))
+    iterative = min(timeit.repeat(lambda: list(iter_values(document)), number=1, repeat=repeat))
+    print(f"{name:<12} recursive {recursive * 1000:9.2f} ms   iterative {iterative * 1000:9.2f} ms   "
+          f"speedup {recursive / iterative:5.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(10000)
+    run_case("deep (800)", make_deep_document(800), args.repeat)
+    run_case("deep (3000)", make_deep_document(3000), args.repeat)
+    run_case("wide (50k)", make_wide_document(50000), args.repeat)
+    sys.setrecursionlimit(1000)
+
+    very_deep = make_deep_document(20000)
+    count = sum(1 for _ in iter_values(very_deep))
+    print(f"deep (20000) iterative extracted {count} values (recursive raises RecursionError)")
+
+if __name__ == "__main__":
+    main()
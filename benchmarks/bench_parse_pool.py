@@ -0,0 +1,75 @@
+"""Benchmark: bundle parsing on download threads vs. the parse_pool process pool.
+
+Downloads synthetic bundles from the in-process fake container with a thread
+pool and parses them either on the threads themselves (GIL bound) or in
+ParsePool worker processes, for several worker counts.
+
+Usage: python benchmarks/bench_parse_pool.py [--bundles N] [--bundle-entries N] [--workers 1,2,4,8]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from canonical_path import canonical_path
+from fake_blob import FakeContainerClient
+from parse_pool import ParsePool
+from src_extract import iter_values
+from synthetic import SyntheticSpec, asset_names, bundle_document
+
+def build_container(bundles, bundle_entries):
+    spec = SyntheticSpec(blobs=20000, bundle_entries=bundle_entries, languages=bundles)
+    names = asset_names(spec)
+    container = FakeContainerClient("json")
+    for index in range(bundles):
+        document = bundle_document(spec, names, index)
+        container.upload_blob(f"lang{index:03d}/content-bundle.json", json.dumps(document, indent=2))
+    return container
+
+def parse_on_thread(chunks):
+    values = iter_values(json.loads(b"".join(chunks)))
+    return sorted(set(map(canonical_path, values)))
+
+def run(container, threads, parse):
+    names = sorted(container._blobs)
+
+    def one(name):
+        return parse(container.get_blob_client(name).download_blob().chunks())
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(one, names))
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bundles", type=int, default=32)
+    parser.add_argument("--bundle-entries", type=int, default=20000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    container = build_container(args.bundles, args.bundle_entries)
+    size = sum(len(data) for data in container._blobs.values())
+    print(f"{args.bundles} bundles, {size / (1024 * 1024):.1f} MiB, {os.cpu_count()} CPU(s)")
+
+    worker_counts = [int(count) for count in args.workers.split(",")]
+    baseline, expected = run(container, max(worker_counts), parse_on_thread)
+    print(f"threads only          {baseline:8.2f} s")
+    for workers in worker_counts:
+        pool = ParsePool(workers)
+        try:
+            pool.parse_chunks([b"{}"])  # start the workers outside the timed run
+            elapsed, results = run(container, workers, lambda chunks: pool.parse_chunks(chunks, canonical=True))
+        finally:
+            pool.shutdown()
+        assert results == expected
+        print(f"process pool ({workers:>2} w)  {elapsed:8.2f} s   speedup {baseline / elapsed:5.2f}x")
+
+if __name__ == "__main__":
+    main()
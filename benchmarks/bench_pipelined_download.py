@@ -0,0 +1,72 @@
+"""Benchmark: whole-bundle download then parse vs. the pipelined ranged download.
+
+A synthetic bundle is served by the fake container with simulated latency and
+per-stream bandwidth. The baseline downloads everything before parsing; the
+SDK-style stream parses chunk by chunk on one connection; the pipelined mode
+downloads ranges in parallel while the parser consumes them in order.
+
+Usage: python benchmarks/bench_pipelined_download.py [--bundle-entries N] [--bandwidth-mib S]
+           [--latency-ms MS] [--chunk-mib N] [--concurrency N] [--max-buffered-mib N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_blob import FakeContainerClient
+from json_stream import iter_src_values
+from pipelined_download import iter_ranged_chunks
+from synthetic import SyntheticSpec, asset_names, bundle_document
+
+BLOB_NAME = "lang00/content-bundle.json"
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bundle-entries", type=int, default=60000)
+    parser.add_argument("--bandwidth-mib", type=float, default=16.0, help="simulated MiB/s per download stream")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--chunk-mib", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-buffered-mib", type=float, default=16.0)
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(bundle_entries=args.bundle_entries, depth=4)
+    data = json.dumps(bundle_document(spec, asset_names(spec), 0), indent=2).encode("utf-8")
+    chunk_size = int(args.chunk_mib * 1024 * 1024)
+    container = FakeContainerClient("json", latency=args.latency_ms / 1000, chunk_size=chunk_size,
+                                    bandwidth=args.bandwidth_mib * 1024 * 1024)
+    container.upload_blob(BLOB_NAME, data)
+    blob_client = container.get_blob_client(BLOB_NAME)
+    print(f"Bundle {len(data) / (1024 * 1024):.1f} MiB, {args.bandwidth_mib:g} MiB/s per stream, "
+          f"{args.latency_ms:g} ms latency")
+
+    download, content = timed(lambda: blob_client.download_blob().readall())
+    parse, expected = timed(lambda: list(iter_src_values(
+        content[i:i + chunk_size] for i in range(0, len(content), chunk_size))))
+    print(f"download only              {download:7.2f} s")
+    print(f"parse only                 {parse:7.2f} s")
+    print(f"readall, then parse        {download + parse:7.2f} s")
+
+    streamed, values = timed(lambda: list(iter_src_values(blob_client.download_blob().chunks())))
+    assert values == expected
+    print(f"single stream chunks()     {streamed:7.2f} s")
+
+    pipelined, values = timed(lambda: list(iter_src_values(iter_ranged_chunks(
+        blob_client, chunk_size=chunk_size, concurrency=args.concurrency,
+        max_buffered_bytes=int(args.max_buffered_mib * 1024 * 1024)))))
+    assert values == expected
+    print(f"pipelined ranges ({args.concurrency} conc) {pipelined:7.2f} s   "
+          f"(max(download, parse) = {max(download / args.concurrency, parse):.2f} s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark: CLI startup time and import cost of every script, against a fixed budget.
+
+Each command runs in a fresh interpreter from an empty working directory.
+The reported overhead is the median wall time minus that of a bare
+`python -c pass`. The run fails (exit status 1) when an overhead exceeds
+--budget-ms, when `cli.py --help` imports the Azure SDK, requests or dotenv,
+or when importing a script writes anything to the working directory.
+
+Usage: python benchmarks/bench_startup.py [--repeat N] [--budget-ms MS] [--output FILE]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+CLI = os.path.join(REPO_DIR, "cli.py")
+
+SCRIPTS = ("run", "new", "test", "ide", "delete", "dedup", "watch", "bundle_validator")
+COMMANDS = ("compare", "audit-languages", "audit-mapping", "delete", "validate", "dedup", "watch")
+HEAVY_MODULES = ("azure", "requests", "dotenv")
+
+def median_seconds(argv, cwd, env, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def imported_modules(argv, cwd, env):
+    """Top-level packages imported by a command, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd=cwd, env=env, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="allowed startup overhead per command")
+    parser.add_argument("--output", help="optional JSON file for the results")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, PYTHONDONTWRITEBYTECODE="1")
+    cases = {"cli.py --help": [CLI, "--help"]}
+    cases.update({f"cli.py {command} --help": [CLI, command, "--help"] for command in COMMANDS})
+    cases.update({f"import {script}": ["-c", f"import {script}"] for script in SCRIPTS})
+
+    failures = []
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        baseline = median_seconds([sys.executable, "-c", "pass"], workdir, env, args.repeat)
+        print(f"bare interpreter {baseline * 1000:8.1f} ms, budget {args.budget_ms:g} ms overhead\n")
+        for name, argv in cases.items():
+            overhead = median_seconds([sys.executable] + argv, workdir, env, args.repeat) - baseline
+            over_budget = overhead * 1000 > args.budget_ms
+            results[name] = {"overhead_ms": round(overhead * 1000, 2), "over_budget": over_budget}
+            print(f"{name:<32} {overhead * 1000:8.1f} ms{'  OVER BUDGET' if over_budget else ''}")
+            if over_budget:
+                failures.append(f"{name} takes {overhead * 1000:.1f} ms")
+
+        heavy = sorted(imported_modules([CLI, "--help"], workdir, env) & set(HEAVY_MODULES))
+        if heavy:
+            failures.append(f"cli.py --help imports {', '.join(heavy)}")
+        leftovers = os.listdir(workdir)
+        if leftovers:
+            failures.append(f"importing the scripts created {', '.join(sorted(leftovers))}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"baseline_ms": round(baseline * 1000, 2), "budget_ms": args.budget_ms,
+                       "results": results, "failures": failures}, file, indent=2)
+        print(f"\nResults saved to: {args.output}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
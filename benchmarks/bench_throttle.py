@@ -0,0 +1,78 @@
+"""Benchmark: fixed concurrency vs. the AIMD throttle governor against a throttling account.
+
+The fake container answers 503 to requests beyond --capacity in flight and,
+like the SDK, retries each throttled request --sdk-retries times with
+exponential backoff. Both modes download every blob from --workers threads;
+the governed mode sends the requests through throttle.ThrottleGovernor, which
+sees every throttled response through the raw_response_hook, adapts the
+number of requests in flight and, like a client built with its
+client_options(), does the retrying itself instead of the SDK.
+
+Usage: python benchmarks/bench_throttle.py [--blobs N] [--workers N] [--capacity N] [--latency-ms MS]
+           [--retry-after S] [--sdk-retries N] [--backoff-ms MS]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_blob import FakeContainerClient, FakeHttpResponseError
+from throttle import GovernedContainer, ThrottleGovernor
+
+def download(container, name):
+    try:
+        container.get_blob_client(name).download_blob().readall()
+        return True
+    except FakeHttpResponseError:
+        return False
+
+def download_all(container, names, workers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        failures = sum(not ok for ok in executor.map(lambda name: download(container, name), names))
+    return time.perf_counter() - start, failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blobs", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--capacity", type=int, default=16, help="requests in flight before the fake answers 503")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with every 503")
+    parser.add_argument("--sdk-retries", type=int, default=3)
+    parser.add_argument("--backoff-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    def make_container(raw_response_hook=None, sdk_retries=args.sdk_retries):
+        container = FakeContainerClient("assets", latency=args.latency_ms / 1000, capacity=args.capacity,
+                                        retry_after=args.retry_after, retry_total=sdk_retries,
+                                        retry_backoff=args.backoff_ms / 1000, raw_response_hook=raw_response_hook)
+        for i in range(args.blobs):
+            container.upload_blob(f"assets/{i:06d}.png", b"x")
+        return container
+
+    # Each small download is two requests: download_blob() and readall()
+    ideal = 2 * args.blobs * args.latency_ms / 1000 / args.capacity
+    print(f"{args.blobs} blobs, {args.workers} workers, capacity {args.capacity}, "
+          f"{args.latency_ms:g} ms latency (ideal {ideal:.2f} s)\n")
+
+    container = make_container()
+    seconds, failures = download_all(container, sorted(container._blobs), args.workers)
+    print(f"fixed concurrency {seconds:7.2f} s  {container.throttled:6d} x 503  {failures} failed")
+
+    governor = ThrottleGovernor(initial=8, maximum=args.workers, cooldown=args.latency_ms / 1000 * 2,
+                                backoff=args.backoff_ms / 1000)
+    container = make_container(governor.response_hook(), sdk_retries=0)
+    seconds, failures = download_all(GovernedContainer(governor, container), sorted(container._blobs), args.workers)
+    stats = governor.stats()
+    print(f"AIMD governor     {seconds:7.2f} s  {container.throttled:6d} x 503  {failures} failed   "
+          f"limit {stats['throttle_limit']} (lowest {stats['throttle_lowest_limit']}, "
+          f"highest {stats['throttle_highest_limit']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""In-process stand-in for the parts of azure.storage.blob.ContainerClient the scripts use.
+
+Blobs live in a dict; an optional per-request latency and per-stream bandwidth
+simulate network round trips and transfer time, and an optional capacity
+answers requests beyond that many in flight with a 503, like a throttled account.
+Throttled requests are retried retry_total times, reporting every throttled
+attempt to raw_response_hook, as the SDK's retry policy does.
+"""
+import base64
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+class FakeHttpResponseError(Exception):
+    """Shaped like azure.core.exceptions.HttpResponseError for a throttled request."""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"{status_code} ServerBusy")
+        self.status_code = status_code
+        headers = {"x-ms-error-code": "ServerBusy"}
+        if retry_after is not None:
+            headers["Retry-After"] = str(retry_after)
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+class FakeBlobPrefix:
+    def __init__(self, prefix):
+        self.name = prefix
+        self.prefix = prefix
+
+class FakeBlobProperties:
+    def __init__(self, name, data, last_modified):
+        self.name = name
+        self.size = len(data)
+        self.etag = f'"0x{hashlib.sha1(data).hexdigest()[:16].upper()}"'
+        self.last_modified = last_modified
+        self.content_settings = SimpleNamespace(content_md5=bytearray(hashlib.md5(data).digest()))
+
+class FakeItemPaged:
+    def __init__(self, items, page_size, on_page):
+        self._items = items
+        self._page_size = page_size
+        self._on_page = on_page
+
+    def by_page(self, continuation_token=None):
+        start = int(continuation_token or 0)
+        for offset in range(start, len(self._items), self._page_size):
+            self._on_page()
+            yield iter(self._items[offset:offset + self._page_size])
+        if not self._items:
+            self._on_page()
+
+    def __iter__(self):
+        for page in self.by_page():
+            yield from page
+
+class FakeDownloader:
+    def __init__(self, properties, data, chunk_size, on_request, bandwidth=None):
+        self.properties = properties
+        self.size = len(data)
+        self._data = data
+        self._chunk_size = chunk_size
+        self._on_request = on_request
+        self._bandwidth = bandwidth
+
+    def _transfer(self, data):
+        if self._bandwidth:
+            time.sleep(len(data) / self._bandwidth)
+        return data
+
+    def readall(self):
+        self._on_request()
+        return self._transfer(self._data)
+
+    def chunks(self):
+        for offset in range(0, len(self._data), self._chunk_size):
+            self._on_request()
+            yield self._transfer(self._data[offset:offset + self._chunk_size])
+
+class FakeBlobClient:
+    def __init__(self, container, name):
+        self._container = container
+        self.blob_name = name
+
+    def get_blob_properties(self):
+        self._container._request()
+        return self._container._properties[self.blob_name]
+
+    def download_blob(self, offset=None, length=None, **kwargs):
+        container = self._container
+        container._request()
+        data = container._blobs[self.blob_name]
+        if offset is not None:
+            end = len(data) if length is None else offset + length
+            data = data[offset:end]
+        container.bytes_downloaded += len(data)
+        return FakeDownloader(container._properties[self.blob_name], data, container.chunk_size, container._request,
+                              container.bandwidth)
+
+class FakeContainerClient:
+    def __init__(self, container_name="fake", latency=0.0, page_size=5000, chunk_size=4 * 1024 * 1024,
+                 bandwidth=None, capacity=None, retry_after=None, retry_total=0, retry_backoff=0.1,
+                 raw_response_hook=None):
+        self.container_name = container_name
+        self.latency = latency
+        self.bandwidth = bandwidth  # bytes per second per download stream
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+        self.capacity = capacity  # concurrent requests served before answering 503
+        self.retry_after = retry_after
+        self.retry_total = retry_total
+        self.retry_backoff = retry_backoff
+        self.raw_response_hook = raw_response_hook
+        self.requests = 0
+        self.throttled = 0
+        self.bytes_downloaded = 0
+        self._in_flight = 0
+        self._blobs = {}
+        self._properties = {}
+        self._sorted_names = None
+        self._lock = threading.Lock()
+
+    def _request(self):
+        for attempt in range(self.retry_total + 1):
+            try:
+                return self._attempt()
+            except FakeHttpResponseError as error:
+                if self.raw_response_hook is not None:
+                    self.raw_response_hook(error.response)
+                if attempt == self.retry_total:
+                    raise
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+    def _attempt(self):
+        with self._lock:
+            self.requests += 1
+            if self.capacity is not None and self._in_flight >= self.capacity:
+                self.throttled += 1
+                raise FakeHttpResponseError(503, self.retry_after)
+            self._in_flight += 1
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def upload_blob(self, name, data, overwrite=True):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._blobs[name] = data
+        self._properties[name] = FakeBlobProperties(name, data, datetime.now(timezone.utc))
+        self._sorted_names = None
+
+    def _names(self):
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self._blobs)
+        return self._sorted_names
+
+    def list_blobs(self, name_starts_with=None, **kwargs):
+        prefix = name_starts_with or ""
+        items = [self._properties[name] for name in self._names() if name.startswith(prefix)]
+        return FakeItemPaged(items, self.page_size, self._request)
+
+    def walk_blobs(self, name_starts_with=None, delimiter="/", **kwargs):
+        prefix = name_starts_with or ""
+        self._request()
+        seen = set()
+        items = []
+        for name in self._names():
+            if not name.startswith(prefix):
+                continue
+            rest = name[len(prefix):]
+            if delimiter in rest:
+                child = prefix + rest[:rest.index(delimiter) + 1]
+                if child not in seen:
+                    seen.add(child)
+                    items.append(FakeBlobPrefix(child))
+            else:
+                items.append(self._properties[name])
+        return items
+
+    def get_blob_client(self, blob):
+        return FakeBlobClient(self, blob)
+
+    def delete_blobs(self, *blobs, **kwargs):
+        self._request()
+        responses = []
+        for name in blobs:
+            if self._blobs.pop(name, None) is None:
+                responses.append(SimpleNamespace(status_code=404, reason="Not Found",
+                                                 headers={"x-ms-error-code": "BlobNotFound"}))
+            else:
+                self._properties.pop(name, None)
+                responses.append(SimpleNamespace(status_code=202, reason="Accepted", headers={}))
+        self._sorted_names = None
+        return iter(responses)
+
+def content_md5_base64(data):
+    return base64.b64encode(hashlib.md5(data).digest()).decode("ascii")
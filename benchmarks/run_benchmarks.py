@@ -0,0 +1,173 @@
+"""Stage benchmarks for the comparison pipeline against a synthetic in-process container.
+
+Times listing, download, src extraction, set comparison and report writing
+separately and stores the results as JSON. With --baseline the run is compared
+against an earlier result file and exits non-zero when a stage regressed by
+more than --threshold.
+
+Usage: python benchmarks/run_benchmarks.py [--blobs N] [--bundle-entries N] [--depth N]
+           [--languages N] [--overlap R] [--latency-ms MS] [--repeat N]
+           [--output FILE] [--baseline FILE] [--threshold R]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from blob_listing import list_blobs_sharded
+from fake_blob import FakeContainerClient
+from json_stream import iter_src_values
+from path_store import PathTable
+from report_writer import ReportWriter
+from src_extract import iter_values
+from synthetic import SyntheticSpec, populate
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+def time_stage(function, repeat):
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        runs.append(time.perf_counter() - start)
+    return {"seconds": min(runs), "median": statistics.median(runs), "runs": runs}, result
+
+def run(spec, latency, repeat, shard_depth, concurrency):
+    assets = FakeContainerClient("assets", latency=latency, page_size=5000)
+    bundles_container = FakeContainerClient("json", latency=latency)
+    populate(spec, assets, bundles_container)
+    bundles = sorted(bundles_container._blobs)
+    stages = {}
+
+    def listing():
+        return [blob.name for blob in list_blobs_sharded(assets, "assets/", depth=shard_depth, concurrency=concurrency)]
+    stages["listing"], names = time_stage(listing, repeat)
+    asset_paths = [f"/content/{name}" for name in names]
+
+    def download():
+        return {name: bundles_container.get_blob_client(name).download_blob().readall() for name in bundles}
+    stages["download"], raw_bundles = time_stage(download, repeat)
+
+    def extract():
+        return {name: list(iter_values(json.loads(data))) for name, data in raw_bundles.items()}
+    stages["extract"], src_values = time_stage(extract, repeat)
+
+    def extract_streaming():
+        chunk = 64 * 1024
+        return {name: list(iter_src_values(data[i:i + chunk] for i in range(0, len(data), chunk)))
+                for name, data in raw_bundles.items()}
+    stages["extract_streaming"], _ = time_stage(extract_streaming, repeat)
+
+    def compare_sets():
+        assets_set = set(asset_paths)
+        return {name: (assets_set.intersection(values), assets_set.difference(values))
+                for name, values in src_values.items()}
+    stages["compare_set"], comparisons = time_stage(compare_sets, repeat)
+
+    def compare_table():
+        assets_table = PathTable.from_iterable(asset_paths)
+        return {name: (assets_table.intersection(set(values)), assets_table.difference(set(values)))
+                for name, values in src_values.items()}
+    stages["compare_path_table"], _ = time_stage(compare_table, repeat)
+
+    def write_reports():
+        with tempfile.TemporaryDirectory() as directory:
+            writer = ReportWriter(directory)
+            for name, (common, missed) in comparisons.items():
+                language = name.split("/")[0]
+                writer.write(f"{language}_common_paths.txt", common)
+                writer.write(f"{language}_missed_paths.txt", missed)
+            writer.write_manifest()
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        stages["report"], _ = time_stage(write_reports, repeat)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": spec.to_dict(),
+        "latency_ms": latency * 1000,
+        "repeat": repeat,
+        "listed_blobs": len(names),
+        "bundle_bytes": sum(len(data) for data in raw_bundles.values()),
+        "src_values": sum(len(values) for values in src_values.values()),
+        "requests": assets.requests + bundles_container.requests,
+        "stages": stages,
+    }
+
+def compare_results(result, baseline, threshold):
+    """Prints a per-stage comparison and returns the names of stages slower than baseline by more than threshold."""
+    regressions = []
+    print(f"{'stage':<20} {'baseline':>12} {'current':>12} {'change':>9}")
+    for stage, timing in result["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            print(f"{stage:<20} {'-':>12} {timing['seconds'] * 1000:10.2f}ms {'new':>9}")
+            continue
+        change = timing["seconds"] / previous["seconds"] - 1 if previous["seconds"] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{stage:<20} {previous['seconds'] * 1000:10.2f}ms {timing['seconds'] * 1000:10.2f}ms {change:+8.1%}{flag}")
+        if change > threshold:
+            regressions.append(stage)
+    if baseline.get("spec") != result["spec"]:
+        print("Warning: baseline was recorded with a different synthetic spec")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = SyntheticSpec()
+    parser.add_argument("--blobs", type=int, default=defaults.blobs)
+    parser.add_argument("--bundle-entries", type=int, default=defaults.bundle_entries)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--languages", type=int, default=defaults.languages)
+    parser.add_argument("--overlap", type=float, default=defaults.overlap)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated latency per storage request")
+    parser.add_argument("--shard-depth", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown per stage, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(blobs=args.blobs, bundle_entries=args.bundle_entries, depth=args.depth,
+                         languages=args.languages, overlap=args.overlap, seed=args.seed)
+    result = run(spec, args.latency_ms / 1000, args.repeat, args.shard_depth, args.concurrency)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w") as file:
+        json.dump(result, file, indent=2)
+
+    for stage, timing in result["stages"].items():
+        print(f"{stage:<20} {timing['seconds'] * 1000:10.2f} ms (median {timing['median'] * 1000:.2f} ms)")
+    print(f"Results saved to: {output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare_results(result, baseline, args.threshold)
+        if regressions:
+            print(f"Regressed stages: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Synthetic asset trees and content-bundle.json files for benchmarks.
+
+Everything is derived from a seed, so two runs with the same parameters build
+byte-identical containers.
+"""
+import json
+import random
+from dataclasses import dataclass, asdict
+
+@dataclass
+class SyntheticSpec:
+    blobs: int = 20000             # asset blobs in the assets container
+    bundle_entries: int = 2000     # src values per language bundle
+    depth: int = 4                 # nesting depth of chapters inside a bundle and of asset directories
+    languages: int = 4
+    overlap: float = 0.8           # share of a bundle's src values that point at an existing asset
+    seed: int = 42
+
+    def to_dict(self):
+        return asdict(self)
+
+SECTIONS = ("procedures", "actioncards", "modules")
+
+def asset_names(spec):
+    """Asset blob names spread over `depth` directory levels, e.g. assets/images/d3/d1/d0/123.png."""
+    rng = random.Random(spec.seed)
+    names = []
+    for i in range(spec.blobs):
+        directories = "/".join(f"d{rng.randrange(8)}" for _ in range(max(spec.depth - 1, 0)))
+        extension = ".mp4" if i % 10 == 0 else ".png"
+        names.append(f"assets/images/{directories}/{i}{extension}" if directories else f"assets/images/{i}{extension}")
+    return names
+
+def _nest(entries, depth, section, index):
+    """Wraps a list of media entries in `depth` levels of chapters."""
+    node = {"id": f"{section}-{index}", "description": f"{section} {index}",
+            "icon": f"/icon/{section}/{index}.png", "media": entries}
+    for level in range(depth - 1):
+        node = {"id": f"{section}-{index}-{level}", "description": f"{section} {index}",
+                "chapters": [node]}
+    return node
+
+def bundle_document(spec, names, language_index):
+    """A content bundle whose src values hit existing assets at the spec's overlap ratio."""
+    rng = random.Random(spec.seed * 1000 + language_index)
+    src_values = []
+    for i in range(spec.bundle_entries):
+        if names and rng.random() < spec.overlap:
+            src_values.append(f"/content/{rng.choice(names)}")
+        else:
+            src_values.append(f"/content/assets/images/missing/{language_index}/{i}.png")
+
+    document = {section: [] for section in SECTIONS}
+    per_node = 8
+    for start in range(0, len(src_values), per_node):
+        section = SECTIONS[(start // per_node) % len(SECTIONS)]
+        entries = [{"src": src, "type": "image"} for src in src_values[start:start + per_node]]
+        document[section].append(_nest(entries, spec.depth, section, start // per_node))
+    return document
+
+def language_ids(spec):
+    return [f"lang{index:02d}" for index in range(spec.languages)]
+
+def populate(spec, assets_container, json_container):
+    """Uploads the asset tree and one bundle per language; returns (asset names, {language: bundle blob name})."""
+    names = asset_names(spec)
+    for name in names:
+        assets_container.upload_blob(name, b"\x89PNG" + name.encode("utf-8"))
+    bundles = {}
+    for index, language_id in enumerate(language_ids(spec)):
+        blob_name = f"{language_id}/content-bundle.json"
+        document = bundle_document(spec, names, index)
+        json_container.upload_blob(blob_name, json.dumps(document, indent=2).encode("utf-8"))
+        bundles[language_id] = blob_name
+    return names, bundles
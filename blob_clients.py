@@ -0,0 +1,90 @@
+import os
+import threading
+from throttle import get_governor, governed
+
+# One BlobServiceClient (and one pooled HTTP session) per connection string,
+# shared by every script so repeated helper calls reuse open connections. The
+# SDK and requests are imported on first use, so importing this module (and
+# every script that prints connection stats) stays cheap.
+_clients = {}
+_sessions = {}
+_lock = threading.Lock()
+
+def _pool_settings():
+    """Reads transport settings from environment variables."""
+    return {
+        "pool_size": int(os.getenv("BLOB_POOL_SIZE", "32")),
+        "connect_timeout": float(os.getenv("BLOB_CONNECT_TIMEOUT", "10")),
+        "read_timeout": float(os.getenv("BLOB_READ_TIMEOUT", "120")),
+        "keep_alive": os.getenv("BLOB_KEEP_ALIVE", "1") not in ("0", "false", "False"),
+    }
+
+def _build_session(settings):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=settings["pool_size"], pool_maxsize=settings["pool_size"])
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not settings["keep_alive"]:
+        session.headers["Connection"] = "close"
+    return session
+
+def get_blob_service_client(connection_string=None):
+    """Returns the shared BlobServiceClient for a connection string, creating it on first use."""
+    from azure.core.pipeline.transport import RequestsTransport
+    from azure.storage.blob import BlobServiceClient
+
+    connection_string = connection_string or os.getenv("AZURE_CONNECTION_STRING")
+    with _lock:
+        client = _clients.get(connection_string)
+        if client is None:
+            settings = _pool_settings()
+            session = _build_session(settings)
+            transport = RequestsTransport(
+                session=session,
+                session_owner=False,
+                connection_timeout=settings["connect_timeout"],
+                read_timeout=settings["read_timeout"],
+            )
+            options = {}
+            governor = get_governor()
+            if governor is not None:
+                # Every response reports 429/503 to the governor, which also retries them, so the
+                # SDK's ExponentialRetry keeps only its connection and read retries
+                options.update(governor.client_options())
+            client = BlobServiceClient.from_connection_string(connection_string, transport=transport, **options)
+            _clients[connection_string] = client
+            _sessions[connection_string] = session
+    return client
+
+def get_container_client(container_name, connection_string=None):
+    """Returns a ContainerClient that shares the pooled transport of its account, behind the throttle governor."""
+    return governed(get_blob_service_client(connection_string).get_container_client(container_name))
+
+def connection_stats():
+    """Counts connections opened and requests sent over all pooled sessions."""
+    opened = 0
+    requests_sent = 0
+    with _lock:
+        sessions = list(_sessions.values())
+    for session in sessions:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                opened += pool.num_connections
+                requests_sent += pool.num_requests
+    return {
+        "connections_opened": opened,
+        "requests_sent": requests_sent,
+        "connections_reused": max(requests_sent - opened, 0),
+    }
+
+def print_connection_stats():
+    stats = connection_stats()
+    print(f"Connections opened: {stats['connections_opened']}, "
+          f"requests: {stats['requests_sent']}, reused: {stats['connections_reused']}")
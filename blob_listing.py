@@ -0,0 +1,143 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from metrics import increment
+
+# Prefix-sharded listing. The virtual directory tree below a prefix is
+# discovered with walk_blobs and a "/" delimiter, then every shard is listed
+# concurrently and the pages are merged back into one stream of blobs.
+
+_DONE = object()
+
+def _is_prefix(item):
+    # walk_blobs yields BlobPrefix entries for virtual directories and BlobProperties for blobs
+    return hasattr(item, "prefix") and not hasattr(item, "size")
+
+def _walk_level(container_client, prefix):
+    shards = []
+    blobs = []
+    for item in container_client.walk_blobs(name_starts_with=prefix, delimiter="/"):
+        if _is_prefix(item):
+            shards.append(item.name)
+        else:
+            blobs.append(item)
+    return shards, blobs
+
+def discover_shards(container_client, prefix, depth, executor=None):
+    """Returns (shard prefixes, blobs found directly on the walked levels) `depth` levels below prefix."""
+    shards = [prefix or ""]
+    loose_blobs = []
+    for _ in range(depth):
+        if executor is not None:
+            levels = list(executor.map(lambda shard: _walk_level(container_client, shard), shards))
+        else:
+            levels = [_walk_level(container_client, shard) for shard in shards]
+        next_shards = []
+        for child_shards, blobs in levels:
+            next_shards.extend(child_shards)
+            loose_blobs.extend(blobs)
+        if not next_shards:
+            return [], loose_blobs
+        shards = next_shards
+    return shards, loose_blobs
+
+def _list_shard_pages(container_client, shard, report):
+    pages = 0
+    blobs = 0
+    try:
+        for page in container_client.list_blobs(name_starts_with=shard).by_page():
+            page = list(page)
+            pages += 1
+            blobs += len(page)
+            increment("list_pages")
+            increment("blobs_listed", len(page))
+            yield page
+    finally:
+        report[shard] = {"pages": pages, "blobs": blobs}
+
+def _collect_shard(container_client, shard, report):
+    return [blob for page in _list_shard_pages(container_client, shard, report) for blob in page]
+
+def list_blobs_sharded(container_client, prefix, depth=None, concurrency=None, sort=False, report=None):
+    """Yields every blob under prefix, listing the discovered shards concurrently.
+
+    With `sort` the blobs come out in name order, which needs each shard's
+    listing buffered until the shards before it are done. `report`, if given,
+    is filled with {shard: {"pages": n, "blobs": n}}.
+    """
+    depth = int(os.getenv("LIST_SHARD_DEPTH", "0")) if depth is None else depth
+    concurrency = int(os.getenv("LIST_CONCURRENCY", "8")) if concurrency is None else concurrency
+    report = {} if report is None else report
+
+    if depth <= 0 or concurrency <= 1:
+        for page in _list_shard_pages(container_client, prefix or "", report):
+            yield from page
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        shards, loose_blobs = discover_shards(container_client, prefix, depth, executor)
+        report["(walk)"] = {"pages": 0, "blobs": len(loose_blobs)}
+        if sort:
+            # Shards are disjoint "dir/" prefixes, so ordering shards and loose blobs
+            # by name and concatenating them yields a globally sorted stream
+            units = sorted([(shard, None) for shard in shards] + [(blob.name, blob) for blob in loose_blobs],
+                           key=lambda unit: unit[0])
+            futures = {
+                shard: executor.submit(_collect_shard, container_client, shard, report)
+                for shard, blob in units if blob is None
+            }
+            for name, blob in units:
+                if blob is not None:
+                    yield blob
+                else:
+                    yield from futures.pop(name).result()
+            return
+
+        yield from loose_blobs
+        pages = queue.Queue(maxsize=concurrency * 4)
+        remaining = [len(shards)]
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def produce(shard):
+            try:
+                for page in _list_shard_pages(container_client, shard, report):
+                    if stop.is_set():
+                        return
+                    pages.put(page)
+            except Exception as exc:
+                pages.put(exc)
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        pages.put(_DONE)
+
+        if not shards:
+            return
+        for shard in shards:
+            executor.submit(produce, shard)
+        try:
+            while True:
+                page = pages.get()
+                if page is _DONE:
+                    break
+                if isinstance(page, Exception):
+                    raise page
+                yield from page
+        finally:
+            stop.set()
+            # Unblock producers still waiting on a full queue
+            while True:
+                try:
+                    pages.get_nowait()
+                except queue.Empty:
+                    break
+
+def print_listing_report(report):
+    total_pages = sum(entry["pages"] for entry in report.values())
+    total_blobs = sum(entry["blobs"] for entry in report.values())
+    print(f"Listed {total_blobs} blobs in {total_pages} pages across {len(report)} shards")
+    for shard, entry in sorted(report.items()):
+        print(f"  {shard}: {entry['pages']} pages, {entry['blobs']} blobs")
@@ -0,0 +1,272 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from itertools import chain
+from blob_listing import list_blobs_sharded, print_listing_report
+from json_decoder import decode_bundle
+from json_stream import iter_src_values
+from metrics import count_bytes
+from pipelined_download import download_settings, iter_ranged_chunks
+from src_extract import iter_values
+
+# On-disk cache for extracted bundle values and blob listings. Bundles are
+# revalidated with a conditional GET (If-None-Match), so an unchanged bundle
+# costs one 304 round trip and no parsing. Listings cannot be revalidated
+# cheaply and are only reused within LISTING_CACHE_TTL seconds. The index is
+# saved with every stored entry (which costs a download anyway); hits only
+# update recency in memory, and that is saved at exit or with the next entry.
+
+INDEX_FILE = "index.json"
+
+def _list_names(container_client, prefix):
+    report = {}
+    names = [blob.name for blob in list_blobs_sharded(container_client, prefix, report=report)]
+    if len(report) > 1:
+        print_listing_report(report)
+    return names
+
+class BundleCache:
+    def __init__(self, cache_dir, max_bytes, listing_ttl=0):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.listing_ttl = listing_ttl
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILE), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(self._index, file)
+        os.replace(tmp_path, path)
+        self._dirty = False
+
+    @staticmethod
+    def _key(kind, container_name, name):
+        return hashlib.sha1(f"{kind}\0{container_name}\0{name}".encode("utf-8")).hexdigest()
+
+    def _read_values(self, entry):
+        with gzip.open(os.path.join(self.cache_dir, entry["file"]), 'rt', encoding="utf-8") as file:
+            return json.load(file)
+
+    def _store(self, key, entry, values):
+        """Writes values for a cache entry, then evicts least recently used entries over the size limit."""
+        file_name = f"{key}.json.gz"
+        full_path = os.path.join(self.cache_dir, file_name)
+        tmp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding="utf-8") as file:
+            json.dump(values, file)
+        os.replace(tmp_path, full_path)
+        entry.update(file=file_name, size=os.path.getsize(full_path), last_used=time.time())
+        with self._lock:
+            self.misses += 1
+            self._index[key] = entry
+            self._evict()
+            self._save_index()
+
+    def _touch(self, key):
+        with self._lock:
+            self.hits += 1
+            self._index[key]["last_used"] = time.time()
+            self._dirty = True
+
+    def flush(self):
+        """Saves the recency updates of cache hits, if there are any."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["file"]))
+            except OSError:
+                pass
+            total -= entry["size"]
+            del self._index[key]
+
+    def bundle_values(self, container_client, blob_name, extract, variant="", download_options=None):
+        """Returns extract(downloader) for a blob, skipping download and parsing when its ETag is unchanged.
+
+        `extract` receives the StorageStreamDownloader and must return a JSON-serializable value,
+        which is cached and returned as it is; `variant` distinguishes different extractions of the same blob. `download_options`
+        are passed to download_blob, e.g. to request only the first range.
+        """
+        download_options = download_options or {}
+        key = self._key(f"bundle:{variant}", container_client.container_name, blob_name)
+        blob_client = container_client.get_blob_client(blob_name)
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is not None:
+            from azure.core import MatchConditions
+            from azure.core.exceptions import ResourceNotModifiedError
+            try:
+                downloader = blob_client.download_blob(
+                    etag=entry["etag"], match_condition=MatchConditions.IfModified, **download_options
+                )
+            except ResourceNotModifiedError:
+                try:
+                    values = self._read_values(entry)
+                except (OSError, ValueError):
+                    downloader = blob_client.download_blob(**download_options)
+                else:
+                    self._touch(key)
+                    return values
+        else:
+            downloader = blob_client.download_blob(**download_options)
+
+        values = extract(downloader)
+        properties = downloader.properties
+        last_modified = properties.last_modified
+        self._store(key, {
+            "container": container_client.container_name,
+            "blob": blob_name,
+            "etag": properties.etag,
+            "last_modified": last_modified.isoformat() if last_modified else None,
+        }, values)
+        return values
+
+    def blob_names(self, container_client, prefix):
+        """Lists blob names under a prefix, reusing a listing younger than the configured TTL."""
+        if self.listing_ttl <= 0:
+            return _list_names(container_client, prefix)
+        key = self._key("listing", container_client.container_name, prefix or "")
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is not None and time.time() - entry["fetched"] < self.listing_ttl:
+            try:
+                names = self._read_values(entry)
+            except (OSError, ValueError):
+                pass
+            else:
+                self._touch(key)
+                return names
+        names = _list_names(container_client, prefix)
+        self._store(key, {
+            "container": container_client.container_name,
+            "prefix": prefix,
+            "fetched": time.time(),
+        }, names)
+        return names
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_bundle_cache():
+    """Returns the shared cache configured from the environment, or None when BLOB_CACHE_DIR is empty."""
+    global _cache
+    cache_dir = os.getenv("BLOB_CACHE_DIR", ".blob_cache")
+    if not cache_dir:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = BundleCache(
+                cache_dir,
+                int(os.getenv("BLOB_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+                float(os.getenv("LISTING_CACHE_TTL", "0")),
+            )
+            atexit.register(_cache.flush)
+    return _cache
+
+def bundle_extract(container_client, blob_name, extract, variant):
+    """Returns extract(chunks) for a bundle download, through the shared cache when it is enabled.
+
+    `variant` must identify the extraction, so different extractions of one blob are cached apart.
+    """
+    cache = get_bundle_cache()
+    settings = download_settings()
+    blob_client = container_client.get_blob_client(blob_name)
+    if settings is None:
+        download_options = {}
+
+        def chunks_of(downloader):
+            return downloader.chunks()
+    else:
+        # Only the first range is requested up front (conditionally, when cached);
+        # the rest is fetched in parallel ranges while the parser consumes it
+        download_options = {"offset": 0, "length": settings["chunk_size"]}
+
+        def chunks_of(downloader):
+            return iter_ranged_chunks(blob_client, first=downloader, **settings)
+
+    if cache is None:
+        downloader = blob_client.download_blob(**download_options)
+        return extract(count_bytes(chunks_of(downloader)))
+    return cache.bundle_values(
+        container_client,
+        blob_name,
+        lambda downloader: extract(count_bytes(chunks_of(downloader))),
+        variant=variant,
+        download_options=download_options,
+    )
+
+def stream_threshold():
+    """Bundle size up to which src values are decoded in one go (STREAM_THRESHOLD_BYTES, 0 always streams)."""
+    return int(os.getenv("STREAM_THRESHOLD_BYTES", "0"))
+
+def src_values_from_chunks(chunks, keys=("src",), threshold=None):
+    """Yields src values from a downloading bundle.
+
+    By default the bundle is streamed, so memory stays bounded whatever its
+    size. With a positive `threshold`, chunks are buffered up to it and a
+    bundle that ends within it is decoded in one go, several times faster
+    than the pure-Python parser but holding the bundle and its document.
+    """
+    threshold = stream_threshold() if threshold is None else threshold
+    if threshold <= 0:
+        yield from iter_src_values(chunks, keys)
+        return
+    chunks = iter(chunks)
+    buffered = deque()
+    size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size > threshold:
+            # The parser pops the buffered chunks, so they are freed as it goes
+            replay = (buffered.popleft() for _ in range(len(buffered)))
+            yield from iter_src_values(chain(replay, chunks), keys)
+            return
+    yield from iter_values(decode_bundle(b"".join(buffered)), keys)
+
+def bundle_src_values(container_client, blob_name, keys=("src",)):
+    """Extracts src values from a bundle as it downloads, through the shared cache when it is enabled."""
+    return bundle_extract(
+        container_client, blob_name, lambda chunks: list(src_values_from_chunks(chunks, keys)),
+        variant=",".join(sorted(keys)),
+    )
+
+def list_blob_names(container_client, prefix):
+    """Lists blob names under a prefix, through the shared cache when it is enabled."""
+    cache = get_bundle_cache()
+    if cache is None:
+        return _list_names(container_client, prefix)
+    return cache.blob_names(container_client, prefix)
+
+def cache_stats():
+    if _cache is None:
+        return {}
+    return {"cache_hits": _cache.hits, "cache_misses": _cache.misses}
+
+def print_cache_stats():
+    if _cache is not None:
+        print(f"Cache hits: {_cache.hits}, misses: {_cache.misses}")
@@ -0,0 +1,196 @@
+import json
+import os
+import sys
+from json_stream import JsonStreamParser
+from config import load_config
+
+# Content bundle validation (see imp.txt) on the streaming parser, so it can
+# share one pass with src extraction and keep line numbers. Entries are the
+# objects inside a section array (procedures, actioncards, modules, wherever
+# it appears in the document). For every entry:
+#   - its icon must start with the prefix configured for its section
+#   - the id and description of each of its chapters must match its own
+# Only the entry currently being read is held in memory: its scalar fields and
+# the (id, description, line) of its chapters.
+
+DEFAULT_ICON_PREFIXES = "procedures=/icon/procedures/,actioncards=/icon/actioncards/,modules=/icon/modules/"
+
+def icon_prefixes_from_env():
+    """Returns {section: required icon prefix} from ICON_PREFIXES."""
+    prefixes = {}
+    for item in os.getenv("ICON_PREFIXES", DEFAULT_ICON_PREFIXES).split(","):
+        section, separator, prefix = item.partition("=")
+        if separator and section.strip():
+            prefixes[section.strip()] = prefix.strip()
+    return prefixes
+
+class _Entry:
+    __slots__ = ("section", "fields", "lines", "chapters")
+
+    def __init__(self, section):
+        self.section = section
+        self.fields = {}
+        self.lines = {}
+        self.chapters = []
+
+class _Frame:
+    __slots__ = ("is_map", "key", "role", "entry", "chapter")
+
+    def __init__(self, is_map):
+        self.is_map = is_map
+        self.key = None
+        self.role = None
+        self.entry = None
+        self.chapter = None
+
+class BundleValidator:
+    """Consumes (event, value, line) from JsonStreamParser and collects findings.
+
+    Each finding is a dict with id, section, issue and line.
+    """
+
+    def __init__(self, icon_prefixes=None):
+        self.icon_prefixes = icon_prefixes_from_env() if icon_prefixes is None else icon_prefixes
+        self.findings = []
+        self._stack = []
+
+    def _open(self, is_map):
+        parent = self._stack[-1] if self._stack else None
+        key = parent.key if parent is not None and parent.is_map else None
+        frame = _Frame(is_map)
+        if parent is None:
+            pass
+        elif not is_map and key in self.icon_prefixes:
+            # A section array remembers its name in `key`, which arrays otherwise never use
+            frame.role = "section"
+            frame.key = key
+        elif is_map and parent.role == "section":
+            frame.role = "entry"
+            frame.entry = _Entry(parent.key)
+        elif not is_map and key == "chapters" and parent.role == "entry":
+            frame.role = "chapters"
+            frame.entry = parent.entry
+        elif is_map and parent.role == "chapters":
+            frame.role = "chapter"
+            frame.entry = parent.entry
+            frame.chapter = {}
+        self._stack.append(frame)
+
+    def _close(self):
+        frame = self._stack.pop()
+        if frame.role == "chapter":
+            frame.entry.chapters.append(frame.chapter)
+        elif frame.role == "entry":
+            self._check_entry(frame.entry)
+
+    def _scalar(self, value, line):
+        frame = self._stack[-1] if self._stack else None
+        if frame is None or not frame.is_map:
+            return
+        key = frame.key
+        if frame.role == "entry" and key in ("id", "description", "icon"):
+            frame.entry.fields[key] = value
+            frame.entry.lines[key] = line
+        elif frame.role == "chapter" and key in ("id", "description"):
+            frame.chapter[key] = (value, line)
+
+    def feed(self, event, value, line):
+        if event == "map_key":
+            self._stack[-1].key = value
+        elif event == "start_map":
+            self._open(True)
+        elif event == "start_array":
+            self._open(False)
+        elif event in ("end_map", "end_array"):
+            self._close()
+        else:
+            self._scalar(value, line)
+
+    def _check_entry(self, entry):
+        entry_id = entry.fields.get("id")
+        findings = []
+
+        def report(issue, line):
+            findings.append({"id": entry_id, "section": entry.section, "issue": issue, "line": line})
+
+        icon = entry.fields.get("icon")
+        prefix = self.icon_prefixes.get(entry.section)
+        if isinstance(icon, str) and prefix and not icon.startswith(prefix):
+            report(f"Invalid icon path '{icon}' for section '{entry.section}' (expected prefix '{prefix}')",
+                   entry.lines["icon"])
+
+        for chapter in entry.chapters:
+            for field in ("id", "description"):
+                if field not in chapter or field not in entry.fields:
+                    continue
+                value, line = chapter[field]
+                if value != entry.fields[field]:
+                    report(f"Chapter {field} '{value}' does not match parent {field} '{entry.fields[field]}'", line)
+
+        findings.sort(key=lambda finding: finding["line"])
+        self.findings.extend(findings)
+
+def scan_bundle(chunks, keys=("src",), icon_prefixes=None):
+    """Extracts src values and validates the bundle in one streaming pass.
+
+    Returns {"src_values": [...], "findings": [...]}, which the bundle cache stores as it is.
+    """
+    keys = frozenset(keys)
+    validator = BundleValidator(icon_prefixes)
+    feed = validator.feed
+    parser = JsonStreamParser(chunks)
+    src_values = []
+    pending = False
+    for event, value in parser:
+        feed(event, value, parser.line)
+        if event == "map_key":
+            pending = value in keys
+            continue
+        if pending and event == "string":
+            src_values.append(value.strip())
+        pending = False
+    return {"src_values": src_values, "findings": validator.findings}
+
+def scan_variant(icon_prefixes=None):
+    """Cache variant for scan_bundle results; cached findings depend on the icon prefixes."""
+    icon_prefixes = icon_prefixes_from_env() if icon_prefixes is None else icon_prefixes
+    return "scan:" + ",".join(f"{section}={prefix}" for section, prefix in sorted(icon_prefixes.items()))
+
+def validate_bundle(chunks, icon_prefixes=None):
+    validator = BundleValidator(icon_prefixes)
+    parser = JsonStreamParser(chunks)
+    for event, value in parser:
+        validator.feed(event, value, parser.line)
+    return validator.findings
+
+def format_finding(finding):
+    return f"[{finding['section']}] id={finding['id']} line {finding['line']}: {finding['issue']}"
+
+def _read_chunks(path, chunk_size=1024 * 1024):
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def main(paths=None):
+    load_config()
+    if paths is None:
+        paths = sys.argv[1:]
+    paths = paths or [os.getenv("VALIDATE_JSON_FILE", "content-bundle.json")]
+    results = {}
+    for path in paths:
+        results[path] = validate_bundle(_read_chunks(path))
+        for finding in results[path]:
+            print(f"{path}: {format_finding(finding)}")
+    total = sum(len(findings) for findings in results.values())
+    print(f"{total} issue(s) found")
+    output_file = os.getenv("VALIDATION_OUTPUT")
+    if output_file:
+        with open(output_file, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 1 if total else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
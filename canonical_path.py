@@ -0,0 +1,44 @@
+import os
+import re
+import sys
+from functools import lru_cache
+from urllib.parse import unquote
+
+# One canonical form for every path compared by the scripts, computed once per
+# distinct raw string. Blob names and bundle src values both go through it:
+#   - surrounding whitespace is stripped
+#   - URL-encoding is decoded, so "%20" and " " compare equal
+#   - backslashes become slashes and repeated slashes collapse
+#   - everything is lowercased
+#   - the path is rooted under /content, as bundle src values are
+#   - spaces are written back as %20, the form used in the bundles
+# Results are interned so identical paths from hundreds of bundles share one
+# string object and set lookups hit the identity fast path. The memo cache is
+# bounded: bundle src values repeat across languages and stay hot, while the
+# unique names of a large listing would otherwise keep every raw name alive.
+
+CONTENT_PREFIX = "/content"
+_SLASHES = re.compile(r"/{2,}")
+
+@lru_cache(maxsize=int(os.getenv("CANONICAL_PATH_CACHE_SIZE", str(1 << 16))))
+def canonical_path(raw):
+    path = unquote(raw.strip()).replace("\\", "/").strip()
+    path = _SLASHES.sub("/", path).lower()
+    if not path.startswith("/"):
+        path = f"/{path}"
+    if path != CONTENT_PREFIX and not path.startswith(f"{CONTENT_PREFIX}/"):
+        path = f"{CONTENT_PREFIX}{path}"
+    return sys.intern(path.replace(" ", "%20"))
+
+def canonical_paths(raw_paths):
+    return [canonical_path(raw) for raw in raw_paths]
+
+def clear_canonical_cache():
+    """Drops the memoized paths, e.g. once a run's path tables are built."""
+    canonical_path.cache_clear()
+
+def blob_names_with_paths(blob_names, paths):
+    """Yields the blob names whose canonical path is in `paths`, e.g. to turn a report back into deletable names."""
+    for name in blob_names:
+        if canonical_path(name) in paths:
+            yield name
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import quote
+
+# Per-language checkpoints for the audits (test.py, ide.py). Every run writes
+# them, so a crashed run can always be resumed: each finished language's
+# result goes to <CHECKPOINT_DIR>/<job>/<language>.json (CHECKPOINT_DIR
+# defaults to <output_dir>/checkpoints) through a temporary file and
+# os.replace, after the language's reports, so a crash leaves either the
+# previous checkpoint or the new one, never a torn file. A --resume run reuses
+# a checkpoint only while its key (the bundle ETag, a digest of the asset
+# listing and the audit variant) still matches; every other language is
+# recomputed and the global aggregates are rebuilt from all of them.
+
+def listing_digest(paths):
+    """Order-independent digest of an asset listing, given as canonical paths."""
+    digest = hashlib.sha256()
+    for path in sorted(set(paths)):
+        digest.update(path.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+def resume_requested():
+    """True for AUDIT_RESUME=1."""
+    return os.getenv("AUDIT_RESUME", "0") not in ("0", "false", "False")
+
+def _fsync_directory(directory):
+    # The rename itself is only durable once the directory entry is on disk
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # directories cannot be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class CheckpointStore:
+    def __init__(self, directory, resume=False):
+        self.directory = directory
+        self.resume = resume
+        self.reused = 0
+        self.saved = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, language_id):
+        return os.path.join(self.directory, f"{quote(language_id, safe='')}.json")
+
+    def load(self, language_id, key):
+        """Returns a language's saved result when resuming and its key still matches, else None."""
+        if not self.resume or None in key.values():
+            return None
+        try:
+            with open(self._path(language_id), 'r') as file:
+                checkpoint = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if checkpoint.get("key") != key:
+            return None
+        with self._lock:
+            self.reused += 1
+        return checkpoint["result"]
+
+    def save(self, language_id, key, result):
+        """Atomically replaces a language's checkpoint; call once its reports are written."""
+        path = self._path(language_id)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump({"language": language_id, "key": key, "completed": time.time(), "result": result}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        _fsync_directory(self.directory)
+        with self._lock:
+            self.saved += 1
+
+    def stats(self):
+        return {"checkpoints_reused": self.reused, "checkpoints_saved": self.saved}
+
+def checkpoints_enabled():
+    """False for CHECKPOINTS=0, the opt-out for runs that will never be resumed."""
+    return os.getenv("CHECKPOINTS", "1") not in ("0", "false", "False")
+
+def checkpoint_store_from_env(job, output_dir, resume=None):
+    """Returns the store for a job under CHECKPOINT_DIR (default <output_dir>/checkpoints).
+
+    `resume` is the command line's --resume, None to read AUDIT_RESUME.
+    Returns None with CHECKPOINTS=0, unless the run resumes.
+    """
+    resume = resume_requested() if resume is None else resume
+    if not checkpoints_enabled() and not resume:
+        return None
+    directory = os.getenv("CHECKPOINT_DIR") or os.path.join(output_dir, "checkpoints")
+    return CheckpointStore(os.path.join(directory, job), resume)
+
+def print_checkpoint_stats(checkpoints):
+    if checkpoints is not None:
+        print(f"Checkpoints: {checkpoints.reused} language(s) reused, {checkpoints.saved} saved "
+              f"to {checkpoints.directory}")
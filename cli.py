@@ -0,0 +1,98 @@
+"""Single entry point for the audit scripts: python cli.py <command> [options].
+
+A command imports its script only when it runs, so --help and usage errors
+never load the Azure SDK. .env is read once, before dispatch, and command
+line options override the environment variables of the same meaning.
+"""
+import argparse
+import importlib
+import os
+import sys
+
+from config import load_config
+
+def _script_main(module_name):
+    return importlib.import_module(module_name).main
+
+def _compare(args):
+    return _script_main("new" if args.canonical else "run")()
+
+def _validate(args):
+    return _script_main("bundle_validator")(args.paths)
+
+def _script(module_name):
+    return lambda args: _script_main(module_name)()
+
+def _audit(module_name):
+    return lambda args: _script_main(module_name)(resume=args.resume)
+
+def build_parser():
+    # Options use the environment variable they override as their dest
+    parser = argparse.ArgumentParser(prog="cli.py", description=__doc__.splitlines()[0])
+    parser.add_argument("--env-file", metavar="FILE", help="read configuration from this file instead of .env")
+    parser.add_argument("--output-dir", dest="OUTPUT_DIR", metavar="DIR", help="directory for reports")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    compare = commands.add_parser("compare", help="compare one asset folder with one bundle (run.py)")
+    compare.add_argument("--canonical", action="store_true",
+                         help="match canonical paths, ignoring case and encoding (new.py)")
+    compare.add_argument("--inventory-db", dest="INVENTORY_DB", metavar="FILE",
+                         help="sync a SQLite asset inventory and compare against it")
+    compare.add_argument("--no-stream", dest="STREAM_BUNDLES", action="store_const", const="0",
+                         help="download the whole bundle before parsing")
+    compare.set_defaults(handler=_compare)
+
+    audit = commands.add_parser("audit-languages", help="audit every language bundle against the assets (test.py)")
+    audit.add_argument("--concurrency", dest="AUDIT_CONCURRENCY", type=int, metavar="N",
+                       help="languages processed in parallel")
+    audit.add_argument("--parse-workers", dest="PARSE_WORKERS", type=int, metavar="N",
+                       help="worker processes that decode bundles")
+    audit.add_argument("--validate", dest="VALIDATE_BUNDLES", action="store_const", const="1",
+                       help="also validate icon paths and chapters")
+    audit.add_argument("--no-stream", dest="STREAM_BUNDLES", action="store_const", const="0",
+                       help="download whole bundles before parsing")
+    audit.add_argument("--resume", action="store_const", const=True,
+                       help="skip languages finished by an earlier run (per-language checkpoints)")
+    audit.set_defaults(handler=_audit("test"))
+
+    mapping = commands.add_parser("audit-mapping", help="audit the asset_version folders of language_mapping.json (ide.py)")
+    mapping.add_argument("--resume", action="store_const", const=True,
+                         help="skip languages finished by an earlier run (per-language checkpoints)")
+    mapping.set_defaults(handler=_audit("ide"))
+
+    delete = commands.add_parser("delete", help="bulk-delete blobs with the Blob Batch API (delete.py)")
+    delete.add_argument("--list-file", dest="DELETE_LIST_FILE", metavar="FILE",
+                        help="delete the blobs listed in FILE, e.g. global_missed_blobs.txt")
+    delete.add_argument("--canonical", dest="DELETE_MATCH_CANONICAL", action="store_const", const="1",
+                        help="also match list entries to blobs by canonical path (e.g. audit report paths)")
+    delete.add_argument("--dry-run", dest="DELETE_DRY_RUN", action="store_const", const="1",
+                        help="count what would be deleted without deleting")
+    delete.add_argument("--batch-size", dest="DELETE_BATCH_SIZE", type=int, metavar="N")
+    delete.add_argument("--concurrency", dest="DELETE_CONCURRENCY", type=int, metavar="N")
+    delete.set_defaults(handler=_script("delete"))
+
+    validate = commands.add_parser("validate", help="validate local bundle files (bundle_validator.py)")
+    validate.add_argument("paths", nargs="*", metavar="FILE", help="bundle files (default: VALIDATE_JSON_FILE)")
+    validate.add_argument("--output", dest="VALIDATION_OUTPUT", metavar="FILE", help="write findings as JSON")
+    validate.set_defaults(handler=_validate)
+
+    dedup = commands.add_parser("dedup", help="find duplicate assets across asset_version folders (dedup.py)")
+    dedup.add_argument("--concurrency", dest="DEDUP_CONCURRENCY", type=int, metavar="N")
+    dedup.set_defaults(handler=_script("dedup"))
+
+    watch = commands.add_parser("watch", help="keep the audit-languages outputs up to date (watch.py)")
+    watch.add_argument("--interval", dest="WATCH_INTERVAL", type=float, metavar="SECONDS")
+    watch.add_argument("--source", dest="WATCH_SOURCE", choices=("poll", "changefeed"))
+    watch.set_defaults(handler=_script("watch"))
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    load_config(args.env_file)
+    for name, value in vars(args).items():
+        if name.isupper() and value is not None:
+            os.environ[name] = str(value)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+import os
+import threading
+
+# Every setting is an environment variable, optionally seeded from a .env
+# file. The .env file is read once per process, when a script's main() (or the
+# CLI) asks for it, never as a side effect of importing a module, so modules
+# stay cheap to import and variables already set in the environment win.
+
+_loaded = False
+_lock = threading.Lock()
+
+def load_config(env_file=None):
+    """Loads .env (or env_file) into os.environ on the first call; later calls do nothing."""
+    global _loaded
+    with _lock:
+        if _loaded:
+            return
+        from dotenv import load_dotenv
+        load_dotenv(env_file or os.getenv("ENV_FILE") or None)
+        _loaded = True
@@ -0,0 +1,175 @@
+import base64
+import hashlib
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from blob_listing import list_blobs_sharded
+from bundle_cache import bundle_src_values
+from canonical_path import canonical_path, canonical_paths
+from metrics import export_metrics, increment, stage
+from storage import get_container
+from throttle import print_throttle_stats, throttle_stats
+from config import load_config
+
+# Duplicate asset detection across the asset_version folders of
+# language_mapping.json, from listing metadata alone. Blobs are grouped by
+# (Content-MD5, size) as returned by the listing. Blobs uploaded without an
+# MD5 are only hashed when another blob has the same size, by downloading
+# them in ranges (several blobs at a time) and computing the MD5 Azure would
+# have stored, so they cluster with the blobs that do carry one. A blob that
+# fails to download is reported as unhashed and the run goes on. Empty blobs
+# are all identical, so they are grouped without downloading anything.
+
+RANGE_SIZE = 4 * 1024 * 1024
+EMPTY_MD5 = base64.b64encode(hashlib.md5(b"").digest()).decode("ascii")
+
+def listed_md5(blob):
+    content_settings = getattr(blob, "content_settings", None)
+    content_md5 = getattr(content_settings, "content_md5", None)
+    return base64.b64encode(bytes(content_md5)).decode("ascii") if content_md5 else None
+
+def hash_blob_ranges(container_client, blob_name, size, range_size=RANGE_SIZE):
+    """Downloads a blob range by range and returns its base64 MD5, holding one range in memory."""
+    blob_client = container_client.get_blob_client(blob_name)
+    md5 = hashlib.md5()
+    for offset in range(0, size, range_size):
+        data = blob_client.download_blob(offset=offset, length=min(range_size, size - offset)).readall()
+        md5.update(data)
+        increment("bytes_downloaded", len(data))
+    return base64.b64encode(md5.digest()).decode("ascii")
+
+def _try_hash(container_client, blob, range_size):
+    try:
+        return hash_blob_ranges(container_client, blob.name, blob.size, range_size), None
+    except Exception as error:
+        return None, f"{type(error).__name__}: {error}"
+
+def list_asset_blobs(container_client, prefixes):
+    """Lists each prefix once (sub-prefixes come from their root's listing) and returns {name: blob}."""
+    blobs = {}
+    root_prefix = None
+    for prefix in sorted(prefixes):
+        if root_prefix is not None and prefix.startswith(root_prefix):
+            continue
+        root_prefix = prefix
+        for blob in list_blobs_sharded(container_client, prefix):
+            blobs[blob.name] = blob
+    return blobs
+
+def find_duplicate_clusters(container_client, blobs, concurrency=8, range_size=RANGE_SIZE):
+    """Groups blobs with identical content and returns clusters of two or more, largest waste first.
+
+    Returns (clusters, number of blobs hashed, unhashed blobs), each cluster
+    being {"md5", "size", "names"} and each unhashed blob {"name", "size", "error"}.
+    """
+    sizes = defaultdict(int)
+    for blob in blobs:
+        sizes[blob.size] += 1
+
+    groups = defaultdict(list)
+    to_hash = []
+    for blob in blobs:
+        md5 = listed_md5(blob) or (EMPTY_MD5 if not blob.size else None)
+        if md5 is not None:
+            groups[(md5, blob.size)].append(blob.name)
+        elif sizes[blob.size] > 1:
+            # A blob with a unique size cannot have a duplicate, so it is never downloaded
+            to_hash.append(blob)
+
+    unhashed = []
+    if to_hash:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = executor.map(lambda blob: _try_hash(container_client, blob, range_size), to_hash)
+            for blob, (md5, error) in zip(to_hash, results):
+                if error is not None:
+                    unhashed.append({"name": blob.name, "size": blob.size, "error": error})
+                else:
+                    groups[(md5, blob.size)].append(blob.name)
+
+    clusters = [
+        {"md5": md5, "size": size, "names": sorted(names)}
+        for (md5, size), names in groups.items()
+        if len(names) > 1
+    ]
+    clusters.sort(key=lambda cluster: (-cluster["size"] * (len(cluster["names"]) - 1), cluster["md5"]))
+    return clusters, len(to_hash) - len(unhashed), unhashed
+
+def bundle_references(container_client, language_ids, paths):
+    """Maps each of the given canonical paths to the languages whose bundle references it."""
+    wanted = set(paths)
+    references = defaultdict(list)
+    for language_id in language_ids:
+        json_blob_path = f"{language_id}/content-bundle.json"
+        try:
+            src_values = canonical_paths(bundle_src_values(container_client, json_blob_path))
+        except Exception as error:
+            print(f"Skipping bundle {json_blob_path}: {error}")
+            continue
+        for path in set(src_values) & wanted:
+            references[path].append(language_id)
+    return references
+
+def build_report(clusters, references):
+    for cluster in clusters:
+        cluster["reclaimable_bytes"] = cluster["size"] * (len(cluster["names"]) - 1)
+        cluster["copies"] = [
+            {"name": name, "path": canonical_path(name), "referenced_by": sorted(references.get(canonical_path(name), []))}
+            for name in cluster.pop("names")
+        ]
+    return {
+        "clusters": clusters,
+        "duplicate_clusters": len(clusters),
+        "duplicate_blobs": sum(len(cluster["copies"]) for cluster in clusters),
+        "reclaimable_bytes": sum(cluster["reclaimable_bytes"] for cluster in clusters),
+    }
+
+def main():
+    from ide import plan_asset_prefixes
+
+    load_config()
+    container_name = os.getenv("BLOB_CONTAINER_ASSETS")
+    output_dir = os.getenv("OUTPUT_DIR", "draft5")
+    concurrency = int(os.getenv("DEDUP_CONCURRENCY", "8"))
+    range_size = int(os.getenv("DEDUP_RANGE_SIZE", str(RANGE_SIZE)))
+    with open("language_mapping.json", "r") as f:
+        language_mapping = json.load(f)
+
+    container_client = get_container(container_name)
+    _, unique_prefixes = plan_asset_prefixes(language_mapping)
+    with stage("list_assets"):
+        blobs = list_asset_blobs(container_client, unique_prefixes)
+    with stage("dedup"):
+        clusters, hashed, unhashed = find_duplicate_clusters(
+            container_client, list(blobs.values()), concurrency, range_size
+        )
+    duplicate_paths = [canonical_path(name) for cluster in clusters for name in cluster["names"]]
+    with stage("bundle_references"):
+        references = bundle_references(container_client, sorted(language_mapping), duplicate_paths)
+    report = build_report(clusters, references)
+    report["listed_blobs"] = len(blobs)
+    report["hashed_blobs"] = hashed
+    report["unhashed_blobs"] = unhashed
+
+    os.makedirs(output_dir, exist_ok=True)
+    full_path = os.path.join(output_dir, "duplicates.json")
+    with open(f"{full_path}.tmp", 'w') as file:
+        json.dump(report, file, indent=2)
+    os.replace(f"{full_path}.tmp", full_path)
+
+    print(f"Listed {len(blobs)} blobs, hashed {hashed} without a Content-MD5")
+    if unhashed:
+        print(f"{len(unhashed)} blobs could not be hashed and may hide duplicates (see unhashed_blobs):")
+        for blob in unhashed[:10]:
+            print(f"  {blob['name']}: {blob['error']}")
+    print(f"{report['duplicate_clusters']} duplicate clusters, {report['duplicate_blobs']} blobs, "
+          f"{report['reclaimable_bytes'] / (1024 * 1024):.1f} MiB reclaimable")
+    for cluster in report["clusters"][:10]:
+        print(f"  {cluster['size']} bytes x {len(cluster['copies'])}: "
+              + ", ".join(copy["name"] for copy in cluster["copies"]))
+    print(f"Duplicate report saved to: {full_path}")
+    print_throttle_stats()
+    export_metrics("dedup", throttle_stats())
+
+if __name__ == "__main__":
+    main()
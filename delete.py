@@ -1,44 +1,234 @@
 # vim .env 
 import os
-from azure.storage.blob import BlobServiceClient, ContainerClient
-from dotenv import load_dotenv
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import unquote
+from blob_listing import list_blobs_sharded
+from canonical_path import CONTENT_PREFIX, canonical_path
+from storage import get_container
+from throttle import print_throttle_stats
+from config import load_config
 
-load_dotenv()
+# The Blob Batch API accepts at most 256 sub-requests per batch
+MAX_BATCH_SIZE = 256
+PROGRESS_INTERVAL = 5.0
+UNRESOLVED_SHOWN = 20
 
-AZURE_CONNECTION_STRING = os.getenv("AZURE_CONNECTION_STRING")
-BLOB_CONTAINER = os.getenv("BLOB_CONTAINER")
+class DeleteProgress:
+    """Thread-safe counters for a bulk delete, logged as blobs/sec instead of one line per blob."""
 
-def delete_blob_directory(container_client, directory_path):
-    
-    blobs = container_client.list_blobs(name_starts_with=directory_path)
-    for blob in blobs:
-        print(f"Deleting blob: {blob.name}")
-        container_client.delete_blob(blob.name)
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.deleted = 0
+        self.failed = 0
+        self.failures = {}
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def record(self, deleted, failures):
+        with self._lock:
+            self.deleted += deleted
+            self.failed += len(failures)
+            for name, reason in failures:
+                self.failures[reason] = self.failures.get(reason, 0) + 1
+                print(f"Failed to delete {name}: {reason}")
+            now = time.monotonic()
+            if now - self._last_report >= PROGRESS_INTERVAL:
+                self._last_report = now
+                print(self._status(now))
+
+    def _status(self, now):
+        elapsed = max(now - self.started, 1e-9)
+        verb = "would delete" if self.dry_run else "deleted"
+        return (f"{verb} {self.deleted} blobs, {self.failed} failed, "
+                f"{(self.deleted + self.failed) / elapsed:.0f} blobs/sec")
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        print(f"Done in {elapsed:.1f}s: {self._status(time.monotonic())}")
+        for reason, count in sorted(self.failures.items(), key=lambda item: -item[1]):
+            print(f"  {count} x {reason}")
+
+def _batches(blob_names, batch_size):
+    batch = []
+    for name in blob_names:
+        batch.append(name)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _delete_batch(container_client, names, progress):
+    if progress.dry_run:
+        progress.record(len(names), [])
+        return
+    try:
+        responses = list(container_client.delete_blobs(*names, raise_on_any_failure=False))
+    except Exception as exc:  # the whole batch request failed
+        progress.record(0, [(name, f"batch failed: {exc}") for name in names])
+        return
+    failures = []
+    for name, response in zip(names, responses):
+        if response.status_code not in (200, 202):
+            error_code = response.headers.get("x-ms-error-code") if response.headers else None
+            failures.append((name, f"{response.status_code} {error_code or response.reason}"))
+    progress.record(len(names) - len(failures), failures)
+
+def delete_blobs_batched(container_client, blob_names, batch_size=MAX_BATCH_SIZE, concurrency=4, dry_run=False):
+    """Deletes blobs with the Blob Batch API, running up to `concurrency` batches at once."""
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    progress = DeleteProgress(dry_run)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = set()
+        for batch in _batches(blob_names, batch_size):
+            # Keep a bounded number of batches in flight so huge lists are never fully materialized
+            if len(pending) >= concurrency * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            pending.add(executor.submit(_delete_batch, container_client, batch, progress))
+        wait(pending)
+    progress.summary()
+    return progress
+
+def read_list_entries(list_file):
+    """Reads the non-empty lines of a delete list, e.g. test.py's global_missed_blobs.txt."""
+    with open(list_file, 'r') as file:
+        return [line.strip() for line in file if line.strip()]
+
+def _directory(name):
+    return name[:name.rfind("/") + 1]
 
-def delete_directory(path):
+def listing_prefixes(entries, canonical=False):
+    """Returns the directory prefixes to list to resolve the entries; nested ones come from their parent's listing.
+
+    With `canonical`, an entry such as '/content/assets/a%20b.png' also
+    needs 'assets/', the directory of a blob named 'assets/a b.png'.
+    """
+    directories = set()
+    for entry in entries:
+        directories.add(_directory(entry))
+        if canonical:
+            path = re.sub(r"/{2,}", "/", unquote(entry).replace("\\", "/")).lstrip("/")
+            directories.add(_directory(path))
+            content_root = f"{CONTENT_PREFIX.lstrip('/')}/"
+            if path.lower().startswith(content_root):
+                directories.add(_directory(path[len(content_root):]))
+    prefixes = []
+    for directory in sorted(directories):
+        if prefixes and directory.startswith(prefixes[-1]):
+            continue
+        prefixes.append(directory)
+    return prefixes
+
+def resolve_blob_names(container_client, entries, canonical=False):
+    """Maps delete list entries to the names of blobs that exist, listing only the directories they are in.
+
+    By default an entry must be a blob name exactly. With `canonical`, an
+    entry that is not a blob name (e.g. a path from an audit report) matches
+    the blob with the same canonical path, which only finds blobs whose
+    directory has the entry's letter case. An entry whose canonical path
+    belongs to several blobs is never deleted. Returns (blob names, entries
+    that matched no blob, {entry: blob names} for the ambiguous entries).
+    """
+    wanted_paths = {canonical_path(entry) for entry in entries} if canonical else set()
+    existing = set()
+    by_path = {}
+    for prefix in listing_prefixes(entries, canonical):
+        for blob in list_blobs_sharded(container_client, prefix):
+            existing.add(blob.name)
+            if canonical:
+                path = canonical_path(blob.name)
+                if path in wanted_paths:
+                    by_path.setdefault(path, []).append(blob.name)
+
+    names = []
+    seen = set()
+    unresolved = []
+    ambiguous = {}
+    for entry in entries:
+        if entry in existing:
+            matches = [entry]
+        else:
+            matches = by_path.get(canonical_path(entry), []) if canonical else []
+        if len(matches) > 1:
+            ambiguous[entry] = matches
+            continue
+        if not matches:
+            unresolved.append(entry)
+        for name in matches:
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+    return names, unresolved, ambiguous
+
+def report_entries(list_file, suffix, lines, message):
+    """Prints a sample of the skipped entries and writes all of them to <list_file>.<suffix>."""
+    report_file = f"{list_file}.{suffix}"
+    with open(report_file, 'w') as file:
+        for line in lines:
+            file.write(f"{line}\n")
+    print(f"{len(lines)} entries {message} (all of them are in {report_file}):")
+    for line in lines[:UNRESOLVED_SHOWN]:
+        print(f"  {line}")
+
+def delete_blob_directory(container_client, directory_path, **kwargs):
+    blob_names = (blob.name for blob in container_client.list_blobs(name_starts_with=directory_path))
+    return delete_blobs_batched(container_client, blob_names, **kwargs)
+
+def delete_directory(path, **kwargs):
     
-    blob_service_client = BlobServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
-    container_client = blob_service_client.get_container_client(BLOB_CONTAINER)
+    container_client = get_container(os.getenv("BLOB_CONTAINER"), os.getenv("AZURE_CONNECTION_STRING"))
 
-    delete_blob_directory(container_client, path)
+    return delete_blob_directory(container_client, path, **kwargs)
 
 def list_blobs_in_container(container_name):
-    connection_string = os.getenv("AZURE_CONNECTION_STRING")
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(container_name)
+    container_client = get_container(container_name)
     
     blobs = container_client.list_blobs()
     for blob in blobs:
         print(blob.name)
 
-list_blobs_in_container("localcontent")
+def main():
+    load_config()
+    options = {
+        "batch_size": int(os.getenv("DELETE_BATCH_SIZE", str(MAX_BATCH_SIZE))),
+        "concurrency": int(os.getenv("DELETE_CONCURRENCY", "4")),
+        "dry_run": os.getenv("DELETE_DRY_RUN", "0") not in ("0", "false", "False"),
+    }
+    delete_list_file = os.getenv("DELETE_LIST_FILE")
 
+    status = 0
+    if delete_list_file:
+        container_client = get_container(os.getenv("BLOB_CONTAINER"), os.getenv("AZURE_CONNECTION_STRING"))
+        entries = read_list_entries(delete_list_file)
+        canonical = os.getenv("DELETE_MATCH_CANONICAL", "0") not in ("0", "false", "False")
+        names, unresolved, ambiguous = resolve_blob_names(container_client, entries, canonical)
+        print(f"{len(entries)} entries in {delete_list_file} resolved to {len(names)} blobs")
+        if unresolved:
+            report_entries(delete_list_file, "unresolved", unresolved, "matched no blob")
+            status = 1
+        if ambiguous:
+            lines = ["\t".join([entry] + matches) for entry, matches in ambiguous.items()]
+            report_entries(delete_list_file, "ambiguous", lines, "matched several blobs and were skipped")
+            status = 1
+        progress = delete_blobs_batched(container_client, names, **options)
+        if progress.failed:
+            status = 1
+    else:
+        paths_to_delete = [ 
+        # provide a list of directory paths or followed by ' , ' [comma]
+            "content/assets/images/india/Delete/DL2",  
+        ]
 
-if __name__ == "__main__":
-    paths_to_delete = [ 
-    # provide a list of directory paths or followed by ' , ' [comma]
-        "content/assets/images/india/Delete/DL2",  
-    ]
+        for path in paths_to_delete:
+            if delete_directory(path, **options).failed:
+                status = 1
+    print_throttle_stats()
+    return status
 
-    for path in paths_to_delete:
-        delete_directory(path)
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,20 @@
 import os
 import json
-from azure.storage.blob import BlobServiceClient
-from dotenv import load_dotenv
-
-load_dotenv()
-
-output_dir = os.getenv("OUTPUT_DIR", "draft5")
-os.makedirs(output_dir, exist_ok=True)
-container_name = os.getenv("BLOB_CONTAINER_ASSETS")
+from urllib.parse import unquote
+from blob_clients import connection_stats, print_connection_stats
+from storage import get_container
+from bundle_cache import bundle_src_values, cache_stats, list_blob_names, print_cache_stats
+from canonical_path import blob_names_with_paths, canonical_path, canonical_paths
+from checkpoint import checkpoint_store_from_env, listing_digest, print_checkpoint_stats
+from json_decoder import decode_bundle
+from metrics import export_metrics, increment, stage, timed
+from pipelined_download import download_concurrency
+from src_extract import iter_values
+from throttle import print_throttle_stats, throttle_stats
+from config import load_config
+
+IMAGE_EXTENSIONS = ('.png',)
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi')
 
 def save_paths_to_file(directory, file_name, paths):
     os.makedirs(directory, exist_ok=True)  
@@ -18,89 +25,136 @@ def save_paths_to_file(directory, file_name, paths):
     
     print(f"Paths saved to: {full_path}")
 
-def normalize_path(path):
-    """Normalizes paths to lowercase and replaces backslashes with forward slashes."""
-    return path.replace("\\", "/").lower().strip()
-
-def retrieve_image_files_from_blob_storage(container_name, image_prefix):
-    """Find all .png file paths from Azure Blob Storage."""
-    connection_string = os.getenv("AZURE_CONNECTION_STRING")
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(container_name)
-
-    blob_paths = []
-    
-    # Retrieve image files
-    image_blobs = container_client.list_blobs(name_starts_with=image_prefix)
-    for blob in image_blobs:
-        if blob.name.endswith('.png'):
-            blob_path = normalize_path(f"/{blob.name}" if not blob.name.startswith('/') else blob.name)
-            blob_paths.append(blob_path)
-    
-    return blob_paths
-
-def retrieve_video_files_from_blob_storage(container_name, video_prefix):
-    """Find all video file paths from Azure Blob Storage."""
-    connection_string = os.getenv("AZURE_CONNECTION_STRING")
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(container_name)
-
-    blob_paths = []
-    
-    # Retrieve video files (consider supported video extensions here)
-    video_blobs = container_client.list_blobs(name_starts_with=video_prefix)
-    for blob in video_blobs:
-        # Check for video extensions (e.g., .mp4, .mkv)
-        if blob.name.endswith(('.mp4', '.mkv', '.avi', ...)):  # Add relevant extensions
-            blob_path = normalize_path(f"/{blob.name}" if not blob.name.startswith('/') else blob.name)
-            blob_paths.append(blob_path)
-    
-    return blob_paths
-
-def retrieve_json_file_from_blob(container_client, blob_name):
-    """Fetches a JSON file from a specific path in the Azure Blob Storage container."""
+@timed("download_bundle")
+def download_src_values(container_client, blob_name):
+    """Downloads a whole bundle, decodes it and extracts its 'src' values (STREAM_BUNDLES=0)."""
     blob_client = container_client.get_blob_client(blob_name)
-    json_content = blob_client.download_blob().readall()
-    return json.loads(json_content)
-
-def extract_src_values(json_data):
-    """Extract 'src' values from JSON data using recursion."""
-    src_values = []
-    if isinstance(json_data, list):
-        for item in json_data:
-            src_values.extend(extract_src_values(item))
-    elif isinstance(json_data, dict):
-        for key, value in json_data.items():
-            if key == 'src' and isinstance(value, str):
-                src_values.append(normalize_path(value.strip()))
-            else:
-                src_values.extend(extract_src_values(value))
-    return src_values
-
-def analyze_language(language_id, language_info, container_client):
+    json_content = blob_client.download_blob(max_concurrency=download_concurrency()).readall()
+    increment("bytes_downloaded", len(json_content))
+    with stage("parse"):
+        json_data = decode_bundle(json_content)
+    with stage("extract"):
+        return canonical_paths(iter_values(json_data))
+
+@timed("stream_bundle")
+def stream_src_values_from_blob(container_client, blob_name):
+    """Extracts 'src' values from a JSON blob while it downloads, without building the whole document."""
+    return canonical_paths(bundle_src_values(container_client, blob_name))
+
+def as_folder_prefix(prefix):
+    # Without the trailing "/", folder "mena" would also list "mena - ar/..."
+    return prefix if prefix.endswith("/") else f"{prefix}/"
+
+def parse_asset_version(language_info):
+    """Splits an "images, videos" asset_version into the image and video prefixes."""
+    parts = [unquote(part.strip()) for part in language_info["asset_version"].split(",")]
+    image_version = parts[0]
+    video_version = parts[1] if len(parts) > 1 else parts[0]
+    images_prefix_template = os.getenv("ASSET_IMAGES_PREFIX", "{}")
+    videos_prefix_template = os.getenv("ASSET_VIDEOS_PREFIX", "{}")
+    return (as_folder_prefix(images_prefix_template.format(image_version)),
+            as_folder_prefix(videos_prefix_template.format(video_version)))
+
+def plan_asset_prefixes(language_mapping):
+    """Maps each language to its (image prefix, video prefix) and collects the unique prefixes."""
+    language_prefixes = {
+        language_id: parse_asset_version(language_info)
+        for language_id, language_info in language_mapping.items()
+    }
+    unique_prefixes = sorted({prefix for prefixes in language_prefixes.values() for prefix in prefixes})
+    return language_prefixes, unique_prefixes
+
+def classify_blob_name(blob_name):
+    if blob_name.endswith(IMAGE_EXTENSIONS):
+        return "images"
+    if blob_name.endswith(VIDEO_EXTENSIONS):
+        return "videos"
+    return "other"
+
+@timed("list_assets")
+def list_asset_prefixes(container_name, prefixes):
+    """Lists each prefix once and sorts its blobs into images, videos and other media.
+
+    A prefix that starts with an already listed prefix is filtered from that
+    listing instead of being listed again. Returns {prefix: {kind: canonical
+    paths}} and {prefix: {kind: blob names}}.
+    """
+    container_client = get_container(container_name)
+    listed_names = {}
+    root_prefix = None
+    for prefix in sorted(prefixes):
+        if root_prefix is not None and prefix.startswith(root_prefix):
+            listed_names[prefix] = [name for name in listed_names[root_prefix] if name.startswith(prefix)]
+        else:
+            root_prefix = prefix
+            listed_names[prefix] = list_blob_names(container_client, prefix)
+
+    listings = {}
+    names_by_kind = {}
+    for prefix, names in listed_names.items():
+        groups = {"images": [], "videos": [], "other": []}
+        kind_names = {"images": [], "videos": [], "other": []}
+        for blob_name in names:
+            kind = classify_blob_name(blob_name)
+            groups[kind].append(canonical_path(blob_name))
+            kind_names[kind].append(blob_name)
+        listings[prefix] = groups
+        names_by_kind[prefix] = kind_names
+        print(f"Listed '{prefix}': {len(groups['images'])} images, {len(groups['videos'])} videos, "
+              f"{len(groups['other'])} other")
+    return listings, names_by_kind
+
+def language_output_files(language_id):
+    return [f"{language_id}_{kind}_paths.txt" for kind in ("common", "missing", "extra")]
+
+def analyze_language(language_id, image_paths, video_paths, container_client, output_dir, checkpoints=None,
+                     assets_digest=None, stream_bundles=True):
     # Retrieve content-bundle.json for the language
     json_blob_path = f"{language_id}/content-bundle.json"
-    json_data = retrieve_json_file_from_blob(container_client, json_blob_path)
-    json_src_values = extract_src_values(json_data)
-
-    # Retrieve image and video paths from the asset version
-    image_paths = retrieve_image_files_from_blob_storage(container_name, language_info["asset_version"][0])
-    video_paths = retrieve_video_files_from_blob_storage(container_name, language_info["asset_version"][1])
+    if checkpoints is not None:
+        # The ETag is read before the download, so a bundle replaced meanwhile is never resumed from
+        checkpoint_key = {
+            "bundle_etag": container_client.get_blob_client(json_blob_path).get_blob_properties().etag,
+            "listing_digest": assets_digest,
+            "variant": "src",
+        }
+        checkpoint = checkpoints.load(language_id, checkpoint_key)
+        if checkpoint is not None and all(
+            os.path.exists(os.path.join(output_dir, name)) for name in language_output_files(language_id)
+        ):
+            increment("languages_resumed")
+            return checkpoint["json_src_values"]
+    if stream_bundles:
+        json_src_values = stream_src_values_from_blob(container_client, json_blob_path)
+    else:
+        json_src_values = download_src_values(container_client, json_blob_path)
 
     # Compare JSON paths with asset paths
-    common_paths = set(json_src_values).intersection(set(image_paths + video_paths))
-    missing_paths = set(json_src_values).difference(set(image_paths + video_paths))
-    extra_paths = set(image_paths + video_paths).difference(set(json_src_values))
+    with stage("compare", language=language_id):
+        json_set = set(json_src_values)
+        asset_set = set(image_paths).union(video_paths)
+        common_paths = json_set.intersection(asset_set)
+        missing_paths = json_set.difference(asset_set)
+        extra_paths = asset_set.difference(json_set)
 
     # Save comparison results for the language
-    save_paths_to_file(output_dir, f"{language_id}_common_paths.txt", common_paths)
-    save_paths_to_file(output_dir, f"{language_id}_missing_paths.txt", missing_paths)
-    save_paths_to_file(output_dir, f"{language_id}_extra_paths.txt", extra_paths)
-
-    # Add JSON paths to the global set of used paths
-    global_used_paths.update(json_src_values)
+    with stage("write_reports"):
+        save_paths_to_file(output_dir, f"{language_id}_common_paths.txt", common_paths)
+        save_paths_to_file(output_dir, f"{language_id}_missing_paths.txt", missing_paths)
+        save_paths_to_file(output_dir, f"{language_id}_extra_paths.txt", extra_paths)
+
+    if checkpoints is not None:
+        checkpoints.save(language_id, checkpoint_key, {"json_src_values": json_src_values})
+    return json_src_values
+
+def main(resume=None):
+    load_config()
+    output_dir = os.getenv("OUTPUT_DIR", "draft5")
+    os.makedirs(output_dir, exist_ok=True)
+    container_name = os.getenv("BLOB_CONTAINER_ASSETS")
+    stream_bundles = os.getenv("STREAM_BUNDLES", "1") != "0"
+    checkpoints = checkpoint_store_from_env("ide", output_dir, resume)
 
-def main():
     # Load language mapping
     with open("language_mapping.json", "r") as f:
         language_mapping = json.load(f)
@@ -108,25 +162,62 @@ def main():
     global_used_paths = set()
 
     # Connect to Azure Blob Storage
-    connection_string = os.getenv("AZURE_CONNECTION_STRING")
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(container_name)
+    container_client = get_container(container_name)
+
+    # List every distinct asset prefix exactly once, up front
+    language_prefixes, unique_prefixes = plan_asset_prefixes(language_mapping)
+    listings, listed_names = list_asset_prefixes(container_name, unique_prefixes)
 
     # Iterate over languages
-    for language_id, language_info in language_mapping.items():
-        analyze_language(language_id, language_info, container_client)
+    all_image_paths = set()
+    all_video_paths = set()
+    digests = {}  # (image prefix, video prefix) -> listing digest keying the checkpoints
+    for language_id, (image_prefix, video_prefix) in language_prefixes.items():
+        image_paths = listings[image_prefix]["images"]
+        video_paths = listings[video_prefix]["videos"]
+        all_image_paths.update(image_paths)
+        all_video_paths.update(video_paths)
+        assets_digest = None
+        if checkpoints is not None:
+            if (image_prefix, video_prefix) not in digests:
+                digests[image_prefix, video_prefix] = listing_digest(image_paths + video_paths)
+            assets_digest = digests[image_prefix, video_prefix]
+        with stage("language", language=language_id):
+            json_src_values = analyze_language(
+                language_id, image_paths, video_paths, container_client, output_dir, checkpoints, assets_digest,
+                stream_bundles,
+            )
+        # Add JSON paths to the global set of used paths
+        global_used_paths.update(json_src_values)
 
     # Identify globally unused files
-    globally_unused_files = []
-    for image_path in image_paths:
-        if image_path not in global_used_paths:
-            globally_unused_files.append(image_path)
-    for video_path in video_paths:
-        if video_path not in global_used_paths:
-            globally_unused_files.append(video_path)
+    with stage("global_compare"):
+        globally_unused_files = []
+        for image_path in sorted(all_image_paths):
+            if image_path not in global_used_paths:
+                globally_unused_files.append(image_path)
+        for video_path in sorted(all_video_paths):
+            if video_path not in global_used_paths:
+                globally_unused_files.append(video_path)
 
     # Save globally unused files to a file
     save_paths_to_file(output_dir, "globally_unused.txt", globally_unused_files)
+    # The report holds canonical paths for comparison; deletes need the blob names behind them
+    unused_paths = set(globally_unused_files)
+    image_prefixes = {image_prefix for image_prefix, _ in language_prefixes.values()}
+    video_prefixes = {video_prefix for _, video_prefix in language_prefixes.values()}
+    unused_names = set()
+    for image_prefix in image_prefixes:
+        unused_names.update(blob_names_with_paths(listed_names[image_prefix]["images"], unused_paths))
+    for video_prefix in video_prefixes:
+        unused_names.update(blob_names_with_paths(listed_names[video_prefix]["videos"], unused_paths))
+    save_paths_to_file(output_dir, "globally_unused_blobs.txt", sorted(unused_names))
+    print_connection_stats()
+    print_cache_stats()
+    print_throttle_stats()
+    print_checkpoint_stats(checkpoints)
+    export_metrics("ide", connection_stats(), cache_stats(), throttle_stats(),
+                   checkpoints.stats() if checkpoints is not None else None)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,241 @@
+import base64
+import os
+import sqlite3
+import time
+from blob_listing import list_blobs_sharded
+
+# Local SQLite inventory of blob listings. A sync walks the listing once and
+# only writes rows that are new or whose ETag changed, then deletes rows that
+# disappeared. Each script maps blob names to the path form it compares in its
+# own way (run.py keeps case, new.py canonicalizes), so paths are stored per
+# path scheme next to the shared blob rows and scripts sharing one database do
+# not rewrite each other's paths. Comparison questions (common / missed /
+# json-only) are answered with indexed queries, so results can be streamed to
+# disk without holding every asset path in memory.
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    container TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    last_modified TEXT,
+    etag TEXT,
+    content_md5 TEXT,
+    PRIMARY KEY (container, name)
+);
+CREATE INDEX IF NOT EXISTS blobs_md5 ON blobs (content_md5, size);
+CREATE TABLE IF NOT EXISTS blob_paths (
+    container TEXT NOT NULL,
+    scheme TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (container, scheme, name)
+);
+CREATE INDEX IF NOT EXISTS blob_paths_path ON blob_paths (container, scheme, path);
+CREATE TABLE IF NOT EXISTS syncs (
+    id INTEGER PRIMARY KEY,
+    container TEXT NOT NULL,
+    scheme TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    listed INTEGER,
+    added INTEGER,
+    updated INTEGER,
+    removed INTEGER
+);
+"""
+
+UPSERT = """
+INSERT INTO blobs (container, name, size, last_modified, etag, content_md5)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (container, name) DO UPDATE SET
+    size = excluded.size,
+    last_modified = excluded.last_modified,
+    etag = excluded.etag,
+    content_md5 = excluded.content_md5
+WHERE blobs.etag IS NOT excluded.etag
+"""
+
+UPSERT_PATH = """
+INSERT INTO blob_paths (container, scheme, name, path) VALUES (?, ?, ?, ?)
+ON CONFLICT (container, scheme, name) DO UPDATE SET path = excluded.path
+WHERE blob_paths.path IS NOT excluded.path
+"""
+
+BATCH_SIZE = 5000
+
+def _blob_row(container_name, blob):
+    content_settings = getattr(blob, "content_settings", None)
+    content_md5 = getattr(content_settings, "content_md5", None)
+    last_modified = getattr(blob, "last_modified", None)
+    return (
+        container_name,
+        blob.name,
+        getattr(blob, "size", None),
+        last_modified.isoformat() if last_modified else None,
+        getattr(blob, "etag", None),
+        base64.b64encode(bytes(content_md5)).decode("ascii") if content_md5 else None,
+    )
+
+def _name_range(prefix, column="name"):
+    """(clause, params) selecting names that start with `prefix` as a range the primary key index can serve."""
+    if not prefix:
+        return "", []
+    # TEXT compares as UTF-8 bytes, which orders like code points, so bumping the
+    # last character gives the first name past every name with this prefix
+    last = ord(prefix[-1])
+    if last == 0x10FFFF:
+        return f" AND {column} >= ?", [prefix]
+    return f" AND {column} >= ? AND {column} < ?", [prefix, prefix[:-1] + chr(last + 1)]
+
+class Inventory:
+    def __init__(self, db_path, path_scheme="exact"):
+        """`path_scheme` names the blob-name-to-path mapping of the caller; paths are kept per scheme."""
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path_scheme = path_scheme
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS json_paths (path TEXT PRIMARY KEY)")
+
+    def _migrate(self):
+        # Version 1 kept a single path column in `blobs`; the inventory is rebuilt by the next sync
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            with self.conn:
+                self.conn.execute("DROP TABLE IF EXISTS blobs")
+                self.conn.execute("DROP TABLE IF EXISTS syncs")
+
+    def close(self):
+        self.conn.close()
+
+    def _count(self, container_name, prefix):
+        clause, params = _name_range(prefix)
+        return self.conn.execute(
+            f"SELECT COUNT(*) FROM blobs WHERE container = ?{clause}", [container_name, *params]
+        ).fetchone()[0]
+
+    def sync(self, container_client, prefix, to_path):
+        """Brings the inventory for a prefix in line with the container listing.
+
+        `to_path` maps a blob name to the path form of this inventory's path
+        scheme. Returns a dict with listed/added/updated/removed counts; paths
+        written for the scheme alone (its first sync) are not counted as updates.
+        """
+        prefix = prefix or ""
+        container_name = container_client.container_name
+        conn = self.conn
+        started = time.time()
+        before = self._count(container_name, prefix)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (name TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM seen")
+
+        listed = 0
+        written = 0
+        batch = []
+        with conn:
+            for blob in list_blobs_sharded(container_client, prefix):
+                batch.append(blob)
+                if len(batch) >= BATCH_SIZE:
+                    written += self._apply_batch(container_name, batch, to_path)
+                    listed += len(batch)
+                    batch = []
+            if batch:
+                written += self._apply_batch(container_name, batch, to_path)
+                listed += len(batch)
+            clause, params = _name_range(prefix)
+            removed = conn.execute(
+                f"DELETE FROM blobs WHERE container = ?{clause} AND name NOT IN (SELECT name FROM seen)",
+                [container_name, *params],
+            ).rowcount
+            conn.execute(
+                f"DELETE FROM blob_paths WHERE container = ?{clause} AND name NOT IN (SELECT name FROM seen)",
+                [container_name, *params],
+            )
+            after = before - removed
+            added = self._count(container_name, prefix) - after
+            stats = {"listed": listed, "added": added, "updated": written - added, "removed": removed}
+            conn.execute(
+                "INSERT INTO syncs (container, scheme, prefix, started, finished, listed, added, updated, removed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (container_name, self.path_scheme, prefix, started, time.time(), listed, added, stats["updated"],
+                 removed),
+            )
+        conn.execute("DELETE FROM seen")
+        return stats
+
+    def _apply_batch(self, container_name, blobs, to_path):
+        """Writes a listing batch and returns how many blob rows were inserted or changed."""
+        conn = self.conn
+        changes_before = conn.total_changes
+        conn.executemany(UPSERT, (_blob_row(container_name, blob) for blob in blobs))
+        written = conn.total_changes - changes_before
+        conn.executemany(
+            UPSERT_PATH, ((container_name, self.path_scheme, blob.name, to_path(blob.name)) for blob in blobs)
+        )
+        conn.executemany("INSERT OR IGNORE INTO seen (name) VALUES (?)", ((blob.name,) for blob in blobs))
+        return written
+
+    def load_json_paths(self, paths):
+        """Replaces the set of bundle paths the comparison queries run against."""
+        with self.conn:
+            self.conn.execute("DELETE FROM json_paths")
+            self.conn.executemany("INSERT OR IGNORE INTO json_paths (path) VALUES (?)", ((path,) for path in paths))
+
+    def _scope(self, container_name, prefix, suffix):
+        # The prefix is a range on the primary key; no index can serve the suffix,
+        # so it is only tested on the names inside that range
+        name_clause, params = _name_range(prefix, "b.name")
+        clause = "b.container = ? AND b.scheme = ?" + name_clause
+        params = [container_name, self.path_scheme, *params]
+        if suffix:
+            clause += " AND substr(b.name, -?) = ?"
+            params += [len(suffix), suffix]
+        return clause, params
+
+    def _query(self, sql, params):
+        cursor = self.conn.execute(sql, params)
+        for (value,) in cursor:
+            yield value
+
+    def blob_paths(self, container_name, prefix, suffix=None):
+        """Yields the path of every inventoried blob in scope, in name order."""
+        clause, params = self._scope(container_name, prefix, suffix)
+        return self._query(f"SELECT b.path FROM blob_paths b WHERE {clause} ORDER BY b.name", params)
+
+    def common_paths(self, container_name, prefix, suffix=None):
+        clause, params = self._scope(container_name, prefix, suffix)
+        return self._query(
+            f"SELECT DISTINCT b.path FROM blob_paths b JOIN json_paths j ON j.path = b.path WHERE {clause}", params
+        )
+
+    def missed_paths(self, container_name, prefix, suffix=None):
+        """Paths present in the container but not referenced by the loaded bundle paths."""
+        clause, params = self._scope(container_name, prefix, suffix)
+        return self._query(
+            f"SELECT DISTINCT b.path FROM blob_paths b WHERE {clause} "
+            "AND NOT EXISTS (SELECT 1 FROM json_paths j WHERE j.path = b.path)",
+            params,
+        )
+
+    def json_only_paths(self, container_name, prefix, suffix=None):
+        """Loaded bundle paths with no matching blob in scope."""
+        clause, params = self._scope(container_name, prefix, suffix)
+        return self._query(
+            f"SELECT j.path FROM json_paths j WHERE NOT EXISTS (SELECT 1 FROM blob_paths b WHERE b.path = j.path AND {clause})",
+            params,
+        )
+
+    def duplicate_paths(self, container_name, prefix, suffix=None):
+        clause, params = self._scope(container_name, prefix, suffix)
+        return self._query(
+            f"SELECT b.path FROM blob_paths b WHERE {clause} GROUP BY b.path HAVING COUNT(*) > 1", params
+        )
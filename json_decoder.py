@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+
+# Pluggable JSON decoding for bundles. JSON_DECODER picks the backend:
+# "auto" (default) uses orjson, then pysimdjson, when installed and falls back
+# to the stdlib json module; "orjson", "simdjson" and "json" force one.
+# JSON_DECODE_SECTIONS optionally names the top-level keys that can contain
+# src values (e.g. "procedures,actioncards,modules"); only those subtrees are
+# decoded. simdjson materializes just the selected sections from its lazy
+# document; the other backends decode everything and then drop the rest.
+# Bundles saved by Windows tools can start with a UTF-8 BOM, which orjson
+# rejects, so a leading BOM is dropped before any backend sees the data.
+
+UTF8_BOM = b"\xef\xbb\xbf"
+
+class StdlibDecoder:
+    name = "json"
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def loads_sections(self, data, sections):
+        document = self.loads(data)
+        if not isinstance(document, dict):
+            return document
+        return {key: document[key] for key in sections if key in document}
+
+class OrjsonDecoder(StdlibDecoder):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._loads = orjson.loads
+
+    def loads(self, data):
+        return self._loads(data)
+
+class SimdjsonDecoder(StdlibDecoder):
+    name = "simdjson"
+
+    def __init__(self):
+        import simdjson
+        self._simdjson = simdjson
+        # A parser is reused across documents but must not be shared between threads
+        self._local = threading.local()
+
+    def _parser(self):
+        parser = getattr(self._local, "parser", None)
+        if parser is None:
+            parser = self._local.parser = self._simdjson.Parser()
+        return parser
+
+    @staticmethod
+    def _materialize(value):
+        if hasattr(value, "as_dict"):
+            return value.as_dict()
+        if hasattr(value, "as_list"):
+            return value.as_list()
+        return value
+
+    def loads(self, data):
+        document = self._parser().parse(data)
+        try:
+            return self._materialize(document)
+        finally:
+            # The parser can only be reused once no proxy into the previous document is alive
+            del document
+
+    def loads_sections(self, data, sections):
+        document = self._parser().parse(data)
+        try:
+            if not hasattr(document, "as_dict"):
+                return self._materialize(document)
+            return {key: self._materialize(document[key]) for key in sections if key in document}
+        finally:
+            del document
+
+BACKENDS = {
+    "orjson": OrjsonDecoder,
+    "simdjson": SimdjsonDecoder,
+    "json": StdlibDecoder,
+}
+AUTO_ORDER = ("orjson", "simdjson", "json")
+
+def available_decoders():
+    """Returns the names of the backends that can be imported here."""
+    names = []
+    for name in AUTO_ORDER:
+        try:
+            BACKENDS[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+def make_decoder(name="auto"):
+    if name == "auto":
+        for candidate in AUTO_ORDER:
+            try:
+                return BACKENDS[candidate]()
+            except ImportError:
+                continue
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON decoder '{name}', expected one of: auto, {', '.join(BACKENDS)}")
+    try:
+        return BACKENDS[name]()
+    except ImportError as error:
+        raise ImportError(f"JSON_DECODER={name} but the backend is not installed: {error}") from error
+
+_decoder = None
+_decoder_lock = threading.Lock()
+
+def get_decoder():
+    """Returns the shared decoder selected by JSON_DECODER."""
+    global _decoder
+    with _decoder_lock:
+        if _decoder is None:
+            _decoder = make_decoder(os.getenv("JSON_DECODER", "auto"))
+    return _decoder
+
+def decode_sections_from_env():
+    return [section.strip() for section in os.getenv("JSON_DECODE_SECTIONS", "").split(",") if section.strip()]
+
+def strip_bom(data):
+    """Drops a leading byte order mark from bytes or str data."""
+    if isinstance(data, str):
+        return data[1:] if data.startswith("\ufeff") else data
+    return data[len(UTF8_BOM):] if data[:len(UTF8_BOM)] == UTF8_BOM else data
+
+def decode_bundle(data, sections=None):
+    """Decodes a bundle with the configured backend, restricted to JSON_DECODE_SECTIONS when set."""
+    decoder = get_decoder()
+    data = strip_bom(data)
+    sections = decode_sections_from_env() if sections is None else sections
+    if sections:
+        return decoder.loads_sections(data, sections)
+    return decoder.loads(data)
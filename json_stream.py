@@ -0,0 +1,190 @@
+import codecs
+import json
+import re
+
+# Incremental JSON event parser. Chunks of bytes (or str) are decoded and
+# tokenized as they arrive, so only the unparsed tail of the input is held
+# in memory at any time. The token order is checked against the JSON grammar,
+# so a corrupt bundle raises instead of yielding a partial set of values.
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Raw control characters (U+0000-U+001F) are not allowed inside strings, as in json.loads
+_STRING_BODY = r'"[^"\\\x00-\x1f]*(?:\\[^\x00-\x1f][^"\\\x00-\x1f]*)*'
+_STRING = re.compile(_STRING_BODY + '"')
+_STRING_PREFIX = re.compile(_STRING_BODY)
+_BARE = re.compile(r'[-+.0-9A-Za-z]+')
+_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?')
+_LITERALS = {"true": ("boolean", True), "false": ("boolean", False), "null": ("null", None)}
+
+# Parser states: what the grammar allows next
+_VALUE, _VALUE_OR_END, _KEY, _KEY_OR_END, _COLON, _COMMA_OR_END, _DONE = range(7)
+_EXPECTED = {_KEY: "a key", _KEY_OR_END: "a key or '}'", _COLON: "':'", _COMMA_OR_END: "',' or a closing bracket"}
+
+class JsonStreamParser:
+    """Yields (event, value) pairs for a JSON document read from an iterable of chunks.
+
+    Events follow the usual streaming convention: start_map, map_key, end_map,
+    start_array, end_array, string, number, boolean and null. The `line` and
+    `column` attributes give the 1-based position of the token that produced
+    the last event.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        # utf-8-sig drops a leading byte order mark, which json.loads also accepts
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._started = False
+        self._buf = ""
+        self._pos = 0
+        self._line_start = 0
+        self._eof = False
+        self._current_line = 1
+        self.line = 1
+        self.column = 1
+
+    def _fill(self):
+        """Appends the next non-empty chunk to the buffer. Returns False at end of input."""
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            text = chunk if isinstance(chunk, str) else self._decoder.decode(chunk)
+            if text and not self._started:
+                self._started = True
+                if text[0] == "\ufeff":
+                    text = text[1:]
+            if text:
+                self._append(text)
+                return True
+        self._eof = True
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self._append(tail)
+            return True
+        return False
+
+    def _append(self, text):
+        self._buf = self._buf[self._pos:] + text
+        self._line_start -= self._pos
+        self._pos = 0
+
+    def _error(self, message):
+        return ValueError(f"{message} at line {self._current_line}, column {self._pos - self._line_start + 1}")
+
+    def _token_error(self, message):
+        return ValueError(f"{message} at line {self.line}, column {self.column}")
+
+    def _next_token(self):
+        while True:
+            buf = self._buf
+            start = self._pos
+            end = _WHITESPACE.match(buf, start).end()
+            if end > start:
+                newlines = buf.count("\n", start, end)
+                if newlines:
+                    self._current_line += newlines
+                    self._line_start = buf.rindex("\n", start, end) + 1
+                self._pos = end
+            if end == len(buf):
+                if self._fill():
+                    continue
+                return None
+
+            self.line = self._current_line
+            self.column = end - self._line_start + 1
+            char = buf[end]
+            if char == '"':
+                match = _STRING.match(buf, end)
+                if match is None:
+                    stop = _STRING_PREFIX.match(buf, end).end()
+                    if buf[stop:stop + 1] == "\\":
+                        stop += 1
+                    if stop < len(buf):
+                        # The string can only continue with a control character, so it is invalid
+                        raise ValueError(f"Invalid control character {buf[stop]!r} in string at line {self.line}, "
+                                         f"column {self.column + stop - end}")
+                    if self._fill():
+                        continue
+                    raise self._error("Unterminated string")
+                self._pos = match.end()
+                raw = match.group()
+                return "string", (json.loads(raw) if "\\" in raw else raw[1:-1])
+            if char in "{}[]:,":
+                self._pos = end + 1
+                return char, None
+            match = _BARE.match(buf, end)
+            if match is None:
+                raise self._error(f"Unexpected character {char!r}")
+            if match.end() == len(buf) and self._fill():
+                continue
+            self._pos = match.end()
+            raw = match.group()
+            if raw in _LITERALS:
+                return _LITERALS[raw]
+            if _NUMBER.fullmatch(raw) is None:
+                raise self._error(f"Invalid literal {raw!r}")
+            return "number", (float(raw) if any(c in raw for c in ".eE") else int(raw))
+
+    def __iter__(self):
+        stack = []  # True for objects, False for arrays
+        state = _VALUE
+        while True:
+            token = self._next_token()
+            if token is None:
+                if state != _DONE:
+                    raise self._error("Unexpected end of JSON input")
+                return
+            kind, value = token
+            if state == _DONE:
+                raise self._token_error("Extra data after the JSON document")
+            if kind == "string" and (state == _KEY or state == _KEY_OR_END):
+                state = _COLON
+                yield "map_key", value
+                continue
+            if kind == ":":
+                if state != _COLON:
+                    raise self._token_error("Unexpected ':'")
+                state = _VALUE
+                continue
+            if kind == ",":
+                if state != _COMMA_OR_END:
+                    raise self._token_error("Unexpected ','")
+                state = _KEY if stack[-1] else _VALUE
+                continue
+            if kind == "}" or kind == "]":
+                is_map = kind == "}"
+                allowed = _KEY_OR_END if is_map else _VALUE_OR_END
+                if not stack or stack[-1] != is_map or (state != allowed and state != _COMMA_OR_END):
+                    raise self._token_error(f"Unexpected {kind!r}")
+                stack.pop()
+                state = _COMMA_OR_END if stack else _DONE
+                yield ("end_map" if is_map else "end_array"), None
+                continue
+            if state != _VALUE and state != _VALUE_OR_END:
+                raise self._token_error(f"Unexpected {kind if kind in '{[' else 'value'} where {_EXPECTED[state]} was expected")
+            if kind == "{":
+                stack.append(True)
+                state = _KEY_OR_END
+                yield "start_map", None
+            elif kind == "[":
+                stack.append(False)
+                state = _VALUE_OR_END
+                yield "start_array", None
+            else:
+                state = _COMMA_OR_END if stack else _DONE
+                yield kind, value
+
+def iter_src_values(chunks, keys=("src",)):
+    """Yields stripped string values of the given keys while the document is still being read."""
+    keys = frozenset(keys)
+    pending = False
+    for event, value in JsonStreamParser(chunks):
+        if event == "map_key":
+            pending = value in keys
+            continue
+        if pending and event == "string":
+            yield value.strip()
+        pending = False
+
+def iter_blob_src_values(blob_client, keys=("src",)):
+    """Streams a blob download chunk by chunk through iter_src_values."""
+    return iter_src_values(blob_client.download_blob().chunks(), keys)
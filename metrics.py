@@ -0,0 +1,198 @@
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Run instrumentation shared by every script. Stages are timed with
+# `stage()` / `@timed()`, optionally labelled (e.g. per language), and plain
+# counters track list pages, blobs, bytes downloaded and so on. At the end of
+# a run the scripts print a summary and, when METRICS_DIR is set, export a
+# JSON run summary plus a Prometheus textfile for node_exporter's textfile
+# collector.
+
+METRIC_PREFIX = "blob_audit"
+_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+class RunMetrics:
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def add_time(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            entry = self.stages.setdefault(key, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+
+    def increment(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def summary(self):
+        def entries(items):
+            return [{"name": name, "labels": dict(labels), **value} for (name, labels), value in items]
+
+        with self._lock:
+            return {
+                "started_at": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+                "duration_seconds": time.time() - self.started,
+                "peak_rss_bytes": peak_rss_bytes(),
+                "stages": entries(sorted(self.stages.items())),
+                "counters": entries((key, {"value": value}) for key, value in sorted(self.counters.items())),
+                "gauges": entries((key, {"value": value}) for key, value in sorted(self.gauges.items())),
+            }
+
+_metrics = RunMetrics()
+
+def get_metrics():
+    return _metrics
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where the resource module is unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+@contextmanager
+def stage(name, **labels):
+    """Times the enclosed block as one call of stage `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _metrics.add_time(name, time.perf_counter() - start, **labels)
+
+def timed(name):
+    """Decorator form of stage() for whole functions."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def increment(name, value=1, **labels):
+    _metrics.increment(name, value, **labels)
+
+def set_gauge(name, value, **labels):
+    _metrics.set_gauge(name, value, **labels)
+
+def count_bytes(chunks, name="bytes_downloaded"):
+    """Passes chunks through while adding their sizes to a counter."""
+    for chunk in chunks:
+        _metrics.increment(name, len(chunk))
+        yield chunk
+
+def _metric_name(name):
+    return f"{METRIC_PREFIX}_{_NAME.sub('_', name)}"
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{_NAME.sub("_", key)}="{_label_value(value)}"' for key, value in labels) + "}"
+
+def prometheus_text(job):
+    """Renders the current metrics in the Prometheus text exposition format."""
+    summary_labels = (("job", job),)
+    lines = []
+    with _metrics._lock:
+        stages = sorted(_metrics.stages.items())
+        counters = sorted(_metrics.counters.items())
+        gauges = sorted(_metrics.gauges.items())
+
+    def family(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_label_text(summary_labels + labels)} {value}")
+
+    if stages:
+        family(_metric_name("stage_seconds"), "gauge", "Wall time spent in each stage of the run.",
+               [((("stage", name),) + labels, f"{entry['seconds']:.6f}") for (name, labels), entry in stages])
+        family(_metric_name("stage_calls"), "gauge", "Number of times each stage ran.",
+               [((("stage", name),) + labels, entry["calls"]) for (name, labels), entry in stages])
+    for metric in sorted({name for (name, _), _ in counters}):
+        family(_metric_name(f"{metric}_total"), "counter", f"Total {metric.replace('_', ' ')} during the run.",
+               [(labels, value) for (name, labels), value in counters if name == metric])
+    for metric in sorted({name for (name, _), _ in gauges}):
+        family(_metric_name(metric), "gauge", f"{metric.replace('_', ' ').capitalize()} at the end of the run.",
+               [(labels, value) for (name, labels), value in gauges if name == metric])
+    rss = peak_rss_bytes()
+    if rss is not None:
+        family(_metric_name("peak_rss_bytes"), "gauge", "Peak resident set size of the process.", [((), rss)])
+    family(_metric_name("duration_seconds"), "gauge", "Wall time of the whole run.",
+           [((), f"{time.time() - _metrics.started:.3f}")])
+    family(_metric_name("last_run_timestamp_seconds"), "gauge", "Unix time the run finished.",
+           [((), f"{time.time():.0f}")])
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+def export_metrics(job, *gauge_sources, directory=None):
+    """Records the given {name: number} dicts as gauges, prints a stage summary and writes the exports.
+
+    Files go to METRICS_DIR (or `directory`) as <job>_metrics.json and <job>.prom;
+    nothing is written when neither is set.
+    """
+    for source in gauge_sources:
+        for name, value in (source or {}).items():
+            if isinstance(value, (int, float)):
+                set_gauge(name, value)
+    print_metrics_summary()
+
+    directory = directory or os.getenv("METRICS_DIR")
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    summary = _metrics.summary()
+    summary["job"] = job
+    json_path = os.path.join(directory, f"{job}_metrics.json")
+    _write_atomic(json_path, json.dumps(summary, indent=2))
+    _write_atomic(os.path.join(directory, f"{job}.prom"), prometheus_text(job))
+    print(f"Metrics saved to: {json_path}")
+    return summary
+
+def print_metrics_summary():
+    with _metrics._lock:
+        totals = {}
+        for (name, _), entry in _metrics.stages.items():
+            seconds, calls = totals.get(name, (0.0, 0))
+            totals[name] = (seconds + entry["seconds"], calls + entry["calls"])
+    for name, (seconds, calls) in sorted(totals.items(), key=lambda item: -item[1][0]):
+        print(f"Stage {name}: {seconds:.2f}s over {calls} call(s)")
+    rss = peak_rss_bytes()
+    if rss is not None:
+        print(f"Peak RSS: {rss / (1024 * 1024):.1f} MiB")
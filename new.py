@@ -1,104 +1,71 @@
 import os
-import json
-from azure.storage.blob import BlobServiceClient
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Directories and environment configurations
-output_dir = os.getenv("OUTPUT_DIR", "draft5")
-os.makedirs(output_dir, exist_ok=True)
-
-def save_paths_to_file(directory, file_name, paths):
-    os.makedirs(directory, exist_ok=True)  
-    full_path = os.path.join(directory, file_name)
-             
-    with open(full_path, 'w') as file:
-        for path in paths:
-            file.write(f"{path}\n")
-    
-    print(f"Paths saved to: {full_path}")
-
-def normalize_path(path):
-    """Normalizes paths to lowercase and replaces backslashes with forward slashes."""
-    return path.replace("\\", "/").lower().strip()
-
-def update_blob_paths(blob_paths):
-    """Update and normalize blob paths."""
-    updated_paths = []
-    for path in blob_paths:
-        updated_path = normalize_path(f"/content{path}".replace(' ', '%20'))
-        updated_paths.append(updated_path)
-    return updated_paths
-
+from blob_clients import connection_stats, print_connection_stats
+from storage import get_container
+from bundle_cache import bundle_src_values, cache_stats, list_blob_names, print_cache_stats
+from canonical_path import canonical_path, canonical_paths, clear_canonical_cache
+from inventory import Inventory
+from json_decoder import decode_bundle
+from metrics import export_metrics, increment, stage, timed
+from path_store import make_path_set
+from pipelined_download import download_concurrency
+from report_writer import report_writer_from_env
+from src_extract import iter_values
+from throttle import print_throttle_stats, throttle_stats
+from config import load_config
+
+@timed("list_assets")
 def retrieve_image_files_from_blob_storage(container_name, image_prefix):
-    """Find all .png file paths from Azure Blob Storage."""
-    connection_string = os.getenv("AZURE_CONNECTION_STRING")
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(container_name)
+    """Find all .png files in Azure Blob Storage, as canonical paths."""
+    container_client = get_container(container_name)
 
     blob_paths = []
     
     # Retrieve image files
-    image_blobs = container_client.list_blobs(name_starts_with=image_prefix)
-    for blob in image_blobs:
-        if blob.name.endswith('.png'):
-            blob_path = normalize_path(f"/{blob.name}" if not blob.name.startswith('/') else blob.name)
-            blob_paths.append(blob_path)
+    for blob_name in list_blob_names(container_client, image_prefix):
+        if blob_name.endswith('.png'):
+            blob_paths.append(canonical_path(blob_name))
     
     return blob_paths
 
+@timed("download_bundle")
 def retrieve_json_file_from_blob(container_name, json_blob_path):
     """Fetches a JSON file from a specific path in the Azure Blob Storage container."""
-    connection_string = os.getenv("AZURE_CONNECTION_STRING")
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(container_name)
+    container_client = get_container(container_name)
     
     blob_client = container_client.get_blob_client(json_blob_path)
-    json_content = blob_client.download_blob().readall()
-    return json.loads(json_content)
-
+    json_content = blob_client.download_blob(max_concurrency=download_concurrency()).readall()
+    increment("bytes_downloaded", len(json_content))
+    with stage("parse"):
+        return decode_bundle(json_content)
+
+@timed("stream_bundle")
+def stream_src_values_from_blob(container_name, json_blob_path):
+    """Extracts 'src' values from a JSON blob while it downloads, without building the whole document."""
+    container_client = get_container(container_name)
+    return canonical_paths(bundle_src_values(container_client, json_blob_path))
+
+@timed("extract")
 def extract_src_values(json_data):
-    """Extract 'src' values from JSON data using recursion."""
-    src_values = []
-    if isinstance(json_data, list):
-        for item in json_data:
-            src_values.extend(extract_src_values(item))
-    elif isinstance(json_data, dict):
-        for key, value in json_data.items():
-            if key == 'src' and isinstance(value, str):
-                src_values.append(normalize_path(value.strip()))
-            else:
-                src_values.extend(extract_src_values(value))
-    return src_values
-
-def count_lines_twice(file_path):
-    """Check line count twice to ensure accurate results."""
-    def count_lines_in_file(fp):
-        with open(fp, 'r') as file:
-            return sum(1 for line in file)
-
-    first_count = count_lines_in_file(file_path)
-    second_count = count_lines_in_file(file_path)
-    
-    if first_count != second_count:
-        print(f"Warning: Inconsistent line count in {file_path} (first: {first_count}, second: {second_count})")
-    else:
-        print(f"{file_path} consistently has {first_count} lines.")
-    return first_count
+    """Extract 'src' values from JSON data without recursion."""
+    return canonical_paths(iter_values(json_data))
+
+def retrieve_json_src_values(json_container, json_blob_path, stream_bundles):
+    """Retrieves the JSON file and extracts its src values."""
+    if stream_bundles:
+        return stream_src_values_from_blob(json_container, json_blob_path)
+    json_data = retrieve_json_file_from_blob(json_container, json_blob_path)
+    return extract_src_values(json_data)
 
 def find_duplicates(paths):
     from collections import Counter
     return {path for path, count in Counter(paths).items() if count > 1}
 
-def verify_counts(blob_files, json_src_values, common_paths, missed_paths, json_only_paths):
-    blob_total = len(blob_files)
-    json_total = len(json_src_values)
-    common_total = len(common_paths)
-    missed_total = len(missed_paths)
-    json_only_total = len(json_only_paths)
-    
+def verify_manifest_counts(manifest, output_files):
+    """Checks the comparison totals against the line counts recorded in the report manifest."""
+    files = manifest["files"]
+    verify_count_totals(*(files[file_name]["lines"] for file_name in output_files))
+
+def verify_count_totals(blob_total, json_total, common_total, missed_total, json_only_total):
     if common_total + missed_total == blob_total:
         print(f"✔ Common ({common_total}) + Missed ({missed_total}) = Total Blob Paths ({blob_total})")
     else:
@@ -111,12 +78,50 @@ def verify_counts(blob_files, json_src_values, common_paths, missed_paths, json_
         print(f"✘ Common ({common_total}) + JSON-only ({json_only_total}) != Total JSON Paths ({json_total})")
         # print(f"Missing paths in JSON set: {json_total - (common_total + json_only_total)}")
 
+def compare_with_inventory(writer, inventory_db, assets_container, image_prefix, json_src_values, output_files):
+    """Runs the comparison against the local SQLite inventory instead of in-memory sets."""
+    blob_output_file, json_output_file, common_output_file, missed_output_file, json_only_output_file = output_files
+    inventory = Inventory(inventory_db, path_scheme="canonical")
+    try:
+        with stage("inventory_sync"):
+            stats = inventory.sync(get_container(assets_container), image_prefix, canonical_path)
+        print(f"Inventory synced: {stats['listed']} listed, {stats['added']} added, "
+              f"{stats['updated']} updated, {stats['removed']} removed")
+        inventory.load_json_paths(json_src_values)
+
+        # The queries stream straight into the report files, so comparing and writing are one stage here
+        with stage("compare_and_write"):
+            scope = (assets_container, image_prefix, '.png')
+            writer.write(blob_output_file, inventory.blob_paths(*scope))
+            writer.write(json_output_file, json_src_values)
+            writer.write(common_output_file, inventory.common_paths(*scope))
+            writer.write(missed_output_file, inventory.missed_paths(*scope))
+            writer.write(json_only_output_file, inventory.json_only_paths(*scope))
+
+            blob_duplicates = set(inventory.duplicate_paths(*scope))
+    finally:
+        inventory.close()
+    json_duplicates = find_duplicates(json_src_values)
+
+    if blob_duplicates:
+        print(f"Warning: Duplicates found in Blob paths: {blob_duplicates}")
+    if json_duplicates:
+        print(f"Warning: Duplicates found in JSON paths: {json_duplicates}")
+
+    manifest = writer.write_manifest()
+    verify_manifest_counts(manifest, output_files)
+
 def main():
+    load_config()
+    output_dir = os.getenv("OUTPUT_DIR", "draft5")
+    os.makedirs(output_dir, exist_ok=True)
+
     # Container and blob configurations from environment variables
     assets_container = os.getenv("BLOB_CONTAINER_ASSETS")
     image_prefix = os.getenv("BLOB_IMAGES_PREFIX")
     json_container = os.getenv("BLOB_CONTAINER_JSON")
     json_blob_path = os.getenv("JSON_BLOB_PATH")
+    stream_bundles = os.getenv("STREAM_BUNDLES", "1") != "0"
 
     blob_output_file = "blob_src.txt"
     json_output_file = "json_src.txt"
@@ -124,47 +129,63 @@ def main():
     missed_output_file = "missed_path_src.txt"
     json_only_output_file = "json_only_path_src.txt"
 
-    # Retrieve Blob files (images) and save to blob_src.txt
+    output_files = [blob_output_file, json_output_file, common_output_file, missed_output_file, json_only_output_file]
+    writer = report_writer_from_env(output_dir)
+
+    inventory_db = os.getenv("INVENTORY_DB")
+    if inventory_db:
+        json_src_values = retrieve_json_src_values(json_container, json_blob_path, stream_bundles)
+        compare_with_inventory(writer, inventory_db, assets_container, image_prefix, json_src_values, output_files)
+        print_connection_stats()
+        print_cache_stats()
+        print_throttle_stats()
+        export_metrics("new", connection_stats(), cache_stats(), throttle_stats())
+        return
+
+    # Retrieve Blob files (images) as canonical paths and save to blob_src.txt
     blob_files = retrieve_image_files_from_blob_storage(assets_container, image_prefix)
-    updated_blob_files = update_blob_paths(blob_files)  # Update blob paths
-    save_paths_to_file(output_dir, blob_output_file, updated_blob_files)  # Save updated paths
+    writer.write(blob_output_file, blob_files)
+    # Each list is dropped once its set is built; with COMPACT_PATH_SETS the tables are then the only copy
+    blob_duplicates = set()
+    with stage("build_sets"):
+        blob_set = make_path_set(blob_files, blob_duplicates)
+    del blob_files
 
     # Retrieve JSON file and extract src values
-    json_data = retrieve_json_file_from_blob(json_container, json_blob_path)
-    json_src_values = extract_src_values(json_data)
-    save_paths_to_file(output_dir, json_output_file, json_src_values)
+    json_src_values = retrieve_json_src_values(json_container, json_blob_path, stream_bundles)
+    writer.write(json_output_file, json_src_values)
+    json_duplicates = set()
+    with stage("build_sets"):
+        json_set = make_path_set(json_src_values, json_duplicates)
+    del json_src_values
+    clear_canonical_cache()
 
     # Compare Blob and JSON paths
-    blob_set = set(normalize_path(path) for path in updated_blob_files)
-    json_set = set(normalize_path(path) for path in json_src_values)
-
-    common_paths = blob_set.intersection(json_set)
-    missed_paths = blob_set.difference(json_set)
-    json_only_paths = json_set.difference(blob_set)
+    # Both sides are already canonical, so no further normalization is needed
+    with stage("compare"):
+        common_paths = blob_set.intersection(json_set)
+        missed_paths = blob_set.difference(json_set)
+        json_only_paths = json_set.difference(blob_set)
 
     # Save comparison results
-    save_paths_to_file(output_dir, common_output_file, common_paths)
-    save_paths_to_file(output_dir, missed_output_file, missed_paths)
-    save_paths_to_file(output_dir, json_only_output_file, json_only_paths)
+    with stage("write_reports"):
+        writer.write(common_output_file, common_paths)
+        writer.write(missed_output_file, missed_paths)
+        writer.write(json_only_output_file, json_only_paths)
 
-    # Check for duplicates
-    blob_duplicates = find_duplicates(updated_blob_files)
-    json_duplicates = find_duplicates(json_src_values)
-    
+    # Duplicates were collected while the sets were built
     if blob_duplicates:
         print(f"Warning: Duplicates found in Blob paths: {blob_duplicates}")
     if json_duplicates:
         print(f"Warning: Duplicates found in JSON paths: {json_duplicates}")
 
-    # Validate file counts
-    print("\nChecking file line counts twice:")
-    count_lines_twice(os.path.join(output_dir, blob_output_file))
-    count_lines_twice(os.path.join(output_dir, json_output_file))
-    count_lines_twice(os.path.join(output_dir, common_output_file))
-    count_lines_twice(os.path.join(output_dir, missed_output_file))
-    count_lines_twice(os.path.join(output_dir, json_only_output_file))
-
-    verify_counts(updated_blob_files, json_src_values, common_paths, missed_paths, json_only_paths)
+    # Validate counts from the manifest recorded while writing
+    manifest = writer.write_manifest()
+    verify_manifest_counts(manifest, output_files)
+    print_connection_stats()
+    print_cache_stats()
+    print_throttle_stats()
+    export_metrics("new", connection_stats(), cache_stats(), throttle_stats())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from canonical_path import canonical_path
+from json_decoder import decode_bundle
+from src_extract import iter_values
+
+# Bundle parsing on a process pool. JSON decoding and the src walk are CPU bound
+# and hold the GIL, so download threads only spill the raw bundle to a local
+# file and hand its path to a worker process. The worker decodes, extracts
+# and (optionally) canonicalizes, and sends back the sorted unique paths
+# instead of the document, which keeps pickling cheap.
+
+def parse_bundle_file(path, keys=("src",), canonical=False):
+    """Worker entry point: returns the sorted unique src values of a JSON file."""
+    with open(path, 'rb') as file:
+        document = decode_bundle(file.read())
+    values = iter_values(document, keys)
+    if canonical:
+        values = map(canonical_path, values)
+    return sorted(set(values))
+
+def _pool_context():
+    # Download threads are already running when workers start, and forking a
+    # threaded process is unsafe, so workers come from a fork server (or spawn)
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+class ParsePool:
+    def __init__(self, workers, spill_dir=None):
+        self.workers = workers
+        self.spill_dir = spill_dir or None
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+
+    def spill(self, chunks):
+        """Writes chunks to a new spill file and returns its path."""
+        fd, path = tempfile.mkstemp(prefix="bundle-", suffix=".json", dir=self.spill_dir)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    def parse_file(self, path, keys=("src",), canonical=False):
+        """Parses a local file in a worker process; blocks the calling thread until it is done."""
+        return self.executor.submit(parse_bundle_file, path, tuple(keys), canonical).result()
+
+    def parse_chunks(self, chunks, keys=("src",), canonical=False):
+        """Spills a download to disk and parses it in a worker process. Call from a download thread."""
+        path = self.spill(chunks)
+        try:
+            return self.parse_file(path, keys, canonical)
+        finally:
+            os.remove(path)
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def parse_workers_from_env():
+    return int(os.getenv("PARSE_WORKERS", "0"))
+
+def get_parse_pool():
+    """Returns the shared pool sized by PARSE_WORKERS, or None when process parsing is off."""
+    global _pool
+    workers = parse_workers_from_env()
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParsePool(workers, os.getenv("PARSE_SPILL_DIR"))
+    return _pool
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
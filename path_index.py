@@ -0,0 +1,50 @@
+from array import array
+from path_store import PathTable
+
+# Reference-count index over asset paths. Every asset path gets an integer id
+# once per run; each language contributes the ids it references, and a single
+# refcount array answers "which assets does no language use" without keeping
+# per-language copies of the asset set. With `compact` the paths live in a
+# PathTable, where an ID is simply the path's rank, instead of a list and dict.
+
+class PathIndex:
+    def __init__(self, assets_paths, compact=False):
+        if compact:
+            self.paths = PathTable.from_iterable(assets_paths)
+            self.ids = None
+        else:
+            self.paths = []
+            self.ids = {}
+            for path in assets_paths:
+                if path not in self.ids:
+                    self.ids[path] = len(self.paths)
+                    self.paths.append(path)
+        self.refcounts = array('I', bytes(4 * len(self.paths)))
+        self.languages = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def lookup(self, json_src_values):
+        """Returns the set of asset ids referenced by a language. Read-only, so safe to call from worker threads."""
+        ids = self.ids
+        if ids is None:
+            return {path_id for path_id in map(self.paths.index, json_src_values) if path_id >= 0}
+        return {ids[path] for path in json_src_values if path in ids}
+
+    def add_references(self, referenced_ids):
+        """Counts one language's references. Call from a single thread."""
+        refcounts = self.refcounts
+        for path_id in referenced_ids:
+            refcounts[path_id] += 1
+        self.languages += 1
+
+    def common_paths(self, referenced_ids):
+        return [self.paths[path_id] for path_id in sorted(referenced_ids)]
+
+    def missed_paths(self, referenced_ids):
+        return [path for path_id, path in enumerate(self.paths) if path_id not in referenced_ids]
+
+    def unused_paths(self):
+        """Asset paths referenced by no language at all."""
+        return [path for path, count in zip(self.paths, self.refcounts) if count == 0]
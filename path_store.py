@@ -0,0 +1,214 @@
+import os
+import sys
+from array import array
+
+# Compact, immutable sorted string table for very large path sets. Paths are
+# stored sorted and front-coded in blocks: the first path of every block is
+# kept whole (its "restart key"), every other path only as the length of the
+# prefix it shares with its predecessor plus the remaining UTF-8 bytes. Paths
+# like /content/assets/images/india/... share most of their bytes, so this
+# costs a small fraction of a set of str. The integer ID of a path is its
+# rank in the table.
+
+BLOCK_SIZE = 32
+
+def _write_varint(data, value):
+    while value >= 0x80:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+
+def _read_varint(data, pos):
+    byte = data[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _shared_prefix_length(previous, current):
+    # Bisect on slice equality: a handful of C-level comparisons per path
+    low, high = 0, min(len(previous), len(current))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if previous[:middle] == current[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def _merge(left, right, keep_common, keep_left_only):
+    right_iter = iter(right)
+    current = next(right_iter, None)
+    for path in left:
+        while current is not None and current < path:
+            current = next(right_iter, None)
+        if current == path:
+            if keep_common:
+                yield path
+        elif keep_left_only:
+            yield path
+
+class PathTable:
+    """Sorted, prefix-compressed set of paths with membership, rank and set operations."""
+
+    __slots__ = ("_data", "_block_offsets", "_restart_data", "_restart_offsets", "_length")
+
+    def __init__(self):
+        self._data = b""
+        self._block_offsets = array('Q')
+        self._restart_data = b""
+        self._restart_offsets = array('Q', [0])
+        self._length = 0
+
+    @classmethod
+    def from_iterable(cls, paths, duplicates=None):
+        return cls.from_sorted(sorted(paths), duplicates)
+
+    @classmethod
+    def from_sorted(cls, sorted_paths, duplicates=None):
+        """Builds a table from paths already in ascending order.
+
+        Adjacent duplicates are dropped and, when `duplicates` is a set, added to it.
+        """
+        data = bytearray()
+        block_offsets = array('Q')
+        restart_data = bytearray()
+        restart_offsets = array('Q', [0])
+        previous = None
+        previous_bytes = b""
+        count = 0
+        for path in sorted_paths:
+            if path == previous:
+                if duplicates is not None:
+                    duplicates.add(path)
+                continue
+            if previous is not None and path < previous:
+                raise ValueError("Paths must be sorted to build a PathTable")
+            encoded = path.encode("utf-8")
+            if count % BLOCK_SIZE == 0:
+                # Restart keys live only in restart_data, which the binary search reads
+                block_offsets.append(len(data))
+                restart_data += encoded
+                restart_offsets.append(len(restart_data))
+            else:
+                shared = _shared_prefix_length(previous_bytes, encoded)
+                _write_varint(data, shared)
+                _write_varint(data, len(encoded) - shared)
+                data += encoded[shared:]
+            previous = path
+            previous_bytes = encoded
+            count += 1
+
+        table = cls()
+        table._data = bytes(data)
+        table._block_offsets = block_offsets
+        table._restart_data = bytes(restart_data)
+        table._restart_offsets = restart_offsets
+        table._length = count
+        return table
+
+    def _restart_key(self, block):
+        return self._restart_data[self._restart_offsets[block]:self._restart_offsets[block + 1]]
+
+    def _iter_block_bytes(self, block):
+        current = self._restart_key(block)
+        yield current
+        data = self._data
+        pos = self._block_offsets[block]
+        end = self._block_offsets[block + 1] if block + 1 < len(self._block_offsets) else len(data)
+        while pos < end:
+            shared, pos = _read_varint(data, pos)
+            length, pos = _read_varint(data, pos)
+            current = current[:shared] + data[pos:pos + length]
+            pos += length
+            yield current
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for block in range(len(self._block_offsets)):
+            for encoded in self._iter_block_bytes(block):
+                yield encoded.decode("utf-8")
+
+    def __contains__(self, path):
+        return self.index(path) >= 0
+
+    def index(self, path):
+        """Returns the ID (rank) of path, or -1 when it is not in the table."""
+        # UTF-8 byte order matches str order, so the search works on the encoded form
+        key = path.encode("utf-8")
+        low, high = 0, len(self._block_offsets)
+        while low < high:
+            middle = (low + high) // 2
+            if self._restart_key(middle) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        block = low - 1
+        if block < 0:
+            return -1
+        for position, candidate in enumerate(self._iter_block_bytes(block)):
+            if candidate == key:
+                return block * BLOCK_SIZE + position
+            if candidate > key:
+                break
+        return -1
+
+    def __getitem__(self, path_id):
+        if not 0 <= path_id < self._length:
+            raise IndexError("PathTable index out of range")
+        block, position = divmod(path_id, BLOCK_SIZE)
+        for current_position, encoded in enumerate(self._iter_block_bytes(block)):
+            if current_position == position:
+                return encoded.decode("utf-8")
+
+    def intersection(self, other):
+        if isinstance(other, PathTable):
+            return PathTable.from_sorted(_merge(self, other, keep_common=True, keep_left_only=False))
+        return PathTable.from_sorted(path for path in self if path in other)
+
+    def difference(self, other):
+        if isinstance(other, PathTable):
+            return PathTable.from_sorted(_merge(self, other, keep_common=False, keep_left_only=True))
+        return PathTable.from_sorted(path for path in self if path not in other)
+
+    __and__ = intersection
+    __sub__ = difference
+
+    def memory_bytes(self):
+        """Approximate bytes held by the table."""
+        return (
+            sys.getsizeof(self._data)
+            + sys.getsizeof(self._restart_data)
+            + self._block_offsets.itemsize * len(self._block_offsets)
+            + self._restart_offsets.itemsize * len(self._restart_offsets)
+        )
+
+def compact_path_sets_enabled():
+    return os.getenv("COMPACT_PATH_SETS", "0") not in ("0", "false", "False")
+
+def make_path_set(paths, duplicates=None):
+    """Returns a PathTable when COMPACT_PATH_SETS is enabled, otherwise a plain set.
+
+    Both support `in`, len(), iteration, intersection() and difference().
+    Paths that occur more than once are added to `duplicates` when it is a
+    set, so callers can drop their path list as soon as the set is built.
+    """
+    if compact_path_sets_enabled():
+        return PathTable.from_iterable(paths, duplicates)
+    path_set = set(paths)
+    if duplicates is not None and len(path_set) != len(paths):
+        seen = set()
+        for path in paths:
+            if path in seen:
+                duplicates.add(path)
+            seen.add(path)
+    return path_set
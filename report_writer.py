@@ -0,0 +1,74 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+# Writes each result set to disk exactly once, recording its line count and
+# SHA-256 while streaming, and summarizes every file in a JSON manifest so
+# consistency checks never have to re-read the outputs.
+
+class ReportWriter:
+    def __init__(self, directory, sort=False, compress=False):
+        self.directory = directory
+        self.sort = sort
+        self.compress = compress
+        self.files = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, file_name, paths):
+        """Streams paths to file_name (plus .gz when compressing) and returns the number of lines written."""
+        if self.sort:
+            paths = sorted(paths)
+        stored_name = f"{file_name}.gz" if self.compress else file_name
+        full_path = os.path.join(self.directory, stored_name)
+        checksum = hashlib.sha256()
+        count = 0
+        if self.compress:
+            file = gzip.open(full_path, 'wb')
+        else:
+            file = open(full_path, 'wb')
+        with file:
+            for path in paths:
+                line = f"{path}\n".encode("utf-8")
+                file.write(line)
+                checksum.update(line)
+                count += 1
+
+        self.files[file_name] = {
+            "path": stored_name,
+            "lines": count,
+            "sha256": checksum.hexdigest(),
+            "sorted": self.sort,
+            "compressed": self.compress,
+        }
+        print(f"Paths saved to: {full_path}")
+        return count
+
+    def count(self, file_name):
+        return self.files[file_name]["lines"]
+
+    def manifest(self, **extra):
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "files": self.files,
+            **extra,
+        }
+
+    def write_manifest(self, file_name="manifest.json", **extra):
+        """Atomically writes the manifest for every file written so far and returns it."""
+        manifest = self.manifest(**extra)
+        full_path = os.path.join(self.directory, file_name)
+        tmp_path = f"{full_path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(tmp_path, full_path)
+        print(f"Manifest saved to: {full_path}")
+        return manifest
+
+def report_writer_from_env(directory):
+    return ReportWriter(
+        directory,
+        sort=os.getenv("REPORT_SORT", "0") not in ("0", "false", "False"),
+        compress=os.getenv("REPORT_COMPRESS", "0") not in ("0", "false", "False"),
+    )
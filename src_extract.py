@@ -0,0 +1,57 @@
+import re
+from fnmatch import translate
+
+# Iterative replacement for the recursive extract_src_values helpers. The
+# document is walked with an explicit stack of iterators, so nesting depth is
+# not limited by the interpreter's recursion limit and no intermediate lists
+# are built while values bubble up.
+
+def _compile_patterns(path_patterns):
+    if not path_patterns:
+        return None
+    return re.compile("|".join(f"(?:{translate(pattern)})" for pattern in path_patterns)).match
+
+def iter_values(json_data, keys=("src",), path_patterns=None):
+    """Yields stripped string values stored under any of `keys`, in document order.
+
+    `path_patterns` optionally restricts matches to key paths such as
+    "procedures/chapters/src" (dict keys joined by "/", list levels are
+    transparent), using shell-style wildcards.
+    """
+    keys = frozenset(keys)
+    matches_path = _compile_patterns(path_patterns)
+    if isinstance(json_data, dict):
+        stack = [(iter(json_data.items()), True, "")]
+    elif isinstance(json_data, list):
+        stack = [(iter(json_data), False, "")]
+    else:
+        return
+
+    while stack:
+        iterator, is_dict, path = stack[-1]
+        if is_dict:
+            for key, child in iterator:
+                if key in keys and isinstance(child, str):
+                    if matches_path is None or matches_path(f"{path}/{key}" if path else key):
+                        yield child.strip()
+                elif isinstance(child, (dict, list)):
+                    child_path = path
+                    if matches_path is not None:
+                        child_path = f"{path}/{key}" if path else key
+                    if isinstance(child, dict):
+                        stack.append((iter(child.items()), True, child_path))
+                    else:
+                        stack.append((iter(child), False, child_path))
+                    break
+            else:
+                stack.pop()
+        else:
+            for child in iterator:
+                if isinstance(child, dict):
+                    stack.append((iter(child.items()), True, path))
+                    break
+                if isinstance(child, list):
+                    stack.append((iter(child), False, path))
+                    break
+            else:
+                stack.pop()
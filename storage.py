@@ -0,0 +1,201 @@
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# Storage backends behind one ContainerClient-shaped interface. A container
+# is served from Azure Blob Storage unless it is mapped to a local directory
+# (a blobfuse mount or an azcopy-synced mirror), in which case LocalContainer
+# answers the same listing, download and delete calls straight from disk.
+# Backends can be mixed per container, e.g. local bundles against remote assets.
+#
+#   LOCAL_STORAGE_ROOT=/mnt/blobs             every container is a subdirectory
+#   LOCAL_CONTAINER_ROOTS=json=/mirror/json   per-container roots (comma separated)
+
+def local_container_roots():
+    """Returns {container name: local directory} from LOCAL_CONTAINER_ROOTS."""
+    roots = {}
+    for entry in os.getenv("LOCAL_CONTAINER_ROOTS", "").split(","):
+        name, separator, root = entry.partition("=")
+        if separator and name.strip() and root.strip():
+            roots[name.strip()] = os.path.expanduser(root.strip())
+    return roots
+
+def local_root_for(container_name):
+    root = local_container_roots().get(container_name)
+    if root is None and os.getenv("LOCAL_STORAGE_ROOT"):
+        root = os.path.join(os.path.expanduser(os.getenv("LOCAL_STORAGE_ROOT")), container_name)
+    return root
+
+def get_container(container_name, connection_string=None):
+    """Returns a local or Azure container client for container_name, depending on the configuration."""
+    root = local_root_for(container_name)
+    if root is not None:
+        return LocalContainer(root, container_name)
+    # Imported here so local-only runs never load the Azure SDK through this module
+    from blob_clients import get_container_client
+    return get_container_client(container_name, connection_string)
+
+class LocalBlobProperties:
+    __slots__ = ("name", "size", "last_modified", "etag", "content_settings")
+
+    def __init__(self, name, stat_result):
+        self.name = name
+        self.size = stat_result.st_size
+        self.last_modified = datetime.fromtimestamp(stat_result.st_mtime, timezone.utc)
+        # Changes whenever the file is rewritten, which is all the conditional reads need
+        self.etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        self.content_settings = SimpleNamespace(content_md5=None)
+
+class LocalBlobPrefix:
+    __slots__ = ("name", "prefix")
+
+    def __init__(self, prefix):
+        self.name = prefix
+        self.prefix = prefix
+
+class LocalItemPaged:
+    """Listing result with the iteration and by_page() interface of azure's ItemPaged."""
+
+    def __init__(self, items, page_size=5000):
+        self._items = items
+        self._page_size = page_size
+
+    def by_page(self, continuation_token=None):
+        start = int(continuation_token or 0)
+        for offset in range(start, len(self._items), self._page_size):
+            yield iter(self._items[offset:offset + self._page_size])
+
+    def __iter__(self):
+        return iter(self._items)
+
+class LocalDownloader:
+    """Reads a file (or a byte range of it) through a memory map."""
+
+    def __init__(self, path, properties, offset=None, length=None, chunk_size=4 * 1024 * 1024):
+        self.properties = properties
+        self._path = path
+        self._start = offset or 0
+        end = properties.size if length is None else min(self._start + length, properties.size)
+        self._end = max(end, self._start)
+        self.size = self._end - self._start
+        self._chunk_size = chunk_size
+
+    def chunks(self):
+        if self.size == 0:
+            return
+        with open(self._path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(self._start, self._end, self._chunk_size):
+                yield mapped[offset:min(offset + self._chunk_size, self._end)]
+
+    def readall(self):
+        if self.size == 0:
+            return b""
+        with open(self._path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[self._start:self._end]
+
+    def readinto(self, stream):
+        written = 0
+        for chunk in self.chunks():
+            stream.write(chunk)
+            written += len(chunk)
+        return written
+
+class LocalBlobClient:
+    def __init__(self, container, blob_name):
+        self.container_name = container.container_name
+        self.blob_name = blob_name
+        self._path = container.local_path(blob_name)
+
+    def get_blob_properties(self):
+        return LocalBlobProperties(self.blob_name, os.stat(self._path))
+
+    def download_blob(self, offset=None, length=None, etag=None, match_condition=None, **kwargs):
+        properties = self.get_blob_properties()
+        if etag is not None and match_condition is not None:
+            # Only the blob cache sends conditional reads, and it imports azure-core for them too
+            from azure.core import MatchConditions
+            from azure.core.exceptions import ResourceModifiedError, ResourceNotModifiedError
+            if match_condition == MatchConditions.IfModified and properties.etag == etag:
+                raise ResourceNotModifiedError(message="The condition specified using HTTP conditional header(s) is not met.")
+            if match_condition == MatchConditions.IfNotModified and properties.etag != etag:
+                raise ResourceModifiedError(message="The condition specified using HTTP conditional header(s) is not met.")
+        return LocalDownloader(self._path, properties, offset, length)
+
+    def delete_blob(self, **kwargs):
+        os.remove(self._path)
+
+class LocalContainer:
+    """Drop-in for the ContainerClient calls the scripts make, served from a local directory.
+
+    Blob names are paths relative to root with "/" separators. Listings walk
+    the tree with os.scandir, one directory per task on a thread pool, and
+    come back in name order like an Azure listing.
+    """
+
+    def __init__(self, root, container_name=None, walk_concurrency=None):
+        self.root = os.path.abspath(root)
+        self.container_name = container_name or os.path.basename(self.root)
+        self.walk_concurrency = walk_concurrency or int(os.getenv("LOCAL_WALK_CONCURRENCY", "16"))
+
+    def local_path(self, blob_name):
+        return os.path.join(self.root, *blob_name.split("/"))
+
+    def _scan_directory(self, relative):
+        files = []
+        directories = []
+        try:
+            with os.scandir(os.path.join(self.root, relative) if relative else self.root) as entries:
+                for entry in entries:
+                    name = f"{relative}/{entry.name}" if relative else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(name)
+                    elif entry.is_file(follow_symlinks=False):
+                        files.append(LocalBlobProperties(name, entry.stat(follow_symlinks=False)))
+        except FileNotFoundError:
+            pass
+        return files, directories
+
+    def _walk(self, start, prefix):
+        """Scans the tree below `start` concurrently and returns every file whose name starts with prefix."""
+        blobs = []
+        with ThreadPoolExecutor(max_workers=self.walk_concurrency) as executor:
+            pending = [executor.submit(self._scan_directory, start)]
+            while pending:
+                files, directories = pending.pop().result()
+                blobs.extend(blob for blob in files if blob.name.startswith(prefix))
+                for directory in directories:
+                    # Skip subtrees that cannot contain a name under the prefix
+                    if directory.startswith(prefix) or prefix.startswith(f"{directory}/"):
+                        pending.append(executor.submit(self._scan_directory, directory))
+        blobs.sort(key=lambda blob: blob.name)
+        return blobs
+
+    def list_blobs(self, name_starts_with=None, **kwargs):
+        prefix = name_starts_with or ""
+        start = prefix.rsplit("/", 1)[0] if "/" in prefix else ""
+        return LocalItemPaged(self._walk(start, prefix))
+
+    def walk_blobs(self, name_starts_with=None, delimiter="/", **kwargs):
+        prefix = name_starts_with or ""
+        start = prefix.rsplit("/", 1)[0] if "/" in prefix else ""
+        files, directories = self._scan_directory(start)
+        items = [blob for blob in files if blob.name.startswith(prefix)]
+        items.extend(LocalBlobPrefix(f"{directory}/") for directory in directories if directory.startswith(prefix))
+        items.sort(key=lambda item: item.name)
+        return items
+
+    def get_blob_client(self, blob):
+        return LocalBlobClient(self, getattr(blob, "name", blob))
+
+    def delete_blobs(self, *blobs, **kwargs):
+        responses = []
+        for blob in blobs:
+            try:
+                os.remove(self.local_path(getattr(blob, "name", blob)))
+                responses.append(SimpleNamespace(status_code=202, reason="Accepted", headers={}))
+            except FileNotFoundError:
+                responses.append(SimpleNamespace(status_code=404, reason="Not Found",
+                                                 headers={"x-ms-error-code": "BlobNotFound"}))
+        return iter(responses)
@@ -4,10 +4,22 @@
 
 import os
 import json
-from azure.storage.blob import BlobServiceClient
-from dotenv import load_dotenv
-
-load_dotenv()
+from concurrent.futures import ThreadPoolExecutor
+from blob_clients import connection_stats, print_connection_stats
+from bundle_cache import bundle_extract, bundle_src_values, cache_stats, list_blob_names, print_cache_stats
+from bundle_validator import format_finding, scan_bundle, scan_variant
+from canonical_path import blob_names_with_paths, canonical_paths, clear_canonical_cache
+from checkpoint import checkpoint_store_from_env, listing_digest, print_checkpoint_stats
+from json_decoder import decode_bundle
+from metrics import export_metrics, increment, set_gauge, stage, timed
+from parse_pool import get_parse_pool, shutdown_parse_pool
+from path_index import PathIndex
+from path_store import PathTable, compact_path_sets_enabled
+from pipelined_download import download_concurrency
+from src_extract import iter_values
+from throttle import print_throttle_stats, throttle_stats
+from storage import get_container
+from config import load_config
 
 def save_paths_to_file(directory, file_name, paths):
     os.makedirs(directory, exist_ok=True)
@@ -16,84 +28,187 @@ def save_paths_to_file(directory, file_name, paths):
         for path in paths:
             file.write(f"{path}\n")
 
-def normalize_path(path):
-    return path.replace("\\", "/").lower().strip()
+def save_findings_to_file(directory, file_name, findings):
+    os.makedirs(directory, exist_ok=True)
+    full_path = os.path.join(directory, file_name)
+    with open(full_path, 'w') as file:
+        for finding in findings:
+            file.write(json.dumps(finding) + "\n")
 
-def retrieve_image_files_from_blob_storage(container_name, image_prefix):
-    connection_string = os.getenv("AZURE_CONNECTION_STRING")
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(container_name)
-    blob_paths = []
-    image_blobs = container_client.list_blobs(name_starts_with=image_prefix)
-    for blob in image_blobs:
-        blob_paths.append(normalize_path(f"/{blob.name}"))
-    return blob_paths
+@timed("list_assets")
+def retrieve_asset_blob_names(container_name, image_prefix):
+    container_client = get_container(container_name)
+    return list(list_blob_names(container_client, image_prefix))
 
+@timed("list_bundles")
 def retrieve_language_json_files(container_name, languages_prefix):
-    connection_string = os.getenv("AZURE_CONNECTION_STRING")
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(container_name)
-    language_json_files = []
+    """Returns {bundle path: ETag} for every language bundle, in listing order."""
+    container_client = get_container(container_name)
+    language_json_files = {}
     blobs = container_client.list_blobs(name_starts_with=languages_prefix)
     for blob in blobs:
         if blob.name.endswith('content-bundle.json'):
-            language_json_files.append(blob.name)
+            language_json_files[blob.name] = getattr(blob, "etag", None)
     return language_json_files
 
-def process_language_json(blob_service_client, container_name, json_path):
-    container_client = blob_service_client.get_container_client(container_name)
+@timed("download_bundle")
+def process_language_json(container_name, json_path):
+    container_client = get_container(container_name)
     blob_client = container_client.get_blob_client(json_path)
-    json_content = blob_client.download_blob().readall()
-    return json.loads(json_content)
-
+    json_content = blob_client.download_blob(max_concurrency=download_concurrency()).readall()
+    increment("bytes_downloaded", len(json_content))
+    with stage("parse"):
+        return decode_bundle(json_content)
+
+@timed("stream_bundle")
+def stream_language_src_values(container_name, json_path):
+    container_client = get_container(container_name)
+    return canonical_paths(bundle_src_values(container_client, json_path))
+
+@timed("stream_bundle")
+def scan_language_bundle(container_name, json_path):
+    """Extracts src values and validation findings from a bundle in one streaming pass."""
+    container_client = get_container(container_name)
+    scan = bundle_extract(container_client, json_path, scan_bundle, variant=scan_variant())
+    return canonical_paths(scan["src_values"]), scan["findings"]
+
+@timed("stream_bundle")
+def parse_language_bundle(parse_pool, container_name, json_path):
+    """Spills a bundle to disk from this download thread and parses it in the process pool."""
+    container_client = get_container(container_name)
+    return bundle_extract(
+        container_client,
+        json_path,
+        lambda chunks: parse_pool.parse_chunks(chunks, canonical=True),
+        variant="canonical:src",
+    )
+
+@timed("extract")
 def extract_src_values(json_data):
-    src_values = []
-    if isinstance(json_data, list):
-        for item in json_data:
-            src_values.extend(extract_src_values(item))
-    elif isinstance(json_data, dict):
-        for key, value in json_data.items():
-            if key == 'src' and isinstance(value, str):
-                src_values.append(normalize_path(value.strip()))
-            else:
-                src_values.extend(extract_src_values(value))
-    return src_values
-
-def compare_paths_per_language(language_id, json_src_values, assets_paths):
+    return canonical_paths(iter_values(json_data))
+
+def compare_paths_per_language(language_id, json_src_values, path_index):
+    # json_src_values and the assets in path_index are canonical paths, normalized once per run
     language_results = {}
-    json_set = set(normalize_path(path) for path in json_src_values)
-    assets_set = set(normalize_path(path) for path in assets_paths)
-    common_paths = json_set.intersection(assets_set)
-    missed_paths = assets_set.difference(json_set)
-    language_results["language_id"] = language_id
-    language_results["common"] = list(common_paths)
-    language_results["missed"] = list(missed_paths)
+    with stage("compare", language=language_id):
+        referenced_ids = path_index.lookup(json_src_values)
+        language_results["language_id"] = language_id
+        language_results["referenced_ids"] = referenced_ids
+        language_results["common"] = path_index.common_paths(referenced_ids)
+        language_results["missed"] = path_index.missed_paths(referenced_ids)
     return language_results
 
-def main():
+def language_output_files(language_id, validate=False):
+    output_files = [f"{language_id}_common_paths.txt", f"{language_id}_missed_paths.txt"]
+    if validate:
+        output_files.append(f"{language_id}_validation.jsonl")
+    return output_files
+
+def resume_language(checkpoints, language_id, key, path_index, output_dir, validate):
+    """Returns the referenced ids saved for a finished language, or None when it has to be audited again."""
+    checkpoint = checkpoints.load(language_id, key)
+    if checkpoint is None:
+        return None
+    if not all(os.path.exists(os.path.join(output_dir, name)) for name in language_output_files(language_id, validate)):
+        return None
+    increment("languages_resumed")
+    return path_index.lookup(checkpoint["referenced_paths"])
+
+def audit_language(container_name, json_path, path_index, output_dir, stream_bundles=True, validate=False,
+                   checkpoints=None, checkpoint_key=None):
+    language_id = os.path.basename(os.path.dirname(json_path))
+    if checkpoints is not None:
+        referenced_ids = resume_language(checkpoints, language_id, checkpoint_key, path_index, output_dir, validate)
+        if referenced_ids is not None:
+            return referenced_ids
+    parse_pool = get_parse_pool()
+    with stage("language", language=language_id):
+        if validate:
+            # Validation needs line numbers, so it always takes the streaming path
+            json_src_values, findings = scan_language_bundle(container_name, json_path)
+            save_findings_to_file(output_dir, f"{language_id}_validation.jsonl", findings)
+            for finding in findings:
+                print(f"{language_id}: {format_finding(finding)}")
+        elif parse_pool is not None:
+            json_src_values = parse_language_bundle(parse_pool, container_name, json_path)
+        elif stream_bundles:
+            json_src_values = stream_language_src_values(container_name, json_path)
+        else:
+            json_data = process_language_json(container_name, json_path)
+            json_src_values = extract_src_values(json_data)
+        results = compare_paths_per_language(language_id, json_src_values, path_index)
+        with stage("write_reports"):
+            save_paths_to_file(output_dir, f"{language_id}_common_paths.txt", results["common"])
+            save_paths_to_file(output_dir, f"{language_id}_missed_paths.txt", results["missed"])
+    if checkpoints is not None:
+        checkpoints.save(language_id, checkpoint_key, {"referenced_paths": results["common"]})
+    return results["referenced_ids"]
+
+def audit_languages(container_name, language_json_files, path_index, output_dir, concurrency, stream_bundles=True,
+                    validate=False, checkpoints=None, assets_digest=None):
+    # Results are yielded in input order, so merging them stays deterministic in either mode
+    variant = "validate" if validate else "src"
+
+    def audit(json_path):
+        checkpoint_key = {"bundle_etag": language_json_files[json_path], "listing_digest": assets_digest,
+                          "variant": variant}
+        return audit_language(container_name, json_path, path_index, output_dir, stream_bundles, validate,
+                              checkpoints, checkpoint_key)
+
+    if concurrency <= 1:
+        for json_path in language_json_files:
+            yield audit(json_path)
+        return
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        yield from executor.map(audit, language_json_files)
+
+def main(resume=None):
+    load_config()
     assets_container = os.getenv("BLOB_CONTAINER_ASSETS")
     languages_container = os.getenv("BLOB_CONTAINER_JSON")
     assets_prefix = os.getenv("ASSETS_PREFIX", "assets/")
     languages_prefix = os.getenv("LANGUAGES_PREFIX", "languages/")
     output_dir = os.getenv("OUTPUT_DIR", "output")
+    concurrency = int(os.getenv("AUDIT_CONCURRENCY", "1"))
+    stream_bundles = os.getenv("STREAM_BUNDLES", "1") != "0"
+    validate = os.getenv("VALIDATE_BUNDLES", "0") not in ("0", "false", "False")
     os.makedirs(output_dir, exist_ok=True)
-    connection_string = os.getenv("AZURE_CONNECTION_STRING")
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    assets_paths = retrieve_image_files_from_blob_storage(assets_container, assets_prefix)
+    parse_pool = get_parse_pool()
+    if parse_pool is not None:
+        # Each download thread waits on its bundle's worker, so keep at least one thread per worker
+        concurrency = max(concurrency, parse_pool.workers)
+    compact = compact_path_sets_enabled()
+    asset_names = retrieve_asset_blob_names(assets_container, assets_prefix)
+    assets_paths = canonical_paths(asset_names)
+    if compact:
+        asset_names = PathTable.from_iterable(asset_names)
     language_json_files = retrieve_language_json_files(languages_container, languages_prefix)
-    all_json_paths = set()
-    global_missed_paths = set(assets_paths)
-    for json_path in language_json_files:
-        language_id = os.path.basename(os.path.dirname(json_path))
-        json_data = process_language_json(blob_service_client, languages_container, json_path)
-        json_src_values = extract_src_values(json_data)
-        all_json_paths.update(json_src_values)
-        results = compare_paths_per_language(language_id, json_src_values, assets_paths)
-        save_paths_to_file(output_dir, f"{language_id}_common_paths.txt", results["common"])
-        save_paths_to_file(output_dir, f"{language_id}_missed_paths.txt", results["missed"])
-        global_missed_paths.intersection_update(results["missed"])
-    global_missed_paths = global_missed_paths.difference(all_json_paths)
-    save_paths_to_file(output_dir, "global_missed_paths.txt", list(global_missed_paths))
+    checkpoints = checkpoint_store_from_env("test", output_dir, resume)
+    assets_digest = listing_digest(assets_paths) if checkpoints is not None else None
+    path_index = PathIndex(assets_paths, compact=compact)
+    del assets_paths  # the index keeps the only copy of the asset paths
+    clear_canonical_cache()  # keep the memo cache for bundle src values, not listing names
+    # Reference counts are updated on this thread only; workers just look paths up
+    for referenced_ids in audit_languages(
+        languages_container, language_json_files, path_index, output_dir, concurrency, stream_bundles, validate,
+        checkpoints, assets_digest
+    ):
+        path_index.add_references(referenced_ids)
+    # Assets no language references are the globally missed paths
+    with stage("global_compare"):
+        global_missed_paths = path_index.unused_paths()
+    save_paths_to_file(output_dir, "global_missed_paths.txt", global_missed_paths)
+    # The report holds canonical paths for comparison; deletes need the blob names behind them
+    save_paths_to_file(output_dir, "global_missed_blobs.txt",
+                       blob_names_with_paths(asset_names, set(global_missed_paths)))
+    set_gauge("languages", path_index.languages)
+    shutdown_parse_pool()
+    print_connection_stats()
+    print_cache_stats()
+    print_throttle_stats()
+    print_checkpoint_stats(checkpoints)
+    export_metrics("test", connection_stats(), cache_stats(), throttle_stats(),
+                   checkpoints.stats() if checkpoints is not None else None)
 
 if __name__ == "__main__":
     main()
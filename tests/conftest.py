@@ -0,0 +1,12 @@
+import os
+import sys
+
+import pytest
+
+# The scripts are flat modules at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def no_bundle_cache(monkeypatch):
+    # Keep tests from writing .blob_cache into the working directory
+    monkeypatch.setenv("BLOB_CACHE_DIR", "")
@@ -0,0 +1,64 @@
+import json
+import os
+import time
+
+import pytest
+
+import config
+import test as audit
+from canonical_path import canonical_paths
+from path_index import PathIndex
+
+LANGUAGES = ["en", "fr", "de", "ja", "pt-BR"]
+ASSETS = [f"assets/img/{i}.png" for i in range(10)]
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Local assets and json containers where language i references assets 0..i+1."""
+    root = tmp_path / "blobs"
+    for name in ASSETS:
+        path = root / "assets" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"png")
+    for i, language in enumerate(LANGUAGES):
+        path = root / "json" / "languages" / language / "content-bundle.json"
+        path.parent.mkdir(parents=True)
+        path.write_text(json.dumps({"items": [{"src": f"/{name}"} for name in ASSETS[:i + 2]]}))
+    monkeypatch.setenv("LOCAL_STORAGE_ROOT", str(root))
+    for name in ("PARSE_WORKERS", "AUDIT_RESUME", "CHECKPOINT_DIR", "METRICS_DIR", "VALIDATE_BUNDLES"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("CHECKPOINTS", "0")
+    return root
+
+def bundles():
+    return {f"languages/{language}/content-bundle.json": None for language in LANGUAGES}
+
+def test_concurrent_results_come_back_in_input_order(storage, tmp_path, monkeypatch):
+    stream = audit.stream_language_src_values
+    delays = {path: 0.05 * (len(LANGUAGES) - i) for i, path in enumerate(bundles())}
+
+    def slow_stream(container_name, json_path):
+        # Later languages finish first
+        time.sleep(delays[json_path])
+        return stream(container_name, json_path)
+
+    monkeypatch.setattr(audit, "stream_language_src_values", slow_stream)
+    index = PathIndex(canonical_paths(ASSETS))
+    serial = list(audit.audit_languages("json", bundles(), index, str(tmp_path), 1))
+    concurrent = list(audit.audit_languages("json", bundles(), index, str(tmp_path), 4))
+    assert concurrent == serial
+    assert [len(ids) for ids in concurrent] == [i + 2 for i in range(len(LANGUAGES))]
+
+def test_concurrency_does_not_change_the_reports(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "_loaded", True)
+    monkeypatch.setenv("BLOB_CONTAINER_ASSETS", "assets")
+    monkeypatch.setenv("BLOB_CONTAINER_JSON", "json")
+    reports = {}
+    for concurrency in ("1", "4"):
+        output_dir = tmp_path / f"out{concurrency}"
+        monkeypatch.setenv("OUTPUT_DIR", str(output_dir))
+        monkeypatch.setenv("AUDIT_CONCURRENCY", concurrency)
+        audit.main()
+        reports[concurrency] = {name: (output_dir / name).read_text() for name in sorted(os.listdir(output_dir))}
+    assert reports["1"] == reports["4"]
+    assert reports["1"]["global_missed_blobs.txt"].split() == ASSETS[len(LANGUAGES) + 1:]
@@ -0,0 +1,79 @@
+import json
+import threading
+
+import pytest
+
+from benchmarks.fake_blob import FakeContainerClient, FakeHttpResponseError
+from benchmarks.synthetic import SyntheticSpec, asset_names, bundle_document, language_ids, populate
+from src_extract import iter_values
+
+SPEC = SyntheticSpec(blobs=200, bundle_entries=100, depth=3, languages=3, overlap=0.5, seed=7)
+
+def build(spec):
+    assets = FakeContainerClient("assets")
+    bundles = FakeContainerClient("json")
+    names, language_bundles = populate(spec, assets, bundles)
+    return assets, bundles, names, language_bundles
+
+def test_same_spec_builds_identical_containers():
+    first, second = build(SPEC), build(SPEC)
+    for one, other in zip(first[:2], second[:2]):
+        assert one._blobs == other._blobs
+    assert build(SyntheticSpec(blobs=200, seed=8))[0]._blobs != first[0]._blobs
+
+def test_asset_tree_and_bundles_follow_the_spec():
+    assets, bundles, names, language_bundles = build(SPEC)
+    assert len(names) == len(set(names)) == SPEC.blobs
+    assert all(name.count("/") == SPEC.depth + 1 for name in names)  # assets/images/ plus depth - 1 levels
+    assert list(language_bundles) == language_ids(SPEC)
+
+    existing = {f"/content/{name}" for name in names}
+    for blob_name in language_bundles.values():
+        src_values = list(iter_values(json.loads(bundles._blobs[blob_name])))
+        assert len(src_values) == SPEC.bundle_entries
+        hits = sum(value in existing for value in src_values)
+        assert 0.3 < hits / len(src_values) < 0.7
+
+def test_no_overlap_references_only_missing_assets():
+    spec = SyntheticSpec(blobs=50, bundle_entries=40, overlap=0.0)
+    document = bundle_document(spec, asset_names(spec), 0)
+    assert all("/missing/" in value for value in iter_values(document))
+
+def test_fake_counts_list_and_download_requests():
+    container = FakeContainerClient(page_size=3, chunk_size=4)
+    for i in range(7):
+        container.upload_blob(f"a/{i}", b"0123456789")
+    assert [blob.name for blob in container.list_blobs(name_starts_with="a/")] == [f"a/{i}" for i in range(7)]
+    assert container.requests == 3  # one per page
+
+    downloader = container.get_blob_client("a/1").download_blob(offset=2, length=5)
+    assert list(downloader.chunks()) == [b"2345", b"6"]
+    assert container.requests == 3 + 1 + 2
+    assert container.bytes_downloaded == 5
+
+def test_fake_throttles_requests_beyond_its_capacity():
+    responses = []
+    container = FakeContainerClient(latency=0.05, capacity=1, retry_after=2, raw_response_hook=responses.append)
+    container.upload_blob("a", b"x")
+    errors = []
+
+    def fetch():
+        try:
+            container.get_blob_client("a").get_blob_properties()
+        except FakeHttpResponseError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert container.throttled == len(errors) == len(responses) >= 1
+    assert all(response.status_code == 503 and response.headers["Retry-After"] == "2" for response in responses)
+
+def test_fake_retries_throttled_requests():
+    container = FakeContainerClient(capacity=0, retry_total=2, retry_backoff=0)
+    container.upload_blob("a", b"x")
+    with pytest.raises(FakeHttpResponseError):
+        container.get_blob_client("a").get_blob_properties()
+    assert container.requests == container.throttled == 3
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("azure.storage.blob")
+pytest.importorskip("requests")
+
+import blob_clients
+import throttle
+
+ACCOUNT_A = "DefaultEndpointsProtocol=https;AccountName=accounta;AccountKey=YWJj;EndpointSuffix=core.windows.net"
+ACCOUNT_B = "DefaultEndpointsProtocol=https;AccountName=accountb;AccountKey=YWJj;EndpointSuffix=core.windows.net"
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    monkeypatch.setattr(blob_clients, "_clients", {})
+    monkeypatch.setattr(blob_clients, "_sessions", {})
+    monkeypatch.setattr(throttle, "_governor", None)
+    monkeypatch.setenv("THROTTLE_GOVERNOR", "0")
+
+def transport_session(client):
+    transport = client._pipeline._transport
+    # Container clients wrap their account's transport so closing them leaves it open
+    return getattr(transport, "_transport", transport).session
+
+def test_one_pooled_client_per_connection_string(monkeypatch):
+    monkeypatch.setenv("BLOB_POOL_SIZE", "7")
+    client = blob_clients.get_blob_service_client(ACCOUNT_A)
+    assert blob_clients.get_blob_service_client(ACCOUNT_A) is client
+    other = blob_clients.get_blob_service_client(ACCOUNT_B)
+    assert other is not client
+    assert transport_session(other) is not transport_session(client)
+
+    session = transport_session(client)
+    assert session is blob_clients._sessions[ACCOUNT_A]
+    adapter = session.get_adapter("https://accounta.blob.core.windows.net")
+    assert adapter._pool_maxsize == 7
+
+def test_container_clients_share_their_account_transport(monkeypatch):
+    monkeypatch.setenv("AZURE_CONNECTION_STRING", ACCOUNT_A)
+    assets = blob_clients.get_container_client("assets")
+    bundles = blob_clients.get_container_client("json")
+    assert assets.container_name == "assets"
+    assert transport_session(assets) is transport_session(bundles) is blob_clients._sessions[ACCOUNT_A]
+    assert list(blob_clients._clients) == [ACCOUNT_A]
+
+def test_keep_alive_off_closes_connections(monkeypatch):
+    monkeypatch.setenv("BLOB_KEEP_ALIVE", "0")
+    client = blob_clients.get_blob_service_client(ACCOUNT_A)
+    assert transport_session(client).headers["Connection"] == "close"
+
+def test_governed_clients_leave_status_retries_to_the_governor(monkeypatch):
+    monkeypatch.setenv("THROTTLE_GOVERNOR", "1")
+    client = blob_clients.get_blob_service_client(ACCOUNT_A)
+    retry_policy = client._config.retry_policy
+    assert retry_policy.status_retries == 0
+    assert retry_policy.connect_retries > 0 and retry_policy.read_retries > 0
+    assert isinstance(blob_clients.get_container_client("assets", ACCOUNT_A), throttle.GovernedContainer)
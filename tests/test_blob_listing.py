@@ -0,0 +1,36 @@
+import pytest
+
+from benchmarks.fake_blob import FakeContainerClient
+from benchmarks.synthetic import SyntheticSpec, asset_names
+from blob_listing import list_blobs_sharded
+
+@pytest.fixture
+def container():
+    container = FakeContainerClient(page_size=7)
+    names = asset_names(SyntheticSpec(blobs=300, depth=3))
+    # Blobs directly on the walked levels, next to the directories
+    names += ["assets/readme.txt", "assets/images/index.json", "assets/images/d0/cover.png", "top.png"]
+    for name in names:
+        container.upload_blob(name, b"x")
+    return container
+
+def flat_names(container, prefix):
+    return [blob.name for blob in list_blobs_sharded(container, prefix, depth=0)]
+
+@pytest.mark.parametrize("prefix", ["", "assets/", "assets/images/"])
+@pytest.mark.parametrize("depth", [1, 2, 3, 5])
+def test_sorted_sharded_listing_matches_a_flat_listing(container, prefix, depth):
+    report = {}
+    names = [blob.name for blob in list_blobs_sharded(container, prefix, depth=depth, concurrency=4, sort=True,
+                                                      report=report)]
+    assert names == flat_names(container, prefix)
+    assert sum(entry["blobs"] for entry in report.values()) == len(names)
+
+@pytest.mark.parametrize("depth", [1, 3])
+def test_unsorted_sharded_listing_yields_every_blob_once(container, depth):
+    names = [blob.name for blob in list_blobs_sharded(container, "assets/", depth=depth, concurrency=4)]
+    assert sorted(names) == flat_names(container, "assets/")
+
+def test_flat_listing_is_in_name_order(container):
+    names = flat_names(container, "")
+    assert names == sorted(names) and len(names) == 304
@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("azure.core")  # the cache revalidates bundles with azure-core's conditional requests
+
+from bundle_cache import BundleCache, INDEX_FILE
+from storage import LocalContainer
+
+def write_bundle(root, name, srcs):
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"procedures": [{"src": src} for src in srcs]}))
+
+class Extract:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, downloader):
+        self.calls += 1
+        return [entry["src"] for entry in json.loads(downloader.readall())["procedures"]]
+
+def test_etag_hit_skips_the_download_and_a_change_misses(tmp_path):
+    root = tmp_path / "json"
+    write_bundle(root, "en/content-bundle.json", ["/a.png"])
+    container = LocalContainer(str(root))
+    cache = BundleCache(str(tmp_path / "cache"), 1 << 20)
+    extract = Extract()
+
+    assert cache.bundle_values(container, "en/content-bundle.json", extract) == ["/a.png"]
+    assert cache.bundle_values(container, "en/content-bundle.json", extract) == ["/a.png"]
+    assert (extract.calls, cache.hits, cache.misses) == (1, 1, 1)
+
+    write_bundle(root, "en/content-bundle.json", ["/a.png", "/b.png"])
+    assert cache.bundle_values(container, "en/content-bundle.json", extract) == ["/a.png", "/b.png"]
+    assert (extract.calls, cache.hits, cache.misses) == (2, 1, 2)
+
+    # Variants of one blob are cached apart
+    assert cache.bundle_values(container, "en/content-bundle.json", extract, variant="other") == ["/a.png", "/b.png"]
+    assert extract.calls == 3
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    root = tmp_path / "json"
+    for language in ("en", "fr", "de"):
+        write_bundle(root, f"{language}/content-bundle.json", [f"/{language}/{index}.png" for index in range(50)])
+    container = LocalContainer(str(root))
+    cache = BundleCache(str(tmp_path / "cache"), 1 << 20)
+    clock = iter(range(100))
+    monkeypatch.setattr("bundle_cache.time.time", lambda: next(clock))
+    extract = Extract()
+    for language in ("en", "fr"):
+        cache.bundle_values(container, f"{language}/content-bundle.json", extract)
+    entry_size = max(entry["size"] for entry in cache._index.values())
+    cache.max_bytes = 2 * entry_size + entry_size // 2
+    cache.bundle_values(container, "en/content-bundle.json", extract)  # en is now more recent than fr
+    cache.bundle_values(container, "de/content-bundle.json", extract)
+
+    assert sorted(entry["blob"] for entry in cache._index.values()) == ["de/content-bundle.json", "en/content-bundle.json"]
+    assert len([name for name in os.listdir(tmp_path / "cache") if name.endswith(".json.gz")]) == 2
+    cache.bundle_values(container, "fr/content-bundle.json", extract)
+    assert extract.calls == 4  # fr was downloaded again
+
+def test_hits_save_the_index_only_on_flush(tmp_path):
+    root = tmp_path / "json"
+    write_bundle(root, "en/content-bundle.json", ["/a.png"])
+    container = LocalContainer(str(root))
+    cache = BundleCache(str(tmp_path / "cache"), 1 << 20)
+    cache.bundle_values(container, "en/content-bundle.json", Extract())
+    index_path = tmp_path / "cache" / INDEX_FILE
+    saved = index_path.read_text()
+    for _ in range(3):
+        cache.bundle_values(container, "en/content-bundle.json", Extract())
+    assert index_path.read_text() == saved
+    cache.flush()
+    assert index_path.read_text() != saved
+    assert BundleCache(str(tmp_path / "cache"), 1 << 20)._index == cache._index
+    assert not [name for name in os.listdir(tmp_path / "cache") if name.endswith(".tmp")]
@@ -0,0 +1,91 @@
+import json
+
+import config
+import bundle_validator
+from bundle_validator import scan_bundle, scan_variant, validate_bundle
+from json_stream import iter_src_values
+
+PREFIXES = {"procedures": "/icon/procedures/", "actioncards": "/icon/actioncards/"}
+
+BUNDLE = """{
+  "procedures": [
+    {
+      "id": "p1",
+      "description": "First",
+      "icon": "/icon/actioncard/p1.png",
+      "chapters": [
+        {"id": "p1", "description": "First", "src": "/content/a.png"},
+        {"id": "p2", "description": "Other"}
+      ]
+    },
+    {"id": "p3", "icon": "/icon/procedures/p3.png", "src": " /content/b.mp4 "}
+  ],
+  "nested": {
+    "actioncards": [
+      {"id": "c1", "description": "Card", "icon": "/icon/procedures/c1.png", "chapters": [{"id": "c1"}]}
+    ]
+  },
+  "modules": [{"id": "m1", "icon": "/anything.png"}]
+}
+"""
+
+def issues(findings):
+    return [(finding["id"], finding["section"], finding["line"], finding["issue"]) for finding in findings]
+
+def test_reports_icon_and_chapter_issues_with_line_numbers():
+    assert issues(validate_bundle([BUNDLE], PREFIXES)) == [
+        ("p1", "procedures", 6,
+         "Invalid icon path '/icon/actioncard/p1.png' for section 'procedures' (expected prefix '/icon/procedures/')"),
+        ("p1", "procedures", 9, "Chapter id 'p2' does not match parent id 'p1'"),
+        ("p1", "procedures", 9, "Chapter description 'Other' does not match parent description 'First'"),
+        ("c1", "actioncards", 16,
+         "Invalid icon path '/icon/procedures/c1.png' for section 'actioncards' (expected prefix '/icon/actioncards/')"),
+    ]
+
+def test_findings_do_not_depend_on_chunk_boundaries():
+    data = BUNDLE.encode()
+    expected = validate_bundle([data], PREFIXES)
+    for size in (1, 3, 17):
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        assert validate_bundle(chunks, PREFIXES) == expected
+
+def test_scan_bundle_extracts_src_values_in_the_same_pass():
+    scan = scan_bundle([BUNDLE], icon_prefixes=PREFIXES)
+    assert scan["src_values"] == list(iter_src_values([BUNDLE])) == ["/content/a.png", "/content/b.mp4"]
+    assert scan["findings"] == validate_bundle([BUNDLE], PREFIXES)
+
+def test_icon_prefixes_from_env_and_variant(monkeypatch):
+    monkeypatch.setenv("ICON_PREFIXES", " procedures = /p/ ,broken, modules=/m/")
+    assert bundle_validator.icon_prefixes_from_env() == {"procedures": "/p/", "modules": "/m/"}
+    assert scan_variant() == "scan:modules=/m/,procedures=/p/"
+    assert scan_variant(PREFIXES) != scan_variant()
+
+def test_main_writes_findings_and_exit_status(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(config, "_loaded", True)
+    bad = tmp_path / "bad.json"
+    bad.write_text(BUNDLE)
+    good = tmp_path / "good.json"
+    good.write_text(json.dumps({"procedures": [{"id": "p", "icon": "/icon/procedures/p.png"}]}))
+    output = tmp_path / "findings.json"
+    monkeypatch.setenv("VALIDATION_OUTPUT", str(output))
+    monkeypatch.setenv("ICON_PREFIXES", "procedures=/icon/procedures/,actioncards=/icon/actioncards/")
+
+    assert bundle_validator.main([str(good)]) == 0
+    assert bundle_validator.main([str(bad), str(good)]) == 1
+    assert "4 issue(s) found" in capsys.readouterr().out
+    results = json.loads(output.read_text())
+    assert [len(results[str(bad)]), results[str(good)]] == [4, []]
+
+def test_scan_results_are_cached_as_they_are(tmp_path):
+    from benchmarks.fake_blob import FakeContainerClient
+    from bundle_cache import BundleCache
+
+    container = FakeContainerClient("json")
+    container.upload_blob("en/content-bundle.json", BUNDLE)
+    cache = BundleCache(str(tmp_path), 1 << 20)
+    scan = cache.bundle_values(container, "en/content-bundle.json",
+                               lambda downloader: scan_bundle(downloader.chunks(), icon_prefixes=PREFIXES),
+                               variant=scan_variant(PREFIXES))
+    assert scan == scan_bundle([BUNDLE], icon_prefixes=PREFIXES)
+    [entry] = cache._index.values()
+    assert cache._read_values(entry) == scan
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+import checkpoint
+import cli
+import config
+from checkpoint import CheckpointStore, checkpoint_store_from_env
+
+KEY = {"bundle_etag": '"0x1"', "listing_digest": "abc", "variant": "src"}
+
+@pytest.fixture(autouse=True)
+def no_checkpoint_env(monkeypatch):
+    for name in ("CHECKPOINT_DIR", "CHECKPOINTS", "AUDIT_RESUME"):
+        monkeypatch.delenv(name, raising=False)
+
+def test_every_run_writes_checkpoints_under_the_output_dir(tmp_path, monkeypatch):
+    store = checkpoint_store_from_env("test", str(tmp_path))
+    assert store.directory == os.path.join(str(tmp_path), "checkpoints", "test")
+    assert not store.resume
+    assert os.path.isdir(store.directory)
+
+    assert checkpoint_store_from_env("test", str(tmp_path), resume=True).resume
+    monkeypatch.setenv("AUDIT_RESUME", "1")
+    assert checkpoint_store_from_env("ide", str(tmp_path)).resume
+
+def test_checkpoint_dir_only_moves_them(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path / "elsewhere"))
+    assert checkpoint_store_from_env("ide", str(tmp_path)).directory == str(tmp_path / "elsewhere" / "ide")
+    monkeypatch.setenv("CHECKPOINT_DIR", "")
+    assert checkpoint_store_from_env("ide", str(tmp_path)).directory == os.path.join(str(tmp_path), "checkpoints", "ide")
+
+def test_explicit_opt_out(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKPOINTS", "0")
+    assert checkpoint_store_from_env("test", str(tmp_path)) is None
+    assert not os.path.exists(tmp_path / "checkpoints")
+    assert checkpoint_store_from_env("test", str(tmp_path), resume=True).resume
+
+def test_save_then_load_when_resuming(tmp_path):
+    CheckpointStore(str(tmp_path)).save("pt-BR/x", KEY, {"referenced_paths": ["/content/a.png"]})
+    assert os.listdir(tmp_path) == ["pt-BR%2Fx.json"]
+    assert CheckpointStore(str(tmp_path)).load("pt-BR/x", KEY) is None  # not resuming
+
+    store = CheckpointStore(str(tmp_path), resume=True)
+    assert store.load("pt-BR/x", KEY) == {"referenced_paths": ["/content/a.png"]}
+    assert store.load("pt-BR/x", dict(KEY, bundle_etag='"0x2"')) is None
+    assert store.load("pt-BR/x", dict(KEY, listing_digest=None)) is None
+    assert store.load("fr", KEY) is None
+    assert store.stats() == {"checkpoints_reused": 1, "checkpoints_saved": 0}
+
+def test_torn_checkpoint_is_ignored(tmp_path):
+    (tmp_path / "en.json").write_text('{"key": ')
+    assert CheckpointStore(str(tmp_path), resume=True).load("en", KEY) is None
+
+def test_save_syncs_the_file_and_its_directory(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+
+    def recording_fsync(fd):
+        synced.append(os.path.isdir(f"/proc/self/fd/{fd}") if os.path.exists("/proc/self/fd") else None)
+        fsync(fd)
+
+    monkeypatch.setattr(checkpoint.os, "fsync", recording_fsync)
+    CheckpointStore(str(tmp_path)).save("en", KEY, {})
+    assert len(synced) == 2
+    if synced[0] is not None:
+        assert synced == [False, True]
+
+@pytest.mark.parametrize("command, module", [("audit-languages", "test"), ("audit-mapping", "ide")])
+def test_cli_passes_resume_to_the_script(monkeypatch, command, module):
+    monkeypatch.setattr(config, "_loaded", True)
+    calls = []
+    monkeypatch.setattr(cli, "_script_main", lambda name: lambda **kwargs: calls.append((name, kwargs)))
+    cli.main([command, "--resume"])
+    cli.main([command])
+    assert calls == [(module, {"resume": True}), (module, {"resume": None})]
+    assert "AUDIT_RESUME" not in os.environ
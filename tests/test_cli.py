@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+import cli
+import config
+
+NAMES = ("OUTPUT_DIR", "AUDIT_CONCURRENCY", "PARSE_WORKERS", "VALIDATE_BUNDLES", "STREAM_BUNDLES", "ENV_FILE",
+         "DELETE_DRY_RUN", "DELETE_BATCH_SIZE", "WATCH_SOURCE")
+
+@pytest.fixture
+def environment(monkeypatch):
+    """Unsets the variables under test and restores them, including the ones cli.main sets."""
+    for name in NAMES:
+        monkeypatch.setenv(name, "")
+        monkeypatch.delenv(name)
+    monkeypatch.setattr(config, "_loaded", False)
+    seen = []
+    monkeypatch.setattr(cli, "_script_main",
+                        lambda name: lambda *args, **kwargs: seen.append((name, {n: os.getenv(n) for n in NAMES})))
+    return seen
+
+def test_flags_override_environment_variables(environment, monkeypatch):
+    monkeypatch.setenv("OUTPUT_DIR", "from-env")
+    monkeypatch.setenv("AUDIT_CONCURRENCY", "2")
+    monkeypatch.setenv("PARSE_WORKERS", "3")
+    cli.main(["--output-dir", "from-flag", "audit-languages", "--concurrency", "8", "--validate", "--no-stream"])
+    name, env = environment[0]
+    assert name == "test"
+    assert env["OUTPUT_DIR"] == "from-flag"
+    assert env["AUDIT_CONCURRENCY"] == "8"
+    assert env["VALIDATE_BUNDLES"] == "1"
+    assert env["STREAM_BUNDLES"] == "0"
+    # Options left out keep the environment's value
+    assert env["PARSE_WORKERS"] == "3"
+
+def test_flags_override_the_env_file(environment, tmp_path):
+    env_file = tmp_path / "audit.env"
+    env_file.write_text("DELETE_BATCH_SIZE=50\nDELETE_DRY_RUN=0\nWATCH_SOURCE=poll\n")
+    cli.main(["--env-file", str(env_file), "delete", "--dry-run", "--batch-size", "200"])
+    cli.main(["watch"])
+    expected = dict.fromkeys(NAMES) | {"DELETE_BATCH_SIZE": "200", "DELETE_DRY_RUN": "1", "WATCH_SOURCE": "poll"}
+    assert environment == [("delete", expected), ("watch", expected)]
+
+def test_environment_wins_over_the_env_file(environment, monkeypatch, tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text("AUDIT_CONCURRENCY=4\nPARSE_WORKERS=2\n")
+    monkeypatch.setenv("AUDIT_CONCURRENCY", "1")
+    cli.main(["--env-file", str(env_file), "audit-languages"])
+    _, env = environment[0]
+    assert (env["AUDIT_CONCURRENCY"], env["PARSE_WORKERS"]) == ("1", "2")
+
+def test_usage_errors_do_not_run_a_script(environment, capsys):
+    with pytest.raises(SystemExit):
+        cli.main(["audit-languages", "--concurrency", "many"])
+    assert environment == []
+    assert "invalid int value" in capsys.readouterr().err
@@ -0,0 +1,95 @@
+import json
+
+from benchmarks.fake_blob import FakeBlobClient, FakeContainerClient, content_md5_base64
+from dedup import bundle_references, build_report, find_duplicate_clusters, hash_blob_ranges, list_asset_blobs
+
+def make_container(blobs, without_md5=()):
+    container = FakeContainerClient("assets")
+    for name, data in blobs.items():
+        container.upload_blob(name, data)
+    for name in without_md5:
+        container._properties[name].content_settings.content_md5 = None
+    return container
+
+def listed(container):
+    return [container._properties[name] for name in sorted(container._blobs)]
+
+def test_groups_by_listed_md5_and_size_largest_waste_first():
+    container = make_container({
+        "v1/a.png": b"x" * 10, "v2/a.png": b"x" * 10, "v3/a.png": b"x" * 10,
+        "v1/b.mp4": b"y" * 100, "v2/b.mp4": b"y" * 100,
+        "v1/c.png": b"z" * 10,
+    })
+    clusters, hashed, unhashed = find_duplicate_clusters(container, listed(container))
+    assert (hashed, unhashed) == (0, [])
+    assert container.bytes_downloaded == 0
+    assert clusters == [
+        {"md5": content_md5_base64(b"y" * 100), "size": 100, "names": ["v1/b.mp4", "v2/b.mp4"]},
+        {"md5": content_md5_base64(b"x" * 10), "size": 10, "names": ["v1/a.png", "v2/a.png", "v3/a.png"]},
+    ]
+
+def test_hashes_only_blobs_without_md5_that_share_a_size():
+    container = make_container(
+        {"v1/a.png": b"abcdefghij", "v2/a.png": b"abcdefghij", "v3/a.png": b"0123456789",
+         "v1/unique.png": b"only one of this size"},
+        without_md5=("v2/a.png", "v3/a.png", "v1/unique.png"),
+    )
+    clusters, hashed, unhashed = find_duplicate_clusters(container, listed(container), concurrency=2, range_size=4)
+    assert (hashed, unhashed) == (2, [])
+    assert container.bytes_downloaded == 20
+    assert [cluster["names"] for cluster in clusters] == [["v1/a.png", "v2/a.png"]]
+
+def test_empty_blobs_are_grouped_without_downloading():
+    container = make_container({"v1/empty.png": b"", "v2/empty.png": b"", "v3/empty.mp4": b""},
+                               without_md5=("v1/empty.png", "v2/empty.png"))
+    clusters, hashed, _ = find_duplicate_clusters(container, listed(container))
+    assert hashed == 0
+    assert container.bytes_downloaded == 0
+    assert clusters == [{"md5": content_md5_base64(b""), "size": 0,
+                         "names": ["v1/empty.png", "v2/empty.png", "v3/empty.mp4"]}]
+
+def test_a_failed_download_is_reported_and_the_rest_are_grouped(monkeypatch):
+    container = make_container({"v1/a.png": b"abcd", "v2/a.png": b"abcd", "v3/broken.png": b"wxyz"},
+                               without_md5=("v1/a.png", "v2/a.png", "v3/broken.png"))
+    download_blob = FakeBlobClient.download_blob
+
+    def flaky_download(blob_client, offset=None, length=None, **kwargs):
+        if blob_client.blob_name == "v3/broken.png":
+            raise OSError("connection reset")
+        return download_blob(blob_client, offset, length, **kwargs)
+
+    monkeypatch.setattr(FakeBlobClient, "download_blob", flaky_download)
+    clusters, hashed, unhashed = find_duplicate_clusters(container, listed(container), concurrency=2)
+    assert hashed == 2
+    assert unhashed == [{"name": "v3/broken.png", "size": 4, "error": "OSError: connection reset"}]
+    assert [cluster["names"] for cluster in clusters] == [["v1/a.png", "v2/a.png"]]
+
+def test_ranged_hash_matches_the_content_md5():
+    data = bytes(range(256)) * 5
+    container = make_container({"a.bin": data})
+    assert hash_blob_ranges(container, "a.bin", len(data), range_size=100) == content_md5_base64(data)
+    assert container.bytes_downloaded == len(data)
+
+def test_sub_prefixes_are_not_listed_again():
+    container = make_container({"images/v1/a.png": b"a", "images/v1/old/b.png": b"b", "videos/v1/c.mp4": b"c"})
+    blobs = list_asset_blobs(container, ["images/v1/old/", "videos/v1/", "images/v1/"])
+    assert sorted(blobs) == ["images/v1/a.png", "images/v1/old/b.png", "videos/v1/c.mp4"]
+
+def test_report_lists_referencing_languages():
+    container = make_container({
+        "content/v1/a.png": b"x" * 10, "content/v2/a.png": b"x" * 10,
+        "en/content-bundle.json": json.dumps({"procedures": [{"src": "/content/v1/a.png"}]}),
+        "fr/content-bundle.json": json.dumps({"procedures": [{"src": "/content/V2/a.png"}, {"src": "/content/v1/a.png"}]}),
+    })
+    assets = [blob for blob in listed(container) if blob.name.startswith("content/")]
+    clusters, _, _ = find_duplicate_clusters(container, assets)
+    paths = [f"/content/{name[len('content/'):]}" for cluster in clusters for name in cluster["names"]]
+    references = bundle_references(container, ["en", "fr", "missing"], paths)
+    report = build_report(clusters, references)
+    assert report["duplicate_clusters"] == 1
+    assert report["duplicate_blobs"] == 2
+    assert report["reclaimable_bytes"] == 10
+    assert report["clusters"][0]["copies"] == [
+        {"name": "content/v1/a.png", "path": "/content/v1/a.png", "referenced_by": ["en", "fr"]},
+        {"name": "content/v2/a.png", "path": "/content/v2/a.png", "referenced_by": ["fr"]},
+    ]
@@ -0,0 +1,85 @@
+import delete
+from benchmarks.fake_blob import FakeContainerClient
+
+def make_container():
+    container = FakeContainerClient("assets")
+    for name in ("assets/India/Image 1.png", "assets/india/b.png", "assets/keep.png", "assets/Dup.png", "assets/dup.png",
+                 "content/assets/x.png", "other/deep/c.png"):
+        container.upload_blob(name, name)
+    return container
+
+class ListingRecorder:
+    def __init__(self, container):
+        self._container = container
+        self.prefixes = []
+
+    def list_blobs(self, name_starts_with=None, **kwargs):
+        self.prefixes.append(name_starts_with)
+        return self._container.list_blobs(name_starts_with=name_starts_with, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._container, name)
+
+def test_resolves_exact_blob_names_only():
+    container = ListingRecorder(make_container())
+    entries = [
+        "assets/india/b.png",
+        "/assets/keep.png",                     # not a blob name
+        "/content/assets/dup.png",              # canonical path
+        "assets/india/b.png",
+    ]
+    names, unresolved, ambiguous = delete.resolve_blob_names(container, entries)
+    assert names == ["assets/india/b.png"]
+    assert unresolved == ["/assets/keep.png", "/content/assets/dup.png"]
+    assert ambiguous == {}
+    # Only the entries' directories are listed, never the whole container
+    assert sorted(container.prefixes) == ["/assets/", "/content/assets/", "assets/india/"]
+
+def test_canonical_matching_is_opt_in_and_skips_ambiguous_entries():
+    container = ListingRecorder(make_container())
+    entries = [
+        "/content/assets/india/image%201.png",  # canonical path from an audit report
+        "/content/assets/dup.png",              # canonical path shared by two blobs
+        "/content/assets/x.png",                # also the canonical path of content/assets/x.png
+        "/content/assets/gone.png",
+    ]
+    names, unresolved, ambiguous = delete.resolve_blob_names(container, entries, canonical=True)
+    assert names == ["assets/India/Image 1.png", "content/assets/x.png"]
+    assert unresolved == ["/content/assets/gone.png"]
+    assert ambiguous == {"/content/assets/dup.png": ["assets/Dup.png", "assets/dup.png"]}
+    assert sorted(container.prefixes) == ["/content/assets/", "assets/", "content/assets/"]
+
+def test_listing_prefixes():
+    assert delete.listing_prefixes(["a/b/c.png", "a/d.png", "e/f.png"]) == ["a/", "e/"]
+    assert delete.listing_prefixes(["root.png", "a/b.png"]) == [""]
+    assert delete.listing_prefixes(["/content/assets//a%20b.png"], canonical=True) == [
+        "/content/assets//", "assets/", "content/assets/"
+    ]
+
+def test_dry_run_counts_only_resolved_blobs(tmp_path, monkeypatch, capsys):
+    container = make_container()
+    list_file = tmp_path / "global_missed_paths.txt"
+    list_file.write_text("/content/assets/india/image%201.png\n/content/assets/gone.png\n\n")
+    monkeypatch.setattr(delete, "get_container", lambda *args: container)
+    monkeypatch.setattr(delete, "load_config", lambda: None)
+    monkeypatch.setenv("DELETE_LIST_FILE", str(list_file))
+    monkeypatch.setenv("DELETE_DRY_RUN", "1")
+    monkeypatch.setenv("DELETE_MATCH_CANONICAL", "1")
+    assert delete.main() == 1
+    assert "would delete 1 blobs, 0 failed" in capsys.readouterr().out
+    assert len(container._blobs) == 7
+    assert (tmp_path / "global_missed_paths.txt.unresolved").read_text() == "/content/assets/gone.png\n"
+
+def test_deletes_exact_names_and_skips_ambiguous_entries(tmp_path, monkeypatch):
+    container = make_container()
+    list_file = tmp_path / "unused.txt"
+    list_file.write_text("assets/keep.png\n/content/assets/dup.png\nassets/india/b.png\n")
+    monkeypatch.setattr(delete, "get_container", lambda *args: container)
+    monkeypatch.setattr(delete, "load_config", lambda: None)
+    monkeypatch.setenv("DELETE_LIST_FILE", str(list_file))
+    monkeypatch.setenv("DELETE_MATCH_CANONICAL", "1")
+    monkeypatch.delenv("DELETE_DRY_RUN", raising=False)
+    assert delete.main() == 1
+    assert "assets/Dup.png" in container._blobs and "assets/dup.png" in container._blobs
+    assert "assets/keep.png" not in container._blobs and "assets/india/b.png" not in container._blobs
+    assert (tmp_path / "unused.txt.ambiguous").read_text() == "/content/assets/dup.png\tassets/Dup.png\tassets/dup.png\n"
@@ -0,0 +1,23 @@
+from ide import list_asset_prefixes, parse_asset_version, plan_asset_prefixes
+
+def test_asset_versions_become_folder_prefixes(monkeypatch):
+    monkeypatch.delenv("ASSET_IMAGES_PREFIX", raising=False)
+    monkeypatch.delenv("ASSET_VIDEOS_PREFIX", raising=False)
+    assert parse_asset_version({"asset_version": "mena, mena%20videos"}) == ("mena/", "mena videos/")
+    monkeypatch.setenv("ASSET_IMAGES_PREFIX", "images/{}/")
+    assert parse_asset_version({"asset_version": "mena"})[0] == "images/mena/"
+
+def test_folder_is_not_a_prefix_of_a_longer_folder_name(tmp_path, monkeypatch):
+    root = tmp_path / "assets"
+    for name in ("mena/a.png", "mena/v.mp4", "mena - ar/b.png", "menace/c.png"):
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_bytes(b"x")
+    monkeypatch.setenv("LOCAL_STORAGE_ROOT", str(tmp_path))
+    _, prefixes = plan_asset_prefixes({"en": {"asset_version": "mena"}, "ar": {"asset_version": "mena - ar"}})
+    assert prefixes == ["mena - ar/", "mena/"]
+    listings, names = list_asset_prefixes("assets", prefixes)
+    assert len(listings["mena/"]["images"]) == 1
+    assert len(listings["mena/"]["videos"]) == 1
+    assert len(listings["mena - ar/"]["images"]) == 1
+    assert names["mena - ar/"]["images"] == ["mena - ar/b.png"]
+    assert listings["mena - ar/"]["images"] == ["/content/mena%20-%20ar/b.png"]
@@ -0,0 +1,77 @@
+from benchmarks.fake_blob import FakeContainerClient
+from canonical_path import canonical_path
+from inventory import Inventory
+
+def exact_path(name):
+    return f"/{name}"
+
+def make_container():
+    container = FakeContainerClient("assets")
+    for name in ("content/A%20b.png", "content/c.png", "content/d.PNG", "contents/e.png", "other/f.png"):
+        container.upload_blob(name, name.encode())
+    return container
+
+def test_schemes_sharing_a_database_do_not_rewrite_each_other(tmp_path):
+    db = str(tmp_path / "inventory.db")
+    container = make_container()
+    stats = []
+    for _ in range(2):
+        for scheme, to_path in (("exact", exact_path), ("canonical", canonical_path)):
+            inventory = Inventory(db, path_scheme=scheme)
+            stats.append(inventory.sync(container, "content/", to_path))
+            inventory.close()
+    assert stats[0] == {"listed": 3, "added": 3, "updated": 0, "removed": 0}
+    assert stats[1:] == [{"listed": 3, "added": 0, "updated": 0, "removed": 0}] * 3
+
+    exact = Inventory(db, path_scheme="exact")
+    canonical = Inventory(db, path_scheme="canonical")
+    assert list(exact.blob_paths("assets", "content/")) == ["/content/A%20b.png", "/content/c.png", "/content/d.PNG"]
+    assert list(canonical.blob_paths("assets", "content/")) == [
+        canonical_path("content/A%20b.png"), canonical_path("content/c.png"), canonical_path("content/d.PNG")
+    ]
+
+def test_sync_counts_changes_and_removals(tmp_path):
+    db = str(tmp_path / "inventory.db")
+    container = make_container()
+    inventory = Inventory(db)
+    inventory.sync(container, "content/", exact_path)
+    container.upload_blob("content/c.png", b"changed")
+    container.upload_blob("content/g.png", b"new")
+    container.delete_blobs("content/d.PNG")
+    stats = inventory.sync(container, "content/", exact_path)
+    assert stats == {"listed": 3, "added": 1, "updated": 1, "removed": 1}
+    # "contents/" shares the "content" characters but not the "content/" prefix
+    assert list(inventory.blob_paths("assets", "content/")) == ["/content/A%20b.png", "/content/c.png", "/content/g.png"]
+
+def test_scope_filters_prefix_and_suffix(tmp_path):
+    inventory = Inventory(str(tmp_path / "inventory.db"))
+    container = make_container()
+    inventory.sync(container, "", exact_path)
+    inventory.load_json_paths(["/content/c.png", "/content/missing.png", "/other/f.png"])
+    scope = ("assets", "content/", ".png")
+    assert list(inventory.blob_paths(*scope)) == ["/content/A%20b.png", "/content/c.png"]
+    assert sorted(inventory.common_paths(*scope)) == ["/content/c.png"]
+    assert sorted(inventory.missed_paths(*scope)) == ["/content/A%20b.png"]
+    assert sorted(inventory.json_only_paths(*scope)) == ["/content/missing.png", "/other/f.png"]
+    assert list(inventory.blob_paths("assets", "")) == [
+        "/content/A%20b.png", "/content/c.png", "/content/d.PNG", "/contents/e.png", "/other/f.png"
+    ]
+
+def test_prefix_scope_uses_the_primary_key_range(tmp_path):
+    inventory = Inventory(str(tmp_path / "inventory.db"))
+    clause, params = inventory._scope("assets", "content/", ".png")
+    (plan,) = [row[-1] for row in inventory.conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT b.path FROM blob_paths b WHERE {clause}", params
+    )]
+    assert "container=? AND scheme=? AND name>? AND name<?" in plan
+
+def test_version_1_database_is_rebuilt(tmp_path):
+    import sqlite3
+    db = str(tmp_path / "inventory.db")
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE blobs (container TEXT NOT NULL, name TEXT NOT NULL, path TEXT NOT NULL, "
+                 "size INTEGER, last_modified TEXT, etag TEXT, content_md5 TEXT, PRIMARY KEY (container, name))")
+    conn.commit()
+    conn.close()
+    inventory = Inventory(db)
+    assert inventory.sync(make_container(), "content/", exact_path)["added"] == 3
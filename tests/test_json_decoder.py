@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+import json_decoder
+from bundle_cache import src_values_from_chunks
+from json_decoder import available_decoders, decode_bundle, make_decoder
+
+BUNDLE = {"procedures": [{"src": "/content/a.png"}], "modules": [{"src": "/content/b.png"}]}
+DATA = json.dumps(BUNDLE).encode()
+
+@pytest.fixture(params=available_decoders())
+def decoder(request, monkeypatch):
+    monkeypatch.setattr(json_decoder, "_decoder", make_decoder(request.param))
+    monkeypatch.delenv("JSON_DECODE_SECTIONS", raising=False)
+    return request.param
+
+def test_decodes_bundles_with_a_byte_order_mark(decoder):
+    assert decode_bundle(b"\xef\xbb\xbf" + DATA) == BUNDLE
+    assert decode_bundle("﻿" + DATA.decode()) == BUNDLE
+    assert decode_bundle(b"\xef\xbb\xbf" + DATA, sections=["modules"]) == {"modules": BUNDLE["modules"]}
+    assert decode_bundle(DATA) == BUNDLE
+
+def test_threshold_path_accepts_a_byte_order_mark(decoder):
+    chunks = [b"\xef\xbb", b"\xbf" + DATA]
+    assert list(src_values_from_chunks(iter(chunks), ("src",), threshold=1 << 20)) == ["/content/a.png", "/content/b.png"]
+    # Above the threshold the streaming parser reads the same bundle
+    assert list(src_values_from_chunks(iter(chunks), ("src",), threshold=0)) == ["/content/a.png", "/content/b.png"]
+
+def test_unknown_decoder():
+    with pytest.raises(ValueError):
+        make_decoder("yaml")
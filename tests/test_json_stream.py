@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from bundle_cache import src_values_from_chunks
+from json_stream import JsonStreamParser, iter_src_values
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize("document", [
+    '{"src":"a" "b":1}',
+    '{"src" "a"}',
+    '[1 2]',
+    '{"a":1,}',
+    '[1,]',
+    '{} {}',
+    '{"a"}',
+    '{,}',
+    '{:1}',
+    '{"a":1]',
+    '[01]',
+    '[+1]',
+    '{"a":1',
+    '',
+    '{"a":"a\nb"}',
+    '{"a":"tab\there"}',
+    '{"a":"x\\\nb"}',
+])
+def test_rejects_malformed_json(document):
+    with pytest.raises(ValueError):
+        list(JsonStreamParser([document]))
+
+def test_events_match_json_loads():
+    document = {"a": [1, -2.5e3, {"src": " x "}], "b": {}, "c": [], "d": [True, False, None], "e": "é\\n"}
+    events = list(JsonStreamParser([json.dumps(document)]))
+    assert events[:4] == [("start_map", None), ("map_key", "a"), ("start_array", None), ("number", 1)]
+    assert ("string", " x ") in events
+    assert ("string", "é\\n") in events
+    assert events[-1] == ("end_map", None)
+
+def test_chunk_boundaries_do_not_change_values():
+    document = json.dumps({"items": [{"src": f"/p/{i}.png", "n": i * 1.5} for i in range(200)]}).encode()
+    expected = [f"/p/{i}.png" for i in range(200)]
+    for size in (1, 2, 7, 64, len(document)):
+        assert list(iter_src_values(split(document, size))) == expected
+
+def test_multibyte_characters_split_across_chunks():
+    document = json.dumps({"src": "/café/漢.png"}, ensure_ascii=False).encode()
+    assert list(iter_src_values(split(document, 1))) == ["/café/漢.png"]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 100])
+def test_strips_utf8_bom(size):
+    document = b'\xef\xbb\xbf{"src": "/a.png"}'
+    assert list(iter_src_values(split(document, size))) == ["/a.png"]
+    assert list(iter_src_values(['﻿{"src": "/a.png"}'])) == ["/a.png"]
+
+def test_error_reports_position():
+    with pytest.raises(ValueError, match="line 2, column 8"):
+        list(JsonStreamParser(['{"src":"a",\n "b":1 "c":2}']))
+
+@pytest.mark.parametrize("size", [1, 4, 100])
+def test_control_character_in_string_reports_its_position(size):
+    document = '{"src": "a",\n "b": "one\ntwo",\n "c": 1}'
+    with pytest.raises(ValueError, match="Invalid control character '\\\\n' in string at line 2, column 11"):
+        list(JsonStreamParser(split(document, size)))
+
+def test_only_listed_keys_are_extracted():
+    document = '{"src": "a", "icon": {"src": "b"}, "other": "c", "srcs": ["d"], "href": " e "}'
+    assert list(iter_src_values([document])) == ["a", "b"]
+    assert list(iter_src_values([document], keys=("src", "href"))) == ["a", "b", "e"]
+
+@pytest.mark.parametrize("threshold", [0, 10, 1 << 20])
+def test_threshold_extraction_matches_streaming(threshold):
+    document = json.dumps({"items": [{"src": f" /p/{i}.png "} for i in range(100)]}).encode()
+    chunks = split(document, 64)
+    assert list(src_values_from_chunks(iter(chunks), threshold=threshold)) == list(iter_src_values(chunks))
+
+def test_threshold_extraction_rejects_malformed_json():
+    for threshold in (0, 1 << 20):
+        with pytest.raises(ValueError):
+            list(src_values_from_chunks([b'{"src":"a" "b":1}'], threshold=threshold))
+
+def test_streams_every_bundle_by_default(monkeypatch):
+    import bundle_cache
+
+    def decode_whole(data):
+        raise AssertionError("the bundle was decoded whole")
+
+    monkeypatch.delenv("STREAM_THRESHOLD_BYTES", raising=False)
+    monkeypatch.setattr(bundle_cache, "decode_bundle", decode_whole)
+    assert list(src_values_from_chunks([b'{"src": "/a.png"}'])) == ["/a.png"]
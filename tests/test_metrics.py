@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+import metrics
+from metrics import RunMetrics, export_metrics, increment, prometheus_text, set_gauge, stage, timed
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "_metrics", RunMetrics())
+    monkeypatch.delenv("METRICS_DIR", raising=False)
+
+def record():
+    with stage("compare", language='pt"BR'):
+        pass
+    with stage("compare", language="en"):
+        pass
+
+    @timed("list")
+    def listing():
+        return 3
+
+    assert listing() == 3
+    listing()
+    increment("blobs_listed", 5000)
+    increment("blobs_listed", 12)
+    increment("bytes_downloaded", 7, container="json")
+    set_gauge("languages", 2)
+
+def test_json_export(tmp_path):
+    record()
+    summary = export_metrics("test", {"cache_hits": 4, "note": "skipped"}, None, directory=str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["test.prom", "test_metrics.json"]
+    assert json.loads((tmp_path / "test_metrics.json").read_text()) == summary
+    assert summary["job"] == "test"
+    assert summary["stages"][0]["name"] == "compare" and summary["stages"][0]["labels"] == {"language": "en"}
+    assert [(entry["name"], entry["calls"]) for entry in summary["stages"]] == [("compare", 1), ("compare", 1),
+                                                                               ("list", 2)]
+    assert summary["counters"] == [
+        {"name": "blobs_listed", "labels": {}, "value": 5012},
+        {"name": "bytes_downloaded", "labels": {"container": "json"}, "value": 7},
+    ]
+    assert summary["gauges"] == [
+        {"name": "cache_hits", "labels": {}, "value": 4},
+        {"name": "languages", "labels": {}, "value": 2},
+    ]
+
+def test_prometheus_text():
+    record()
+    lines = prometheus_text("test").splitlines()
+    assert "# TYPE blob_audit_stage_seconds gauge" in lines
+    assert 'blob_audit_stage_calls{job="test",stage="list"} 2' in lines
+    assert 'blob_audit_stage_calls{job="test",stage="compare",language="pt\\"BR"} 1' in lines
+    assert "# TYPE blob_audit_blobs_listed_total counter" in lines
+    assert 'blob_audit_blobs_listed_total{job="test"} 5012' in lines
+    assert 'blob_audit_bytes_downloaded_total{job="test",container="json"} 7' in lines
+    assert 'blob_audit_languages{job="test"} 2' in lines
+    assert any(line.startswith('blob_audit_duration_seconds{job="test"} ') for line in lines)
+    # Every sample belongs to a family declared just before it
+    declared = set()
+    for line in lines:
+        if line.startswith("# TYPE "):
+            declared.add(line.split()[2])
+        elif not line.startswith("#"):
+            assert line.split("{")[0] in declared
+
+def test_nothing_is_written_without_a_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    record()
+    assert export_metrics("test") is None
+    assert os.listdir(tmp_path) == []
+
+def test_metrics_dir_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("METRICS_DIR", str(tmp_path / "metrics"))
+    export_metrics("ide")
+    assert sorted(os.listdir(tmp_path / "metrics")) == ["ide.prom", "ide_metrics.json"]
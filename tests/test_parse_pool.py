@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+import config
+import parse_pool
+import test as audit
+from canonical_path import canonical_path
+from json_stream import iter_src_values
+from parse_pool import ParsePool, parse_bundle_file
+
+DOCUMENT = {"items": [{"src": f" /content/assets/{i % 7}.png ", "icon": {"src": f"/Content/x%20{i}.png"}}
+                      for i in range(50)]}
+
+def chunks(data, size=64):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_worker_matches_the_serial_extraction(tmp_path):
+    path = tmp_path / "bundle.json"
+    path.write_text(json.dumps(DOCUMENT))
+    serial = list(iter_src_values(chunks(path.read_bytes())))
+    assert parse_bundle_file(str(path)) == sorted(set(serial))
+    assert parse_bundle_file(str(path), canonical=True) == sorted(set(map(canonical_path, serial)))
+
+def test_pool_output_equals_the_serial_run(tmp_path):
+    data = json.dumps(DOCUMENT).encode("utf-8")
+    serial = sorted(set(map(canonical_path, iter_src_values(chunks(data)))))
+    pool = ParsePool(2, str(tmp_path / "spill"))
+    try:
+        assert pool.parse_chunks(chunks(data), canonical=True) == serial
+        with pytest.raises(ValueError):
+            pool.parse_chunks([b'{"src": "a" "b": 1}'])
+    finally:
+        pool.shutdown()
+    # Spill files are removed once parsed, also when parsing fails
+    assert os.listdir(tmp_path / "spill") == []
+
+def test_audit_reports_match_with_and_without_the_pool(tmp_path, monkeypatch):
+    root = tmp_path / "blobs"
+    for i in range(12):
+        path = root / "assets" / "assets" / f"{i}.png"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"png")
+    for language in ("en", "fr", "de"):
+        path = root / "json" / "languages" / language / "content-bundle.json"
+        path.parent.mkdir(parents=True)
+        path.write_text(json.dumps({"media": [{"src": f"/content/assets/{i}.png"}
+                                              for i in range(len(language) * 3, 12, len(language))]}))
+    monkeypatch.setattr(config, "_loaded", True)
+    monkeypatch.setenv("LOCAL_STORAGE_ROOT", str(root))
+    monkeypatch.setenv("BLOB_CONTAINER_ASSETS", "assets")
+    monkeypatch.setenv("BLOB_CONTAINER_JSON", "json")
+    monkeypatch.setenv("CHECKPOINTS", "0")
+    for name in ("AUDIT_RESUME", "METRICS_DIR", "VALIDATE_BUNDLES", "PARSE_SPILL_DIR"):
+        monkeypatch.delenv(name, raising=False)
+
+    reports = {}
+    for workers in ("0", "2"):
+        output_dir = tmp_path / f"out{workers}"
+        monkeypatch.setenv("OUTPUT_DIR", str(output_dir))
+        monkeypatch.setenv("PARSE_WORKERS", workers)
+        audit.main()
+        reports[workers] = {name: (output_dir / name).read_text() for name in sorted(os.listdir(output_dir))}
+    assert parse_pool._pool is None
+    assert reports["2"] == reports["0"]
+    assert reports["0"]["en_common_paths.txt"]
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from path_index import PathIndex
+
+ASSETS = [f"/content/assets/{folder}/{i}.png" for folder in ("a", "b", "c") for i in range(50)]
+LANGUAGES = {
+    "en": ASSETS[:40] + ["/content/assets/missing.png"],
+    "fr": ASSETS[30:90],
+    "de": [],
+    "ar": ASSETS[30:40] * 3,
+}
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_matches_set_arithmetic(compact):
+    shuffled = ASSETS + ASSETS[:10]  # unsorted, with duplicates
+    random.Random(0).shuffle(shuffled)
+    index = PathIndex(shuffled, compact=compact)
+    assert len(index) == len(ASSETS)
+
+    for values in LANGUAGES.values():
+        referenced = index.lookup(values)
+        expected_common = set(values) & set(ASSETS)
+        assert set(index.common_paths(referenced)) == expected_common
+        assert len(index.common_paths(referenced)) == len(expected_common)
+        assert sorted(index.missed_paths(referenced)) == sorted(set(ASSETS) - set(values))
+        index.add_references(referenced)
+
+    used = set().union(*LANGUAGES.values())
+    assert index.languages == len(LANGUAGES)
+    assert sorted(index.unused_paths()) == sorted(set(ASSETS) - used)
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_repeated_references_count_once_per_language(compact):
+    index = PathIndex(ASSETS[:3], compact=compact)
+    index.add_references(index.lookup([ASSETS[0]] * 5))
+    assert list(index.refcounts) == [1, 0, 0]
+
+def test_empty_index():
+    for compact in (False, True):
+        index = PathIndex([], compact=compact)
+        assert index.lookup(["/content/a.png"]) == set()
+        assert index.unused_paths() == []
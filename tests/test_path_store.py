@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+import path_store
+from path_store import BLOCK_SIZE, PathTable, make_path_set
+
+def sample_paths(count, seed=0):
+    rng = random.Random(seed)
+    folders = ["/content/assets/images/india", "/content/assets/images/india - ar", "/content/assets/videos", "/content/é"]
+    return [f"{rng.choice(folders)}/{rng.randrange(10 ** 6):06d}_{rng.choice(['a', 'ß', '漢'])}.png" for _ in range(count)]
+
+@pytest.mark.parametrize("count", [0, 1, BLOCK_SIZE - 1, BLOCK_SIZE, BLOCK_SIZE + 1, 1000])
+def test_round_trip(count):
+    paths = sample_paths(count)
+    expected = sorted(set(paths))
+    table = PathTable.from_iterable(paths)
+    assert len(table) == len(expected)
+    assert list(table) == expected
+    for path_id, path in enumerate(expected):
+        assert table[path_id] == path
+        assert table.index(path) == path_id
+        assert path in table
+
+def test_missing_paths_and_bounds():
+    expected = sorted(set(sample_paths(200)))
+    table = PathTable.from_iterable(expected)
+    for missing in ("", "/", "/content", expected[0][:-1], expected[-1] + "x", "\U0010ffff"):
+        assert table.index(missing) == -1
+        assert missing not in table
+    with pytest.raises(IndexError):
+        table[len(expected)]
+    with pytest.raises(IndexError):
+        table[-1]
+
+def test_set_operations_match_python_sets():
+    left = sample_paths(500, seed=1) + sample_paths(100, seed=3)
+    right = sample_paths(300, seed=2) + sample_paths(100, seed=3)
+    left_table, right_table = PathTable.from_iterable(left), PathTable.from_iterable(right)
+    assert list(left_table.intersection(right_table)) == sorted(set(left) & set(right))
+    assert list(left_table.difference(right_table)) == sorted(set(left) - set(right))
+    assert list(left_table.intersection(set(right))) == sorted(set(left) & set(right))
+    assert list(left_table - set(right)) == sorted(set(left) - set(right))
+
+def test_rejects_unsorted_input():
+    with pytest.raises(ValueError):
+        PathTable.from_sorted(["/b", "/a"])
+
+def test_is_smaller_than_a_set():
+    paths = sample_paths(5000)
+    assert PathTable.from_iterable(paths).memory_bytes() * 3 < sum(map(len, paths)) + 5000 * 49
+
+@pytest.mark.parametrize("compact", ["0", "1"])
+def test_make_path_set_collects_duplicates(compact, monkeypatch):
+    monkeypatch.setenv("COMPACT_PATH_SETS", compact)
+    duplicates = set()
+    path_set = make_path_set(["/c", "/a", "/b", "/a", "/c", "/c"], duplicates)
+    assert sorted(path_set) == ["/a", "/b", "/c"]
+    assert duplicates == {"/a", "/c"}
+    assert isinstance(path_set, PathTable) == (compact == "1")
+    assert path_store.compact_path_sets_enabled() == (compact == "1")
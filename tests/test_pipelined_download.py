@@ -0,0 +1,94 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.fake_blob import FakeContainerClient
+from bundle_cache import bundle_src_values
+from pipelined_download import download_settings, iter_ranged_chunks
+
+class RecordingBlobClient:
+    """Wraps a fake blob client and records the ranges requested from it."""
+
+    def __init__(self, container, name, content_range=False):
+        self._blob_client = container.get_blob_client(name)
+        self.blob_name = name
+        self.content_range = content_range
+        self.ranges = []
+        self._lock = threading.Lock()
+
+    def download_blob(self, offset=None, length=None, **kwargs):
+        with self._lock:
+            self.ranges.append((offset, length))
+        downloader = self._blob_client.download_blob(offset=offset, length=length)
+        if self.content_range:
+            # The SDK reports a ranged GET's length as its size and the blob size in Content-Range
+            properties = downloader.properties
+            downloader.properties = SimpleNamespace(
+                etag=properties.etag, size=downloader.size,
+                content_range=f"bytes {offset}-{offset + downloader.size - 1}/{properties.size}",
+            )
+        return downloader
+
+def make_blob(data):
+    container = FakeContainerClient("json")
+    container.upload_blob("blob", data)
+    return container
+
+@pytest.mark.parametrize("size, chunk_size", [(0, 8), (5, 8), (64, 8), (65, 8), (1000, 7)])
+@pytest.mark.parametrize("content_range", [False, True])
+def test_yields_the_blob_in_order(size, chunk_size, content_range):
+    data = bytes(index % 251 for index in range(size))
+    blob_client = RecordingBlobClient(make_blob(data), "blob", content_range and size > 0)
+    chunks = list(iter_ranged_chunks(blob_client, chunk_size=chunk_size, concurrency=3, max_buffered_bytes=20))
+    assert b"".join(chunks) == data
+    # The first request asks for a whole range; the rest are cut to the blob size
+    later = [(offset, min(chunk_size, size - offset)) for offset in range(chunk_size, size, chunk_size)]
+    assert sorted(blob_client.ranges) == [(0, chunk_size)] + later
+
+def test_downloads_stay_within_the_buffer_limit():
+    blob_client = RecordingBlobClient(make_blob(b"x" * 1000), "blob")
+    chunks = iter_ranged_chunks(blob_client, chunk_size=10, concurrency=2, max_buffered_bytes=30)
+    next(chunks)
+    next(chunks)
+    chunks.close()
+    # The first range, the window of three behind it and one more once the consumer took a range
+    assert len(blob_client.ranges) <= 5
+
+def test_reuses_the_first_downloader():
+    container = make_blob(b"abcdefghij" * 3)
+    blob_client = RecordingBlobClient(container, "blob")
+    first = container.get_blob_client("blob").download_blob(offset=0, length=10)
+    assert b"".join(iter_ranged_chunks(blob_client, first=first, chunk_size=10)) == b"abcdefghij" * 3
+    assert sorted(blob_client.ranges) == [(10, 10), (20, 10)]
+
+def test_fails_when_the_blob_changes_during_the_download():
+    container = make_blob(b"a" * 30)
+    blob_client = RecordingBlobClient(container, "blob")
+    chunks = iter_ranged_chunks(blob_client, chunk_size=10, concurrency=1, max_buffered_bytes=10)
+    next(chunks)
+    next(chunks)
+    container.upload_blob("blob", b"b" * 30)
+    with pytest.raises(RuntimeError, match="changed while it was being downloaded"):
+        list(chunks)
+
+def test_download_settings(monkeypatch):
+    monkeypatch.setenv("PIPELINED_DOWNLOADS", "0")
+    assert download_settings() is None
+    monkeypatch.setenv("PIPELINED_DOWNLOADS", "1")
+    monkeypatch.setenv("DOWNLOAD_CHUNK_SIZE", "1024")
+    monkeypatch.setenv("DOWNLOAD_CONCURRENCY", "2")
+    monkeypatch.setenv("DOWNLOAD_MAX_BUFFERED_BYTES", "4096")
+    assert download_settings() == {"chunk_size": 1024, "concurrency": 2, "max_buffered_bytes": 4096}
+
+@pytest.mark.parametrize("threshold", ["0", "67108864"])
+def test_pipelined_and_single_stream_extraction_agree(monkeypatch, threshold):
+    bundle = {"procedures": [{"src": f"/content/{index}.png", "pad": "x" * 50} for index in range(200)]}
+    container = make_blob(json.dumps(bundle))
+    monkeypatch.setenv("STREAM_THRESHOLD_BYTES", threshold)
+    monkeypatch.setenv("DOWNLOAD_CHUNK_SIZE", "1000")
+    monkeypatch.setenv("PIPELINED_DOWNLOADS", "1")
+    pipelined = bundle_src_values(container, "blob")
+    monkeypatch.setenv("PIPELINED_DOWNLOADS", "0")
+    assert pipelined == bundle_src_values(container, "blob") == [f"/content/{index}.png" for index in range(200)]
@@ -0,0 +1,45 @@
+import gzip
+import hashlib
+import json
+import os
+
+import pytest
+
+from report_writer import ReportWriter, report_writer_from_env
+
+PATHS = ["/content/b.png", "/content/a.png", "/content/é.png"]
+
+def read(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+@pytest.mark.parametrize("sort", [False, True])
+@pytest.mark.parametrize("compress", [False, True])
+def test_manifest_records_hashes_and_line_counts(tmp_path, sort, compress):
+    writer = ReportWriter(str(tmp_path), sort=sort, compress=compress)
+    assert writer.write("paths.txt", iter(PATHS)) == 3
+    assert writer.write("empty.txt", []) == 0
+    manifest = writer.write_manifest(run="test")
+
+    expected = "".join(f"{path}\n" for path in (sorted(PATHS) if sort else PATHS)).encode("utf-8")
+    entry = manifest["files"]["paths.txt"]
+    assert entry["path"] == ("paths.txt.gz" if compress else "paths.txt")
+    data = read(tmp_path / entry["path"])
+    # The hash and line count describe the report's text, compressed or not
+    assert (gzip.decompress(data) if compress else data) == expected
+    assert entry["sha256"] == hashlib.sha256(expected).hexdigest()
+    assert entry["lines"] == writer.count("paths.txt") == 3
+    assert (entry["sorted"], entry["compressed"]) == (sort, compress)
+    assert manifest["files"]["empty.txt"]["lines"] == 0
+    assert manifest["files"]["empty.txt"]["sha256"] == hashlib.sha256(b"").hexdigest()
+
+    assert json.loads((tmp_path / "manifest.json").read_text()) == manifest
+    assert manifest["run"] == "test"
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+def test_settings_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPORT_SORT", "1")
+    monkeypatch.setenv("REPORT_COMPRESS", "0")
+    writer = report_writer_from_env(str(tmp_path / "out"))
+    assert (writer.sort, writer.compress) == (True, False)
+    assert os.path.isdir(tmp_path / "out")
@@ -0,0 +1,62 @@
+import sys
+
+from json_stream import iter_src_values
+from src_extract import iter_values
+
+def recursive_src_values(json_data, keys=("src",)):
+    # The recursive helper iter_values replaced
+    values = []
+    if isinstance(json_data, dict):
+        for key, value in json_data.items():
+            if key in keys and isinstance(value, str):
+                values.append(value.strip())
+            elif isinstance(value, (dict, list)):
+                values.extend(recursive_src_values(value, keys))
+    elif isinstance(json_data, list):
+        for item in json_data:
+            values.extend(recursive_src_values(item, keys))
+    return values
+
+BUNDLE = {
+    "procedures": [
+        {"id": 1, "src": " /content/a.png ", "chapters": [{"src": "/content/b.mp4", "icon": {"src": "/icon/c.png"}}]},
+        {"id": 2, "src": 3, "steps": [[{"src": "/content/d.png"}], []]},
+    ],
+    "actioncards": {"src": {"src": "/content/e.png"}, "href": "/content/f.png"},
+    "src": "/content/top.png",
+}
+
+def test_matches_recursive_extraction_in_document_order():
+    assert list(iter_values(BUNDLE)) == recursive_src_values(BUNDLE)
+    assert list(iter_values(BUNDLE, keys=("src", "href"))) == recursive_src_values(BUNDLE, ("src", "href"))
+
+def test_matches_streaming_extraction():
+    import json
+    assert list(iter_values(BUNDLE)) == list(iter_src_values([json.dumps(BUNDLE)]))
+
+def test_nesting_deeper_than_the_recursion_limit():
+    depth = sys.getrecursionlimit() * 3
+    document = {"src": "/content/leaf.png"}
+    for level in range(depth):
+        document = [document] if level % 2 else {"child": document}
+    assert list(iter_values(document)) == ["/content/leaf.png"]
+
+def test_scalars_and_empty_containers():
+    assert list(iter_values("src")) == []
+    assert list(iter_values(None)) == []
+    assert list(iter_values({})) == []
+    assert list(iter_values([[], {}, [[]]])) == []
+
+def test_path_patterns_restrict_matches():
+    values = list(iter_values(BUNDLE, path_patterns=["procedures/chapters/src"]))
+    assert values == ["/content/b.mp4"]
+    # fnmatch wildcards also match across "/"
+    values = list(iter_values(BUNDLE, path_patterns=["procedures/chapters/*"]))
+    assert values == ["/content/b.mp4", "/icon/c.png"]
+    values = list(iter_values(BUNDLE, path_patterns=["procedures/src", "src"]))
+    assert values == ["/content/a.png", "/content/top.png"]
+    assert list(iter_values(BUNDLE, path_patterns=["*/icon/src"])) == ["/icon/c.png"]
+
+def test_is_lazy():
+    values = iter_values({"items": [{"src": "/a"}, {"src": "/b"}]})
+    assert next(values) == "/a"
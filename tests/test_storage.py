@@ -0,0 +1,89 @@
+import io
+import os
+
+import pytest
+
+from blob_listing import list_blobs_sharded
+from storage import LocalBlobPrefix, LocalContainer, LocalDownloader, get_container, local_root_for
+
+NAMES = ["assets/a.png", "assets/img/b.png", "assets/img/deep/c.png", "assets/imgs/d.png", "other/e.png", "top.png"]
+
+@pytest.fixture
+def container(tmp_path):
+    for name in NAMES:
+        path = tmp_path / "blobs" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(name.encode("utf-8"))
+    (tmp_path / "blobs" / "empty").mkdir()
+    return LocalContainer(str(tmp_path / "blobs"), "assets", walk_concurrency=4)
+
+@pytest.mark.parametrize("prefix,expected", [
+    (None, NAMES),
+    ("assets/", NAMES[:4]),
+    ("assets/img", NAMES[1:4]),
+    ("assets/img/", NAMES[1:3]),
+    ("assets/a", NAMES[:1]),
+    ("missing/", []),
+])
+def test_list_blobs_walks_the_tree_in_name_order(container, prefix, expected):
+    blobs = list(container.list_blobs(name_starts_with=prefix))
+    assert [blob.name for blob in blobs] == expected
+    assert all(blob.size == len(blob.name) for blob in blobs)
+
+def test_list_blobs_pages(container):
+    pages = container.list_blobs().by_page()
+    assert [len(list(page)) for page in pages] == [len(NAMES)]
+
+def test_walk_blobs_returns_one_level(container):
+    items = container.walk_blobs(name_starts_with="assets/", delimiter="/")
+    assert [(item.name, isinstance(item, LocalBlobPrefix)) for item in items] == [
+        ("assets/a.png", False), ("assets/img/", True), ("assets/imgs/", True),
+    ]
+    assert [item.name for item in container.walk_blobs()] == ["assets/", "empty/", "other/", "top.png"]
+
+def test_sharded_listing_over_a_local_tree(container):
+    names = [blob.name for blob in list_blobs_sharded(container, "", depth=2, concurrency=4, sort=True)]
+    assert names == NAMES
+
+def test_downloads_ranges_and_chunks(container):
+    blob = container.get_blob_client("assets/img/deep/c.png")
+    data = b"assets/img/deep/c.png"
+    assert blob.download_blob().readall() == data
+    assert blob.download_blob(offset=7, length=3).readall() == b"img"
+    assert blob.download_blob(offset=16, length=100).readall() == b"c.png"
+    assert blob.download_blob(offset=100).readall() == b""
+
+    downloader = LocalDownloader(container.local_path(blob.blob_name), blob.get_blob_properties(), chunk_size=4)
+    assert list(downloader.chunks()) == [data[i:i + 4] for i in range(0, len(data), 4)]
+    stream = io.BytesIO()
+    assert blob.download_blob(offset=7).readinto(stream) == len(data) - 7
+    assert stream.getvalue() == data[7:]
+
+def test_etag_changes_when_the_file_is_rewritten(container):
+    blob = container.get_blob_client("top.png")
+    etag = blob.get_blob_properties().etag
+    assert blob.download_blob().properties.etag == etag
+    path = container.local_path("top.png")
+    with open(path, 'wb') as file:
+        file.write(b"rewritten")
+    os.utime(path, ns=(0, 10 ** 9))
+    assert blob.get_blob_properties().etag != etag
+
+def test_empty_blob_downloads(tmp_path):
+    (tmp_path / "empty.json").write_bytes(b"")
+    blob = LocalContainer(str(tmp_path)).get_blob_client("empty.json")
+    assert blob.download_blob().readall() == b""
+    assert list(blob.download_blob().chunks()) == []
+
+def test_delete_blobs_reports_missing_ones(container):
+    responses = list(container.delete_blobs("top.png", "top.png"))
+    assert [response.status_code for response in responses] == [202, 404]
+    assert not os.path.exists(container.local_path("top.png"))
+
+def test_container_roots_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCAL_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setenv("LOCAL_CONTAINER_ROOTS", f"json={tmp_path / 'mirror'}, broken")
+    assert local_root_for("json") == str(tmp_path / "mirror")
+    assert local_root_for("assets") == os.path.join(str(tmp_path), "assets")
+    container = get_container("assets")
+    assert isinstance(container, LocalContainer) and container.container_name == "assets"
@@ -0,0 +1,182 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.fake_blob import FakeContainerClient, FakeHttpResponseError
+from throttle import GovernedContainer, ThrottleGovernor
+
+def make_governor(**options):
+    settings = {"initial": 8, "maximum": 32, "cooldown": 0.0, "backoff": 0.0, "max_retries": 3}
+    settings.update(options)
+    return ThrottleGovernor(**settings)
+
+def fails(statuses, result="ok"):
+    """A function that raises FakeHttpResponseError with each status in turn, then returns `result`."""
+    statuses = list(statuses)
+
+    def function():
+        if statuses:
+            raise FakeHttpResponseError(statuses.pop(0))
+        return result
+    return function
+
+def test_throttling_cuts_the_limit_multiplicatively_down_to_the_minimum():
+    governor = make_governor(initial=8, minimum=2, decrease=0.5)
+    governor.record_throttle()
+    assert governor.limit == 4
+    governor.record_throttle()
+    governor.record_throttle()
+    assert governor.limit == 2
+    assert governor.stats()["throttle_lowest_limit"] == 2
+    assert governor.throttled == 3
+
+def test_cuts_at_most_once_per_cooldown():
+    governor = make_governor(initial=8, cooldown=60.0)
+    for _ in range(5):
+        governor.record_throttle()
+    assert governor.limit == 4
+
+def test_limit_grows_additively_only_while_saturated():
+    governor = make_governor(initial=1, maximum=3, latency_tolerance=float("inf"))
+    assert governor.call("list", lambda: "page") == "page"
+    assert governor.limit == 2  # the only slot was taken
+    governor.call("list", lambda: "page")
+    assert governor.limit == 2  # one call in flight out of two slots is no demand for more
+
+    release = threading.Event()
+    threads = [threading.Thread(target=governor.call, args=("list", release.wait)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    while governor.in_flight < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert governor.limit == pytest.approx(2.5)
+    for _ in range(20):
+        governor._acquire()
+        governor._release("list", 0.0)
+    assert governor.limit <= 3
+
+def test_slow_calls_do_not_raise_the_limit():
+    governor = make_governor(initial=1, latency_tolerance=3.0)
+    governor._acquire()
+    governor._release("download", 0.01)
+    limit = governor.limit
+    governor._acquire()
+    governor._release("download", 1.0)
+    assert governor.limit == limit
+
+def test_retry_after_pauses_new_calls():
+    governor = make_governor()
+    governor.record_throttle(retry_after=0.2)
+    started = time.monotonic()
+    governor.call("properties", lambda: None)
+    assert time.monotonic() - started >= 0.15
+
+def test_throttled_calls_are_retried_then_given_up():
+    governor = make_governor(initial=8, max_retries=2)
+    assert governor.call("list", fails([503, 429])) == "ok"
+    assert governor.retries == 2
+    assert governor.throttled == 2
+    assert governor.limit == 2
+    with pytest.raises(FakeHttpResponseError):
+        governor.call("list", fails([503] * 3))
+    assert governor.gave_up == 1
+    with pytest.raises(FakeHttpResponseError):
+        governor.call("list", fails([404]))
+    assert governor.retries == 4
+
+def test_server_errors_are_retried_without_cutting_the_limit():
+    governor = make_governor(initial=8)
+    assert governor.call("list", fails([500, 502])) == "ok"
+    assert governor.limit == 8
+    assert governor.throttled == 0
+
+def test_responses_seen_by_the_hook_are_not_counted_twice():
+    governor = make_governor(initial=8)
+    options = governor.client_options()
+    assert options["retry_status"] == 0
+    container = FakeContainerClient("assets", capacity=0, raw_response_hook=options["raw_response_hook"])
+    with pytest.raises(FakeHttpResponseError):
+        governor.call("properties", container._request)
+    assert governor.throttled == governor.max_retries + 1
+    assert container.throttled == governor.max_retries + 1
+
+class FlakyBlobClient:
+    """Blob client whose downloads fail with a 503 once, after `good_chunks` chunks."""
+
+    def __init__(self, container, name, good_chunks):
+        self._blob_client = container.get_blob_client(name)
+        self.blob_name = name
+        self.good_chunks = good_chunks
+        self.requests = []
+
+    def download_blob(self, offset=None, length=None, **kwargs):
+        self.requests.append((offset, length))
+        downloader = self._blob_client.download_blob(offset=offset, length=length)
+        if self.good_chunks is None:
+            return downloader
+        good_chunks, self.good_chunks = self.good_chunks, None
+
+        def chunks():
+            for index, chunk in enumerate(downloader.chunks()):
+                if index == good_chunks:
+                    raise FakeHttpResponseError(503)
+                yield chunk
+
+        def readall():
+            raise FakeHttpResponseError(503)
+        return SimpleNamespace(properties=downloader.properties, chunks=chunks, readall=readall)
+
+def governed_blob(data, good_chunks, chunk_size=4):
+    container = FakeContainerClient("json", chunk_size=chunk_size)
+    container.upload_blob("bundle.json", data)
+    flaky = FlakyBlobClient(container, "bundle.json", good_chunks)
+    governed = GovernedContainer(make_governor(), SimpleNamespace(get_blob_client=lambda name: flaky))
+    return container, flaky, governed.get_blob_client("bundle.json")
+
+def test_throttled_readall_downloads_the_range_again():
+    _, flaky, blob_client = governed_blob(b"0123456789", good_chunks=0)
+    assert blob_client.download_blob(offset=2, length=6).readall() == b"234567"
+    assert flaky.requests == [(2, 6), (2, 6)]
+
+def test_throttled_chunks_resume_after_the_bytes_already_read():
+    _, flaky, blob_client = governed_blob(b"0123456789", good_chunks=2)
+    assert b"".join(blob_client.download_blob().chunks()) == b"0123456789"
+    assert flaky.requests == [(None, None), (8, None)]
+    _, flaky, blob_client = governed_blob(b"0123456789", good_chunks=1)
+    assert b"".join(blob_client.download_blob(offset=1, length=8).chunks()) == b"12345678"
+    assert flaky.requests == [(1, 8), (5, 4)]
+
+def test_retried_download_fails_when_the_blob_changed():
+    container, _, blob_client = governed_blob(b"0123456789", good_chunks=1)
+    chunks = blob_client.download_blob().chunks()
+    next(chunks)
+    container.upload_blob("bundle.json", b"changed!!!")
+    with pytest.raises(RuntimeError, match="changed while it was being downloaded"):
+        list(chunks)
+
+def test_throttled_batch_sub_requests_are_resent():
+    container = FakeContainerClient("assets")
+    for name in ("a", "b", "c"):
+        container.upload_blob(name, name)
+    delete_blobs = container.delete_blobs
+    sent = []
+
+    def throttle_b_once(*names, **kwargs):
+        sent.append(names)
+        responses = list(delete_blobs(*[name for name in names if name != "b" or len(sent) > 1]))
+        if len(sent) == 1:
+            responses.insert(1, SimpleNamespace(status_code=503, reason="Server Busy", headers={"Retry-After": "0"}))
+        return iter(responses)
+
+    container.delete_blobs = throttle_b_once
+    governor = make_governor(initial=8)
+    responses = list(GovernedContainer(governor, container).delete_blobs("a", "b", "c", raise_on_any_failure=False))
+    assert [response.status_code for response in responses] == [202, 202, 202]
+    assert sent == [("a", "b", "c"), ("b",)]
+    assert governor.limit == 4
+    assert container._blobs == {}
@@ -0,0 +1,167 @@
+import json
+import os
+from types import SimpleNamespace
+
+from benchmarks.fake_blob import FakeContainerClient
+from watch import BUNDLE_FILE_NAME, Change, ChangeFeedSource, LiveAudit, PollingChangeSource, watch
+
+def bundle(*srcs):
+    return json.dumps({"procedures": [{"src": src} for src in srcs]})
+
+def read_lines(path):
+    with open(path) as file:
+        return file.read().splitlines()
+
+def test_polling_source_commits_only_after_apply():
+    container = FakeContainerClient("assets")
+    container.upload_blob("assets/a.png", b"a")
+    source = PollingChangeSource(container, "assets/")
+    assert source.poll() == [Change("upsert", "assets/a.png", container._properties["assets/a.png"].etag)]
+    # Not committed: the next poll reports the same change again
+    assert [change.name for change in source.poll()] == ["assets/a.png"]
+    source.commit()
+    assert source.poll() == []
+    source.commit()
+
+    container.upload_blob("assets/a.png", b"changed")
+    container.upload_blob("assets/b.png", b"b")
+    assert sorted((change.kind, change.name) for change in source.poll()) == [
+        ("upsert", "assets/a.png"), ("upsert", "assets/b.png")
+    ]
+    source.commit()
+    container.delete_blobs("assets/a.png")
+    assert source.poll() == [Change("delete", "assets/a.png", None)]
+
+class FakeFeedPages:
+    def __init__(self, pages, continuation_token):
+        self._pages = iter(pages)
+        self.continuation_token = continuation_token
+
+    def __iter__(self):
+        return self._pages
+
+class FakeFeedClient:
+    def __init__(self):
+        self.calls = []
+        self.pages = []
+        self.token = None
+
+    def list_changes(self, start_time=None):
+        def by_page(continuation_token=None):
+            self.calls.append({"start_time": start_time, "continuation_token": continuation_token})
+            return FakeFeedPages(self.pages, self.token)
+        return SimpleNamespace(by_page=by_page)
+
+def make_feed_source(container):
+    # Built without __init__, which needs azure-storage-blob-changefeed
+    source = ChangeFeedSource.__new__(ChangeFeedSource)
+    source.feed_client = FakeFeedClient()
+    source.container_name = container.container_name
+    source.prefix = "assets/"
+    source.name_filter = None
+    source.initial_source = PollingChangeSource(container, "assets/")
+    source.continuation_token = None
+    source.start_time = None
+    source._pending = None
+    return source
+
+def test_change_feed_source_keeps_its_place():
+    container = FakeContainerClient("assets")
+    container.upload_blob("assets/a.png", b"a")
+    source = make_feed_source(container)
+    feed = source.feed_client
+
+    assert [change.name for change in source.poll()] == ["assets/a.png"]
+    assert source.start_time is None  # nothing is committed before apply succeeds
+    source.commit()
+    start_time = source.start_time
+    assert start_time is not None
+
+    # An empty feed still hands back a token; the next poll continues from it
+    feed.token = "t1"
+    assert source.poll() == []
+    source.commit()
+    assert source.continuation_token == "t1"
+    feed.pages = [[
+        {"subject": "/blobServices/default/containers/assets/blobs/assets/b.png", "eventType": "BlobCreated",
+         "data": {"etag": "e1"}},
+        {"subject": "/blobServices/default/containers/other/blobs/assets/c.png", "eventType": "BlobCreated"},
+        {"subject": "/blobServices/default/containers/assets/blobs/assets/a.png", "eventType": "BlobDeleted"},
+    ]]
+    feed.token = "t2"
+    assert source.poll() == [Change("upsert", "assets/b.png", "e1"), Change("delete", "assets/a.png", None)]
+    assert feed.calls[-1] == {"start_time": None, "continuation_token": "t1"}
+    assert feed.calls[0] == {"start_time": start_time, "continuation_token": None}
+    # Not committed: the same events are read again from t1
+    feed.pages = []
+    source.poll()
+    assert feed.calls[-1]["continuation_token"] == "t1"
+
+def make_audit(tmp_path):
+    assets = FakeContainerClient("assets")
+    for name in ("assets/A.png", "assets/b.png", "assets/c.png"):
+        assets.upload_blob(name, name)
+    bundles = FakeContainerClient("json")
+    bundles.upload_blob(f"languages/en/{BUNDLE_FILE_NAME}", bundle("/assets/a.png", "/assets/b.png"))
+    bundles.upload_blob(f"languages/fr/{BUNDLE_FILE_NAME}", bundle("/assets/b.png"))
+    audit = LiveAudit(assets, bundles, str(tmp_path))
+    return audit, PollingChangeSource(assets, "assets/"), PollingChangeSource(bundles, "languages/")
+
+def test_live_audit_reference_counts(tmp_path):
+    audit, asset_source, bundle_source = make_audit(tmp_path)
+    watch(audit, asset_source, bundle_source, interval=0, iterations=1)
+    assert audit.refcounts == {"/content/assets/a.png": 1, "/content/assets/b.png": 2}
+    assert audit.unused == {"/content/assets/c.png"}
+    assert read_lines(tmp_path / "global_missed_blobs.txt") == ["assets/c.png"]
+    assert read_lines(tmp_path / "en_common_paths.txt") == ["/content/assets/a.png", "/content/assets/b.png"]
+    assert read_lines(tmp_path / "fr_missed_paths.txt") == ["/content/assets/a.png", "/content/assets/c.png"]
+    assert sorted(os.listdir(tmp_path)) == [
+        "delta_log.jsonl", "en_common_paths.txt", "en_missed_paths.txt", "fr_common_paths.txt",
+        "fr_missed_paths.txt", "global_missed_blobs.txt", "global_missed_paths.txt",
+    ]
+
+    # en drops b.png: fr still references it
+    audit.bundles_client.upload_blob(f"languages/en/{BUNDLE_FILE_NAME}", bundle("/assets/a.png"))
+    watch(audit, asset_source, bundle_source, interval=0, iterations=1)
+    assert audit.refcounts["/content/assets/b.png"] == 1
+    assert "/content/assets/b.png" not in audit.unused
+
+    # Removing fr leaves b.png unused and deletes fr's outputs
+    audit.bundles_client.delete_blobs(f"languages/fr/{BUNDLE_FILE_NAME}")
+    watch(audit, asset_source, bundle_source, interval=0, iterations=1)
+    assert audit.unused == {"/content/assets/b.png", "/content/assets/c.png"}
+    assert not (tmp_path / "fr_common_paths.txt").exists()
+
+    # A second blob with the same canonical path keeps the asset until both are gone
+    audit.assets_client.upload_blob("assets/a.png", b"lowercase twin")
+    watch(audit, asset_source, bundle_source, interval=0, iterations=1)
+    audit.assets_client.delete_blobs("assets/A.png")
+    watch(audit, asset_source, bundle_source, interval=0, iterations=1)
+    assert "/content/assets/a.png" in audit.assets
+    audit.assets_client.delete_blobs("assets/a.png")
+    watch(audit, asset_source, bundle_source, interval=0, iterations=1)
+    assert "/content/assets/a.png" not in audit.assets
+    assert audit.refcounts["/content/assets/a.png"] == 1  # en still references the missing asset
+
+def test_failed_iteration_is_retried(tmp_path, capsys):
+    audit, asset_source, bundle_source = make_audit(tmp_path)
+    fetch = audit.fetch_bundle_values
+    failures = []
+
+    def flaky_fetch(change):
+        if not failures:
+            failures.append(change.name)
+            raise OSError("connection reset")
+        return fetch(change)
+
+    audit.fetch_bundle_values = flaky_fetch
+    watch(audit, asset_source, bundle_source, interval=0, iterations=1)
+    assert "Watch iteration failed" in capsys.readouterr().out
+    assert audit.assets == set() and audit.language_values == {}
+    assert bundle_source.snapshot == {}
+
+    watch(audit, asset_source, bundle_source, interval=0, iterations=1)
+    assert set(audit.language_values) == {"en", "fr"}
+    assert audit.unused == {"/content/assets/c.png"}
+    records = [json.loads(line) for line in read_lines(tmp_path / "delta_log.jsonl")]
+    assert sorted(record["event"] for record in records) == ["asset_added"] * 3 + ["bundle_changed"] * 2
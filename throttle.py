@@ -0,0 +1,378 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from metrics import increment
+
+# Shared AIMD concurrency governor for Azure Storage requests. Every list
+# page, download, properties read and batch delete on a governed client takes
+# one of `limit` slots. The limit grows by about one per window of healthy
+# calls while callers are queueing for slots, and is cut multiplicatively (at
+# most once per cooldown) when the account answers 429 or 503, as seen on
+# every response through the SDK's raw_response_hook. A Retry-After pauses
+# every caller. Clients built for the governor leave status retries to it (the
+# SDK keeps retrying connection and read errors), so a throttled call is
+# retried here alone, with backoff; a download is retried by requesting the
+# part of the blob it had not read yet.
+
+THROTTLE_STATUSES = (429, 503)
+RETRY_STATUSES = THROTTLE_STATUSES + (500, 502, 504)
+MAX_PAUSE = 60.0
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+def _retry_after(headers):
+    """Seconds to wait from x-ms-retry-after-ms or Retry-After, when the response has either."""
+    if not headers:
+        return None
+    value = headers.get("x-ms-retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class ThrottleGovernor:
+    def __init__(self, initial=8, minimum=1, maximum=32, decrease=0.5, cooldown=1.0, latency_tolerance=3.0,
+                 max_retries=6, backoff=0.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.latency_tolerance = latency_tolerance
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.observes_responses = False
+        self.in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.gave_up = 0
+        self.lowest_limit = self.limit
+        self.highest_limit = self.limit
+        self._waiting = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._latency = {}  # kind -> [moving average, lowest moving average]
+        self._condition = threading.Condition()
+
+    def _acquire(self):
+        with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._waiting += 1
+                try:
+                    self._condition.wait(pause if pause > 0 else None)
+                finally:
+                    self._waiting -= 1
+
+    def _healthy(self, kind, latency):
+        stats = self._latency.get(kind)
+        if stats is None:
+            self._latency[kind] = [latency, latency]
+            return True
+        stats[0] += 0.2 * (latency - stats[0])
+        stats[1] = min(stats[1], stats[0])
+        return latency <= self.latency_tolerance * stats[1]
+
+    def _release(self, kind, latency=None):
+        with self._condition:
+            saturated = self._waiting > 0 or self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            self.calls += 1
+            if latency is not None and self._healthy(kind, latency) and saturated:
+                # Additive increase: +1 per `limit` healthy calls, only while there is demand for more slots
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.highest_limit = max(self.highest_limit, self.limit)
+            self._condition.notify_all()
+
+    def record_throttle(self, retry_after=None):
+        """Registers a 429/503: cuts the limit (once per cooldown) and pauses callers for retry_after seconds."""
+        now = time.monotonic()
+        with self._condition:
+            self.throttled += 1
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self.lowest_limit = min(self.lowest_limit, self.limit)
+                self._last_decrease = now
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + min(retry_after, MAX_PAUSE))
+            self._condition.notify_all()
+        increment("throttled_responses")
+
+    def observe_response(self, pipeline_response):
+        """raw_response_hook for the SDK pipeline; it runs for every attempt, retried ones included."""
+        http_response = getattr(pipeline_response, "http_response", pipeline_response)
+        if getattr(http_response, "status_code", None) in THROTTLE_STATUSES:
+            self.record_throttle(_retry_after(getattr(http_response, "headers", None)))
+
+    def response_hook(self):
+        """Returns the hook to install on a client; throttled responses are then counted from it alone."""
+        self.observes_responses = True
+        return self.observe_response
+
+    def client_options(self):
+        """Options for a client behind the governor: its response hook, and no SDK retries on status codes."""
+        return {"raw_response_hook": self.response_hook(), "retry_status": 0}
+
+    def wait_before_retry(self, attempt, retry_after=None):
+        with self._condition:
+            self.retries += 1
+        increment("throttle_retries")
+        time.sleep(max(retry_after or 0.0, self.backoff * 2 ** attempt * random.uniform(0.5, 1.0)))
+
+    def call(self, kind, function, retry=True):
+        """Runs function() in a slot and returns its result, retrying throttled calls when `retry` is set.
+
+        Only calls that can be repeated as they are may be retried. Throttled
+        calls cut the limit; 500, 502 and 504 are retried without cutting it.
+        """
+        attempts = self.max_retries + 1 if retry else 1
+        for attempt in range(attempts):
+            self._acquire()
+            started = time.monotonic()
+            try:
+                result = function()
+            except Exception as error:
+                self._release(kind)
+                status = _status_code(error)
+                if status not in RETRY_STATUSES:
+                    raise
+                retry_after = _retry_after(getattr(getattr(error, "response", None), "headers", None))
+                if status in THROTTLE_STATUSES and not self.observes_responses:
+                    self.record_throttle(retry_after)
+                if attempt + 1 >= attempts:
+                    with self._condition:
+                        self.gave_up += 1
+                    raise
+                self.wait_before_retry(attempt, retry_after)
+                continue
+            self._release(kind, time.monotonic() - started)
+            return result
+
+    def stats(self):
+        with self._condition:
+            return {
+                "throttle_limit": round(self.limit, 2),
+                "throttle_lowest_limit": round(self.lowest_limit, 2),
+                "throttle_highest_limit": round(self.highest_limit, 2),
+                "throttle_in_flight": self.in_flight,
+                "governed_calls": self.calls,
+                "throttled_responses": self.throttled,
+                "throttle_retries": self.retries,
+                "throttle_gave_up": self.gave_up,
+            }
+
+class _GovernedPages:
+    # azure-core page iterators fetch the same page again when next() is retried
+    def __init__(self, governor, pages):
+        self._governor = governor
+        self._pages = pages
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._governor.call("list", lambda: next(self._pages))
+
+    def __getattr__(self, name):
+        return getattr(self._pages, name)
+
+class GovernedPaged:
+    """ItemPaged stand-in whose page requests go through the governor."""
+
+    def __init__(self, governor, paged):
+        self._governor = governor
+        self._paged = paged
+
+    def by_page(self, continuation_token=None):
+        if continuation_token is None:
+            return _GovernedPages(self._governor, self._paged.by_page())
+        return _GovernedPages(self._governor, self._paged.by_page(continuation_token=continuation_token))
+
+    def __iter__(self):
+        for page in self.by_page():
+            yield from page
+
+class GovernedDownloader:
+    """Downloader whose reads go through the governor.
+
+    A failed read leaves the SDK downloader half-way through, so a retry asks
+    `reopen(skip)` for a new downloader of the content after the `skip` bytes
+    already handed out.
+    """
+
+    def __init__(self, governor, downloader, reopen=None):
+        self._governor = governor
+        self._downloader = downloader
+        self._reopen = reopen
+        self._spent = False
+
+    def _current(self, skip):
+        if self._spent:
+            self._downloader = self._reopen(skip)
+        self._spent = True
+        return self._downloader
+
+    def readall(self):
+        return self._governor.call("download", lambda: self._current(0).readall(), retry=self._reopen is not None)
+
+    def chunks(self):
+        consumed = 0
+        iterator = None
+
+        def next_chunk():
+            nonlocal iterator
+            if iterator is None:
+                iterator = iter(self._current(consumed).chunks())
+            try:
+                return next(iterator)
+            except StopIteration:
+                raise
+            except Exception:
+                iterator = None
+                raise
+
+        while True:
+            try:
+                chunk = self._governor.call("download", next_chunk, retry=self._reopen is not None)
+            except StopIteration:
+                return
+            consumed += len(chunk)
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._downloader, name)
+
+class GovernedBlobClient:
+    def __init__(self, governor, blob_client):
+        self._governor = governor
+        self._blob_client = blob_client
+
+    def download_blob(self, offset=None, length=None, **kwargs):
+        def open_range(skip=0):
+            if not skip:
+                return self._blob_client.download_blob(offset=offset, length=length, **kwargs)
+            return self._blob_client.download_blob(
+                offset=(offset or 0) + skip, length=None if length is None else length - skip, **kwargs
+            )
+
+        downloader = self._governor.call("download", open_range)
+        etag = getattr(downloader.properties, "etag", None)
+
+        def reopen(skip):
+            # Called inside the retried read's slot, so it is not governed again
+            reopened = open_range(skip)
+            if getattr(reopened.properties, "etag", None) != etag:
+                raise RuntimeError(f"Blob {self._blob_client.blob_name} changed while it was being downloaded")
+            return reopened
+
+        return GovernedDownloader(self._governor, downloader, reopen)
+
+    def get_blob_properties(self, **kwargs):
+        return self._governor.call("properties", lambda: self._blob_client.get_blob_properties(**kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._blob_client, name)
+
+class GovernedContainer:
+    """ContainerClient wrapper that sends list, download, properties and delete requests through a governor."""
+
+    def __init__(self, governor, container_client):
+        self._governor = governor
+        self._container_client = container_client
+
+    def list_blobs(self, *args, **kwargs):
+        return GovernedPaged(self._governor, self._container_client.list_blobs(*args, **kwargs))
+
+    def walk_blobs(self, *args, **kwargs):
+        return GovernedPaged(self._governor, self._container_client.walk_blobs(*args, **kwargs))
+
+    def get_blob_client(self, blob, *args, **kwargs):
+        return GovernedBlobClient(self._governor, self._container_client.get_blob_client(blob, *args, **kwargs))
+
+    def delete_blobs(self, *blobs, **kwargs):
+        """Batch delete; with raise_on_any_failure=False, throttled sub-requests are resent in smaller batches."""
+        governor = self._governor
+
+        def send(batch):
+            return list(governor.call("delete", lambda: self._container_client.delete_blobs(*batch, **kwargs)))
+
+        if kwargs.get("raise_on_any_failure", True):
+            return iter(send(blobs))
+        responses = send(blobs)
+        for attempt in range(governor.max_retries):
+            throttled = [i for i, response in enumerate(responses) if response.status_code in THROTTLE_STATUSES]
+            if not throttled:
+                break
+            # Sub-responses are inside the batch body, so the pipeline hook never sees them
+            retry_after = max((_retry_after(responses[i].headers) or 0.0) for i in throttled)
+            governor.record_throttle(retry_after)
+            governor.wait_before_retry(attempt, retry_after)
+            for i, response in zip(throttled, send([blobs[i] for i in throttled])):
+                responses[i] = response
+        return iter(responses)
+
+    def __getattr__(self, name):
+        return getattr(self._container_client, name)
+
+_governor = None
+_governor_lock = threading.Lock()
+
+def get_governor():
+    """Returns the shared governor configured from the environment, or None when THROTTLE_GOVERNOR is off."""
+    global _governor
+    if os.getenv("THROTTLE_GOVERNOR", "1") in ("0", "false", "False"):
+        return None
+    with _governor_lock:
+        if _governor is None:
+            _governor = ThrottleGovernor(
+                initial=int(os.getenv("THROTTLE_INITIAL", "8")),
+                minimum=int(os.getenv("THROTTLE_MIN", "1")),
+                maximum=int(os.getenv("THROTTLE_MAX", os.getenv("BLOB_POOL_SIZE", "32"))),
+                decrease=float(os.getenv("THROTTLE_DECREASE", "0.5")),
+                cooldown=float(os.getenv("THROTTLE_COOLDOWN", "1.0")),
+                latency_tolerance=float(os.getenv("THROTTLE_LATENCY_TOLERANCE", "3.0")),
+                max_retries=int(os.getenv("THROTTLE_MAX_RETRIES", "6")),
+                backoff=float(os.getenv("THROTTLE_BACKOFF", "0.5")),
+            )
+    return _governor
+
+def governed(container_client):
+    """Wraps a container client with the shared governor, or returns it unchanged when the governor is off."""
+    governor = get_governor()
+    if governor is None:
+        return container_client
+    return GovernedContainer(governor, container_client)
+
+def throttle_stats():
+    if _governor is None:
+        return {}
+    return _governor.stats()
+
+def print_throttle_stats():
+    if _governor is not None:
+        stats = _governor.stats()
+        print(f"Throttle limit: {stats['throttle_limit']} (lowest {stats['throttle_lowest_limit']}, "
+              f"highest {stats['throttle_highest_limit']}), throttled responses: {stats['throttled_responses']}, "
+              f"retries: {stats['throttle_retries']}, gave up: {stats['throttle_gave_up']}")
@@ -0,0 +1,333 @@
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from blob_listing import list_blobs_sharded
+from bundle_cache import bundle_src_values
+from canonical_path import canonical_path, canonical_paths
+from metrics import increment, stage
+from storage import get_container
+from config import load_config
+
+# Long-running watch mode for the per-language audit (test.py). The asset
+# listing and every language bundle are loaded once; after that only changed
+# blobs are processed. Change sources are pluggable: PollingChangeSource diffs
+# successive listings by ETag and works against any container (Azure, a
+# LocalContainer or the benchmark fake), ChangeFeedSource reads the Blob
+# change feed. Each batch of changes updates the in-memory sets, rewrites the
+# outputs of the affected languages and appends one line per change to a
+# JSONL delta log. A source only moves past a batch once it has been applied
+# (commit()), so a batch that fails is reported again by the next poll.
+
+Change = namedtuple("Change", "kind name etag")  # kind: "upsert" or "delete"
+
+BUNDLE_FILE_NAME = 'content-bundle.json'
+
+class PollingChangeSource:
+    """Reports blobs created, modified or deleted under a prefix since the last committed poll."""
+
+    def __init__(self, container_client, prefix, name_filter=None):
+        self.container_client = container_client
+        self.prefix = prefix
+        self.name_filter = name_filter
+        self.snapshot = {}
+        self._pending = None
+
+    def poll(self):
+        current = {}
+        for blob in list_blobs_sharded(self.container_client, self.prefix):
+            if self.name_filter is None or self.name_filter(blob.name):
+                current[blob.name] = blob.etag
+        changes = [Change("upsert", name, etag) for name, etag in current.items() if self.snapshot.get(name) != etag]
+        changes.extend(Change("delete", name, None) for name in self.snapshot if name not in current)
+        self._pending = current
+        return changes
+
+    def commit(self):
+        """Makes the last poll's listing the baseline; call once its changes are applied."""
+        if self._pending is not None:
+            self.snapshot = self._pending
+            self._pending = None
+
+class ChangeFeedSource:
+    """Reads BlobCreated/BlobDeleted events for one container and prefix from the Blob change feed.
+
+    The change feed has no snapshot of existing blobs, so the first poll lists
+    the prefix like PollingChangeSource; later polls only read new events.
+    Events reach the feed within minutes, not seconds.
+    """
+
+    def __init__(self, container_client, prefix, name_filter=None, connection_string=None):
+        from azure.storage.blob.changefeed import ChangeFeedClient
+        connection_string = connection_string or os.getenv("AZURE_CONNECTION_STRING")
+        self.feed_client = ChangeFeedClient.from_connection_string(connection_string)
+        self.container_name = container_client.container_name
+        self.prefix = prefix or ""
+        self.name_filter = name_filter
+        self.initial_source = PollingChangeSource(container_client, prefix, name_filter)
+        self.continuation_token = None
+        self.start_time = None
+        self._pending = None  # (start time, continuation token) reached by the last poll
+
+    def _blob_name(self, subject):
+        marker = f"/containers/{self.container_name}/blobs/"
+        if marker not in subject:
+            return None
+        name = subject.split(marker, 1)[1]
+        if not name.startswith(self.prefix) or (self.name_filter is not None and not self.name_filter(name)):
+            return None
+        return name
+
+    def poll(self):
+        if self.start_time is None:
+            # Taken before listing, so events raised while the listing runs are read later
+            self._pending = (datetime.now(timezone.utc), None)
+            return self.initial_source.poll()
+        if self.continuation_token is None:
+            pages = self.feed_client.list_changes(start_time=self.start_time).by_page()
+        else:
+            pages = self.feed_client.list_changes().by_page(continuation_token=self.continuation_token)
+        changes = []
+        for page in pages:
+            for event in page:
+                name = self._blob_name(event.get("subject", ""))
+                if name is None:
+                    continue
+                if event.get("eventType") == "BlobDeleted":
+                    changes.append(Change("delete", name, None))
+                elif event.get("eventType") == "BlobCreated":
+                    changes.append(Change("upsert", name, event.get("data", {}).get("etag")))
+        # The token is set even when the feed had no new pages; keeping it stops
+        # the next poll from reading the feed again from start_time
+        self._pending = (self.start_time, pages.continuation_token or self.continuation_token)
+        return changes
+
+    def commit(self):
+        """Moves past the last poll's events; call once they are applied."""
+        if self._pending is not None:
+            if self.start_time is None:
+                self.initial_source.commit()
+            self.start_time, self.continuation_token = self._pending
+            self._pending = None
+
+def _write_paths_atomic(directory, file_name, paths):
+    full_path = os.path.join(directory, file_name)
+    tmp_path = f"{full_path}.tmp"
+    with open(tmp_path, 'w') as file:
+        for path in sorted(paths):
+            file.write(f"{path}\n")
+    os.replace(tmp_path, full_path)
+
+class LiveAudit:
+    """In-memory per-language comparison that is updated change by change.
+
+    refcounts holds, for every path referenced by any bundle, the number of
+    languages referencing it; `unused` is the set of assets with no references.
+    """
+
+    def __init__(self, assets_client, bundles_client, output_dir, delta_log=None):
+        self.assets_client = assets_client
+        self.bundles_client = bundles_client
+        self.output_dir = output_dir
+        self.delta_log = delta_log or os.path.join(output_dir, "delta_log.jsonl")
+        self.asset_names = {}      # blob name -> canonical path
+        self.asset_name_counts = {}
+        self.assets = set()
+        self.language_values = {}  # language id -> set of canonical src paths
+        self.refcounts = {}
+        self.unused = set()
+        # Left over from a batch whose outputs could not all be written; finished by the next apply
+        self._rewrite_all = False
+        self._unlogged_records = []
+        os.makedirs(output_dir, exist_ok=True)
+
+    @staticmethod
+    def language_id(bundle_name):
+        return os.path.basename(os.path.dirname(bundle_name))
+
+    def _reference(self, path):
+        count = self.refcounts.get(path, 0)
+        self.refcounts[path] = count + 1
+        if count == 0 and path in self.assets:
+            self.unused.discard(path)
+            return True
+        return False
+
+    def _dereference(self, path):
+        count = self.refcounts[path] - 1
+        if count:
+            self.refcounts[path] = count
+            return False
+        del self.refcounts[path]
+        if path in self.assets:
+            self.unused.add(path)
+            return True
+        return False
+
+    def apply_asset_change(self, change):
+        """Returns a delta record and whether every language's outputs are affected."""
+        if change.kind == "delete":
+            path = self.asset_names.pop(change.name, None)
+            if path is None:
+                return None
+            # Several blob names can share one canonical path; it stays until the last one goes
+            remaining = self.asset_name_counts[path] - 1
+            if remaining:
+                self.asset_name_counts[path] = remaining
+                return None
+            del self.asset_name_counts[path]
+            self.assets.discard(path)
+            self.unused.discard(path)
+            return {"event": "asset_removed", "name": change.name, "path": path}
+        if change.name in self.asset_names:
+            # Content changed, path did not: nothing to recompare
+            return None
+        path = canonical_path(change.name)
+        self.asset_names[change.name] = path
+        self.asset_name_counts[path] = self.asset_name_counts.get(path, 0) + 1
+        if path in self.assets:
+            return None
+        self.assets.add(path)
+        if self.refcounts.get(path, 0) == 0:
+            self.unused.add(path)
+        return {"event": "asset_added", "name": change.name, "path": path}
+
+    def fetch_bundle_values(self, change):
+        return set(canonical_paths(bundle_src_values(self.bundles_client, change.name)))
+
+    def apply_bundle_change(self, change, new_values=None):
+        language_id = self.language_id(change.name)
+        old_values = self.language_values.get(language_id, set())
+        if change.kind == "delete":
+            new_values = set()
+            self.language_values.pop(language_id, None)
+        else:
+            if new_values is None:
+                new_values = self.fetch_bundle_values(change)
+            self.language_values[language_id] = new_values
+        added = new_values - old_values
+        removed = old_values - new_values
+        now_used = [path for path in added if self._reference(path)]
+        now_unused = [path for path in removed if self._dereference(path)]
+        return {
+            "event": "bundle_removed" if change.kind == "delete" else "bundle_changed",
+            "name": change.name,
+            "language": language_id,
+            "references_added": sorted(added),
+            "references_removed": sorted(removed),
+            "now_used": sorted(now_used),
+            "now_unused": sorted(now_unused),
+        }
+
+    def write_language(self, language_id):
+        """Rewrites the language's outputs, the same files test.py writes."""
+        values = self.language_values.get(language_id)
+        if values is None:
+            for suffix in ("common", "missed"):
+                try:
+                    os.remove(os.path.join(self.output_dir, f"{language_id}_{suffix}_paths.txt"))
+                except FileNotFoundError:
+                    pass
+            return
+        _write_paths_atomic(self.output_dir, f"{language_id}_common_paths.txt", values & self.assets)
+        _write_paths_atomic(self.output_dir, f"{language_id}_missed_paths.txt", self.assets - values)
+
+    def apply(self, asset_changes, bundle_changes):
+        """Applies one batch of changes, rewrites the affected outputs and returns the delta records."""
+        # Bundles are downloaded before any state changes, so a failed download leaves the audit as it was
+        fetched = {
+            change.name: self.fetch_bundle_values(change) for change in bundle_changes if change.kind != "delete"
+        }
+        records = []
+        assets_changed = False
+        for change in asset_changes:
+            record = self.apply_asset_change(change)
+            if record is not None:
+                records.append(record)
+                assets_changed = True
+        affected = set()
+        for change in bundle_changes:
+            records.append(self.apply_bundle_change(change, fetched.get(change.name)))
+            affected.add(self.language_id(change.name))
+
+        # Every language's missed paths depend on the asset set
+        rewrite_all = assets_changed or self._rewrite_all
+        languages = set(self.language_values) | affected if rewrite_all else affected
+        self._unlogged_records.extend(records)
+        self._rewrite_all = True
+        with stage("watch_write"):
+            for language_id in sorted(languages):
+                self.write_language(language_id)
+            if self._unlogged_records:
+                _write_paths_atomic(self.output_dir, "global_missed_paths.txt", self.unused)
+                _write_paths_atomic(self.output_dir, "global_missed_blobs.txt",
+                                    (name for name, path in self.asset_names.items() if path in self.unused))
+                self._append_delta_log(self._unlogged_records)
+        self._rewrite_all = False
+        self._unlogged_records = []
+        increment("watch_changes", len(records))
+        return records
+
+    def _append_delta_log(self, records):
+        timestamp = datetime.now(timezone.utc).isoformat()
+        with open(self.delta_log, 'a') as file:
+            for record in records:
+                file.write(json.dumps({"time": timestamp, **record}) + "\n")
+
+def make_change_source(kind, container_client, prefix, name_filter=None):
+    if kind == "changefeed":
+        return ChangeFeedSource(container_client, prefix, name_filter)
+    return PollingChangeSource(container_client, prefix, name_filter)
+
+def watch(live_audit, asset_source, bundle_source, interval, iterations=None):
+    """Polls both sources every `interval` seconds and applies what changed.
+
+    A failed poll or apply is logged and the same changes are picked up again
+    on the next iteration.
+    """
+    iteration = 0
+    while iterations is None or iteration < iterations:
+        started = time.monotonic()
+        try:
+            with stage("watch_poll"):
+                asset_changes = asset_source.poll()
+                bundle_changes = bundle_source.poll()
+            if asset_changes or bundle_changes:
+                records = live_audit.apply(asset_changes, bundle_changes)
+                print(f"Applied {len(asset_changes)} asset and {len(bundle_changes)} bundle change(s), "
+                      f"{len(records)} delta record(s), {len(live_audit.unused)} globally missed paths")
+            asset_source.commit()
+            bundle_source.commit()
+        except Exception as error:
+            increment("watch_errors")
+            print(f"Watch iteration failed, retrying on the next poll: {type(error).__name__}: {error}")
+        iteration += 1
+        if iterations is None or iteration < iterations:
+            time.sleep(max(interval - (time.monotonic() - started), 0))
+
+def main():
+    load_config()
+    assets_container = os.getenv("BLOB_CONTAINER_ASSETS")
+    languages_container = os.getenv("BLOB_CONTAINER_JSON")
+    assets_prefix = os.getenv("ASSETS_PREFIX", "assets/")
+    languages_prefix = os.getenv("LANGUAGES_PREFIX", "languages/")
+    output_dir = os.getenv("OUTPUT_DIR", "output")
+    interval = float(os.getenv("WATCH_INTERVAL", "10"))
+    source_kind = os.getenv("WATCH_SOURCE", "poll")
+
+    assets_client = get_container(assets_container)
+    bundles_client = get_container(languages_container)
+    live_audit = LiveAudit(assets_client, bundles_client, output_dir, os.getenv("WATCH_DELTA_LOG"))
+    asset_source = make_change_source(source_kind, assets_client, assets_prefix)
+    bundle_source = make_change_source(source_kind, bundles_client, languages_prefix,
+                                       lambda name: name.endswith(BUNDLE_FILE_NAME))
+    print(f"Watching {assets_container}/{assets_prefix} and {languages_container}/{languages_prefix} "
+          f"every {interval:g}s ({source_kind})")
+    try:
+        watch(live_audit, asset_source, bundle_source, interval)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+if __name__ == "__main__":
+    main()